@@ -1,3 +1,15 @@
+from collections import deque
+import heapq
+from array import array
+from multiprocessing import Pool, shared_memory
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import threading
+
 def convert_to_adj_list(connections: list, maxIn: list, maxOut: list) -> list:
     '''
     Function description:
@@ -38,25 +50,419 @@ def convert_to_adj_list(connections: list, maxIn: list, maxOut: list) -> list:
 
     return adj_list
 
-def dfs(node: int, bottleneck: float, visited: list, adj_list: list, targets_out: list) -> float:
+class FlowNetwork:
+    def __init__(self, node_count: int, typecode: str = "q") -> None:
+        '''
+        Function description:
+        This function initialises a residual network with no edges. The edges are kept in flat arrays instead of
+        lists of tuples: head holds the first edge out of every node, next_edge links the edges out of the same
+        node together, and to and cap hold the node each edge leads to and its remaining capacity. Edges are
+        always added in pairs, so the twin of edge e is e ^ 1 and a push updates both in place in O(1).
+
+        :Input:
+        argv1 "node_count": the number of nodes in the network
+        argv2 "typecode": the array typecode of the capacities, "q" for integers or "d" for floats
+
+        :Output, return or postcondition:
+
+        :Time complexity:
+        O(V), where V is the number of nodes
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        self.head = array("i", [-1]) * node_count                                   # first edge out of every node, -1 if there is none
+        self.next_edge = array("i")                                                 # next edge out of the same node, -1 at the end of the list
+        self.to = array("i")                                                        # node that the edge leads to
+        self.cap = array(typecode)                                                  # remaining capacity of the edge
+        self.typecode = typecode
+
+    @classmethod
+    def from_arrays(cls, head, next_edge, to, cap, typecode: str) -> "FlowNetwork":
+        '''
+        Function description:
+        creates a network over existing edge arrays instead of building new ones. Any object that can be 
+        indexed like an array works, such as a memoryview over shared memory, so several processes can use
+        the same edge structure without copying it.
+
+        :Input:
+        argv1 "head": the first edge out of every node
+        argv2 "next_edge": the next edge out of the same node for every edge
+        argv3 "to": the node every edge leads to
+        argv4 "cap": the remaining capacity of every edge
+        argv5 "typecode": the array typecode of the capacities
+
+        :Output, return or postcondition:
+        returns a FlowNetwork using the given arrays
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        network = cls.__new__(cls)
+        network.head, network.next_edge, network.to, network.cap = head, next_edge, to, cap
+        network.typecode = typecode
+        return network
+
+    def copy(self) -> "FlowNetwork":
+        '''
+        Function description:
+        returns a network that shares the edge structure of this one, but has its own copy of the capacities,
+        so it can be solved without changing this network.
+
+        :Time complexity:
+        O(E), where E is the number of edges
+
+        :Aux space complexity:
+        O(E), where E is the number of edges
+        '''
+        cap = array(self.typecode)
+        cap.frombytes(memoryview(self.cap).cast("B"))
+        return FlowNetwork.from_arrays(self.head, self.next_edge, self.to, cap, self.typecode)
+
+    def __len__(self) -> int:
+        '''
+        Function description:
+        returns the number of nodes in the network
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return len(self.head)
+
+    def edges_until(self, node: int, stop: int = -1) -> int:
+        '''
+        Function description:
+        counts the edges out of a node from the first one up to and including stop, or all of them when stop is -1.
+        It is used by SolverStats to work out how many edges a search looked at, after the search is done.
+
+        :Input:
+        argv1 "node": the node whose edges are counted
+        argv2 "stop": the last edge counted
+
+        :Output, return or postcondition:
+        returns the number of edges counted
+
+        :Time complexity:
+        O(D), where D is the number of edges out of the node
+
+        :Aux space complexity:
+        O(1)
+        '''
+        next_edge = self.next_edge
+        count = 0
+        edge = self.head[node]
+        while edge != -1:
+            count += 1
+            if edge == stop:
+                break
+            edge = next_edge[edge]
+        return count
+
+    def add_edge(self, from_node: int, to_node: int, capacity: float) -> int:
+        '''
+        Function description:
+        adds an edge and its zero capacity reverse edge to the network. A capacity that isn't an integer switches
+        an integer network to floats first, and an edge that can't be added leaves the network unchanged.
+
+        :Input:
+        argv1 "from_node": the node the edge starts at
+        argv2 "to_node": the node the edge leads to
+        argv3 "capacity": the capacity of the edge
+
+        :Output, return or postcondition:
+        returns the index of the forward edge, the reverse edge is the index plus one
+
+        :Time complexity:
+        O(1) amortised
+
+        :Aux space complexity:
+        O(1) amortised, or O(E) the first time it switches to floats
+        '''
+        head, to, cap = self.head, self.to, self.cap
+        first = head[from_node]
+        head[to_node]                                                               # a missing node raises before anything changes
+        if self.typecode == "q" and not isinstance(capacity, int):
+            self.fit(capacity)
+            cap = self.cap
+        edge = len(to)
+        try:
+            cap.append(capacity)
+            cap.append(0)
+            to.append(to_node)
+            to.append(from_node)
+        except (TypeError, OverflowError):                                          # leaves the twins paired for the edges after it
+            del cap[edge:]
+            del to[edge:]
+            raise
+        self.next_edge.append(first)
+        head[from_node] = edge
+        self.next_edge.append(head[to_node])
+        head[to_node] = edge + 1
+        return edge
+
+    def fit(self, capacity: float) -> None:
+        '''
+        Function description:
+        switches the capacities to floats when a capacity that isn't an integer is given to a network built from
+        integers, since a 64 bit integer array can't hold it.
+
+        :Input:
+        argv1 "capacity": the capacity about to be stored
+
+        :Output, return or postcondition:
+        cap can hold the capacity
+
+        :Time complexity:
+        O(E) the first time it switches, otherwise O(1)
+
+        :Aux space complexity:
+        O(E) the first time it switches, otherwise O(1)
+        '''
+        if self.typecode == "q" and not isinstance(capacity, int):
+            self.cap = array("d", self.cap)
+            self.typecode = "d"
+
+def convert_to_flow_network(connections: list, maxIn: list, maxOut: list) -> FlowNetwork:
+    '''
+    Function description:
+    This function builds the same split in/out node graph as convert_to_adj_list, but as a FlowNetwork.
+    The in to out edge of datacentre i is edge 2 * i, and the edge of connections[j] is edge 2 * (n + j),
+    so the flow on any of them can be read back from the twin edge after a solve. Integer capacities
+    are stored as 64 bit integers, and anything else is stored as floats.
+
+    :Input:
+    argv1 "connections" : list of tuples representing the connection and capacities between data centres
+    argv2 "maxIn": list of integers representing the maximum flow into each data centre, which are represented by the index.
+    argv3 "maxOut": list of integers representing the maximum flow out of each data centre, which are represented by the index.
+
+    :Output, return or postcondition:
+    returns a FlowNetwork with 2n nodes, where n is the number of datacentres
+
+    :Time complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+
+    :Aux space complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+    '''
+    n = len(maxIn)
+    integral = all(isinstance(limit, int) for limit in maxIn) and all(isinstance(limit, int) for limit in maxOut) \
+        and all(isinstance(capacity, int) for _, _, capacity in connections)
+    network = FlowNetwork(2 * n, "q" if integral else "d")
+
+    for node in range(n):
+        network.add_edge(2 * node, 2 * node + 1, min(maxIn[node], maxOut[node]))    # in to out edge of the datacentre
+
+    for from_node, to_node, capacity in connections:
+        network.add_edge(2 * from_node + 1, 2 * to_node, capacity)                  # out node of one datacentre to the in node of the next
+    return network
+
+class SolverStats:
+    def __init__(self, callback=None, trace: bool = False) -> None:
+        '''
+        Function description:
+        This function initialises the class, which a solver and maxThroughput fill in as they run when one is
+        passed to them. Nothing is counted without one, and the solvers only touch it once per augmenting path,
+        dead end or phase, so the loops over the edges run the same either way. The edges a search looked at
+        are counted afterwards by walking the edge lists as far as the search got, which only costs time when
+        counting.
+
+        augmentations counts the augmenting paths of ford fulkerson and dinic, and the pushes of push relabel.
+        edges_scanned counts the edges the searches looked at, reverse_lookups counts the twin edges that were
+        updated by a push or followed back out of a dead end, and max_depth is the longest path a search held.
+        phases holds the seconds spent in every phase by name.
+
+        :Input:
+        argv1 "callback": an optional function called with the stats when maxThroughput finishes
+        argv2 "trace": boolean value that keeps the (path length, bottleneck) of every augmentation in trace
+
+        :Output, return or postcondition:
+        every count starts at 0
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.augmentations = 0
+        self.edges_scanned = 0
+        self.reverse_lookups = 0
+        self.max_depth = 0
+        self.phases = {}
+        self.trace = [] if trace else None
+        self.callback = callback
+
+    def augmented(self, length: int, bottleneck: float) -> None:
+        '''
+        Function description:
+        records an augmentation along a path of the given length, which updates the twin of every edge on it.
+
+        :Input:
+        argv1 "length": the number of edges on the path
+        argv2 "bottleneck": the flow sent along the path
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.augmentations += 1
+        self.reverse_lookups += length
+        if length > self.max_depth:
+            self.max_depth = length
+        if self.trace is not None:
+            self.trace.append((length, bottleneck))
+
+    def timed(self, phase: str, start: float) -> None:
+        '''
+        Function description:
+        adds the time since start to a phase.
+
+        :Input:
+        argv1 "phase": the name of the phase
+        argv2 "start": the time.perf_counter() value when the phase started
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.phases[phase] = self.phases.get(phase, 0) + time.perf_counter() - start
+
+    def as_dict(self) -> dict:
+        '''
+        Function description:
+        returns the counts and phase times as a dictionary that can be written as JSON, without the trace.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return {"augmentations": self.augmentations, "edges_scanned": self.edges_scanned, "reverse_lookups": self.reverse_lookups,
+                "max_depth": self.max_depth, "phases": dict(self.phases)}
+
+def dfs(network: FlowNetwork, source: int, is_target: list, visited: bytearray, stats: SolverStats = None) -> float:
     '''
     Function description:
     This function is a depth first seach that returns the capcity of the augmenting path found.
-    starting from the given node, it checks to see if the neigbouring datacentres have been explored.
-    if it hasn't and it still has a capcity greater than 0, it will compare the bottleneck with the capcity
-    of the newly discovered datacentre. It will then perform another dfs with the updated minumum capacity, 
-    till it reaches the target node. once reaching the target node, it updates both the forward and backward
-    flow capcity of all the explored edges.
+    starting from the source, it follows edges that still have capacity to nodes that haven't been explored,
+    backing up whenever it runs out of edges, till it reaches a target node. once reaching the target node,
+    it updates both the forward and backward flow capcity of all the edges on the path. The search keeps
+    its own stack of edges, so it isn't limited by the recursion depth, and the reverse edge of every edge
+    is found directly from its index.
+
+    :Input:
+    argv1 "network": the FlowNetwork being searched, which is updated in place
+    argv2 "source": int value representing the index of the node the search starts from
+    argv3 "is_target": a list of booleans representing whether a node is a target, where the index represents the node
+    argv4 "visited": a bytearray representing whether a node has been explored, where the index represents the node
+    argv5 "stats": an optional SolverStats that the search is recorded in
+
+    :Output, return or postcondition:
+    returns a float value representing the minimum capacity along the augmenting path, or 0 if there is none.
+
+    :Time complexity:
+    O(V+E), where V is the number of nodes and E is the number of edges.
+
+    :Aux space complexity:
+    O(V), where V is the number of nodes.
+    '''
+    head, next_edge, to, cap = network.head, network.next_edge, network.to, network.cap
+    visited[source] = True
+    path = []                                                                       # edges from the source to the current node
+    pending = [head[source]]                                                        # next edge to try at every depth of the search
+    node = source
+    while not is_target[node]:
+        edge = pending[-1]
+        while edge != -1 and (cap[edge] <= 0 or visited[to[edge]]):                 # skips edges that can't be explored
+            edge = next_edge[edge]
+        if edge == -1:                                                              # dead end, so it backs up one edge
+            if stats is not None:
+                stats.edges_scanned += network.edges_until(node)
+                stats.max_depth = max(stats.max_depth, len(path))
+            if not path:
+                return 0
+            if stats is not None:
+                stats.reverse_lookups += 1
+            pending.pop()
+            edge = path.pop()
+            pending[-1] = next_edge[edge]
+            node = to[edge ^ 1]
+            continue
+        pending[-1] = edge
+        path.append(edge)
+        node = to[edge]
+        visited[node] = True
+        pending.append(head[node])
+
+    bottleneck = min(cap[edge] for edge in path)
+    for edge in path:                                                               # updates the forward and reverse capacity of every edge on the path
+        cap[edge] -= bottleneck
+        cap[edge ^ 1] += bottleneck
+    if stats is not None:
+        stats.edges_scanned += sum(network.edges_until(to[edge ^ 1], edge) for edge in path)
+        stats.augmented(len(path), bottleneck)
+    return bottleneck
+
+def ford_fulkerson(network: FlowNetwork, source: int, targets: list, stats: SolverStats = None) -> tuple:
+    '''
+    Function description:
+    This function computes the maximum flow from the source to any of the targets by performing dfs until
+    there isn't anymore flow that can pass through the network. The nodes visited by the last dfs, which
+    found no path, are the source side of a minimum cut.
+
+    :Input:
+    argv1 "network": the FlowNetwork being solved, which is updated in place
+    argv2 "source": int value representing the index of the source node
+    argv3 "targets": list of integers representing the target nodes
+    argv4 "stats": an optional SolverStats that the solve is recorded in
+
+    :Output, return or postcondition:
+    returns the maximum flow from the source to the targets and a bytearray marking the source side of a minimum cut.
+
+    :Time complexity:
+    O(F * (V+E)), where F is the maximum flow, V is the number of nodes and E is the number of edges.
+
+    :Aux space complexity:
+    O(V), where V is the number of nodes.
+    '''
+    is_target = [False] * len(network)
+    for target in targets:
+        is_target[target] = True
+
+    max_flow = 0
+    while True:
+        visited = bytearray(len(network))                                           # marks whether a node has been visited in this round
+        flow = dfs(network, source, is_target, visited, stats)
+        if flow == 0:                                                               # if there are not changes, break from the while loop
+            break
+        max_flow += flow
+    return max_flow, visited
+
+def bfs_levels(network: FlowNetwork, source: int, is_target: list) -> list:
+    '''
+    Function description:
+    This function is a breadth first search over the edges of the network that still have capacity.
+    It labels every node with its distance from the source, which forms the level graph used by dinic.
+    The search does not expand past a target, since flow that reaches a target is absorbed there.
 
     :Input:
-    argv1 "node": int value representing the index of the node in the adj_list being explored
-    argv2 "bottleneck": float value representing the maximum capacity along the augmenting path
-    argv3 "visited": a list of booleans representing whether a node has been explored, where the index represents the node
-    argv4 "adj_list": an adjacency list representation of the orginal graph
-    argv5 "targets_out": list of integers representing the target data centre we're trying to get to.
+    argv1 "network": the FlowNetwork being searched
+    argv2 "source": int value representing the index of the source node
+    argv3 "is_target": a list of booleans representing whether a node is a target, where the index represents the node
 
     :Output, return or postcondition:
-    returns a float value representing the minimum capacity along the augmenting path.
+    returns a list of levels, where -1 means the node can't be reached from the source
 
     :Time complexity:
     O(V+E), where V is the number of nodes and E is the number of edges.
@@ -64,232 +470,3663 @@ def dfs(node: int, bottleneck: float, visited: list, adj_list: list, targets_out
     :Aux space complexity:
     O(V), where V is the number of nodes.
     '''
-    for i in targets_out:                                                           # segement checks to see if the dfs has reached the target node
-        if node == i:                                                               # if it does, it returns the bottleneck flow
-            return bottleneck
-
-    visited[node] = True                                                            
-    for i in range(len(adj_list[node])):
-        neighbour, capacity = adj_list[node][i]
-
-        if not visited[neighbour] and capacity > 0:                                 # checks to see if there is an adjacent datacentre that can be explored
-            new_min_capacity = min(bottleneck, capacity)                            # updates the bottle neck if the adjacent edge has a smaller capacity than the bottleneck
-            flow = dfs(neighbour, new_min_capacity, visited, adj_list, targets_out) # performs dfs to find the target node
-            if flow > 0:                                                            # if the flow to the target is greater than zero
-                adj_list[node][i] = (neighbour, capacity - flow)                    # it proceeds to update the capacity of all the edges it visited
-                for j in range(len(adj_list[neighbour])):                           # iterates over the edges in the adjacent datacentre
-                    rev_node, rev_capacity = adj_list[neighbour][j]                 
-                    if rev_node == node:                                            # checks to see if the original node is reached
-                        adj_list[neighbour][j] = (rev_node, rev_capacity + flow)    # updates the reverse flow
+    head, next_edge, to, cap = network.head, network.next_edge, network.to, network.cap
+    level = [-1] * len(network)
+    level[source] = 0
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        if is_target[node]:                                                         # flow stops at the first target it reaches
+            continue
+        next_level = level[node] + 1
+        edge = head[node]
+        while edge != -1:
+            neighbour = to[edge]
+            if cap[edge] > 0 and level[neighbour] < 0:
+                level[neighbour] = next_level
+                queue.append(neighbour)
+            edge = next_edge[edge]
+    return level
+
+def dinic(network: FlowNetwork, source: int, targets: list, bounds: "ThroughputBounds" = None, stats: SolverStats = None) -> tuple:
+    '''
+    Function description:
+    This function computes the maximum flow from the source to any of the targets using dinic's algorithm.
+    Each phase builds the level graph with bfs_levels and then finds a blocking flow in it, using a pointer
+    per node so that an edge that can't carry more flow in the current phase is never looked at again.
+    The path search is iterative, so deep networks don't run into the recursion limit, and after an
+    augmentation it only retreats to the first saturated edge instead of starting again from the source.
+    The nodes reached by the last breadth first search, which found no target, are the source side of a minimum cut.
+    Given a ThroughputBounds, every phase also offers it the cuts between its levels, and the search stops
+    as soon as the budget of the bounds runs out or the flow reaches the best cut seen.
+
+    :Input:
+    argv1 "network": the FlowNetwork being solved, which is updated in place
+    argv2 "source": int value representing the index of the source node
+    argv3 "targets": list of integers representing the target nodes
+    argv4 "bounds": an optional ThroughputBounds that limits the search and is kept up to date
+    argv5 "stats": an optional SolverStats that the solve is recorded in, with the time spent building level
+    graphs and finding blocking flows
+
+    :Output, return or postcondition:
+    returns the maximum flow from the source to the targets and a bytearray marking the source side of a minimum cut.
+    When the budget of the bounds runs out first, returns the flow found so far and the best cut seen instead.
+
+    :Time complexity:
+    O(V^2 * E), where V is the number of nodes and E is the number of edges, independent of the capacities.
+
+    :Aux space complexity:
+    O(V), where V is the number of nodes.
+    '''
+    head, next_edge, to, cap = network.head, network.next_edge, network.to, network.cap
+    is_target = [False] * len(network)
+    for target in targets:
+        is_target[target] = True
+
+    max_flow = 0
+    while True:
+        if bounds is not None and bounds.out_of_budget():
+            return max_flow, bounds.source_side
+        if stats is not None:
+            start = time.perf_counter()
+        level = bfs_levels(network, source, is_target)
+        if stats is not None:
+            stats.edges_scanned += sum(network.edges_until(node) for node in range(len(level)) if level[node] >= 0 and not is_target[node])
+            stats.timed("levels", start)
+            start = time.perf_counter()
+        if all(level[target] < 0 for target in targets):                            # no augmenting path is left
+            break
+        if bounds is not None and bounds.observe_levels(level):
+            return max_flow, bounds.source_side
+        pointer = list(head)                                                        # next edge to try for every node in this phase
+        path = []                                                                   # edges from the source to the current node
+        node = source
+        while True:
+            if is_target[node]:
+                bottleneck = min(cap[edge] for edge in path)
+                for edge in path:                                                   # pushes the bottleneck along the path and onto the twin edges
+                    cap[edge] -= bottleneck
+                    cap[edge ^ 1] += bottleneck
+                max_flow += bottleneck
+                if stats is not None:
+                    stats.augmented(len(path), bottleneck)
+                if bounds is not None and (bounds.augmented(bottleneck) or bounds.out_of_budget()):
+                    return max_flow, bounds.source_side
+                for k in range(len(path)):                                          # retreats to the tail of the first saturated edge
+                    if cap[path[k]] == 0:
+                        node = to[path[k] ^ 1]
+                        del path[k:]
                         break
-                    else:
-                        adj_list[neighbour].append((node, flow))                    # Add reverse flow edge with capacity if the reverse flow doesnt exist
-                return flow
-    return 0
+                continue
+
+            next_level = level[node] + 1
+            edge = pointer[node]
+            while edge != -1 and (cap[edge] <= 0 or level[to[edge]] != next_level):
+                edge = next_edge[edge]
+            pointer[node] = edge
+            if edge != -1:                                                          # advances along an admissible edge
+                path.append(edge)
+                node = to[edge]
+            elif node == source:                                                    # the blocking flow for this phase is complete
+                break
+            else:                                                                   # dead end, so the edge leading here is skipped from now on
+                if stats is not None:
+                    stats.reverse_lookups += 1
+                    stats.max_depth = max(stats.max_depth, len(path))
+                edge = path.pop()
+                node = to[edge ^ 1]
+                pointer[node] = next_edge[edge]
+        if stats is not None:
+            stats.edges_scanned += sum(network.edges_until(node, pointer[node]) for node in range(len(level)) if level[node] >= 0 and not is_target[node])
+            stats.timed("blocking flow", start)
+    source_side = bytearray(height >= 0 for height in level)
+    if bounds is not None:
+        bounds.finish(source_side)
+    return max_flow, source_side
+
+def push_relabel(network: FlowNetwork, source: int, targets: list, fifo: bool = False, stats: SolverStats = None) -> tuple:
+    '''
+    Function description:
+    This function computes the maximum flow from the source to any of the targets using the push relabel
+    algorithm. The source saturates all of its edges, and the excess is then pushed downhill towards the
+    targets, relabelling a node whenever none of its edges lead downhill. Heights start at the exact distance
+    to the nearest target, and the gap heuristic lifts every node above an empty height straight over the
+    source so that the excess that can't reach a target goes back to the source quickly. Active nodes are
+    picked highest label first, or in first in first out order when fifo is set. When no node is active the
+    flow is valid, and since no residual edge goes down more than one height, the nodes above any empty height 
+    are the source side of a minimum cut. With float capacities the subtractions can leave a node a rounding
+    error of excess and no edge to push it along, so excess up to a tiny fraction of the capacity out of the
+    source counts as none.
+
+    :Input:
+    argv1 "network": the FlowNetwork being solved, which is updated in place
+    argv2 "source": int value representing the index of the source node
+    argv3 "targets": list of integers representing the target nodes
+    argv4 "fifo": boolean value that selects first in first out order instead of highest label first
+    argv5 "stats": an optional SolverStats that the solve is recorded in, where every push counts as an augmentation
+    of length 1, with the time spent on the starting heights and on discharging
+
+    :Output, return or postcondition:
+    returns the maximum flow from the source to the targets and a bytearray marking the source side of a minimum cut.
+
+    :Time complexity:
+    O(V^2 * sqrt(E)) highest label first, or O(V^3) in fifo order, where V is the number of nodes and
+    E is the number of edges, independent of the capacities.
+
+    :Aux space complexity:
+    O(V), where V is the number of nodes.
+    '''
+    head, next_edge, to, cap = network.head, network.next_edge, network.to, network.cap
+    n = len(network)
+    is_target = [False] * n
+    for target in targets:
+        is_target[target] = True
+
+    if stats is not None:
+        start = time.perf_counter()
+    height = [n] * n                                                                # nodes that can't reach a target start level with the source
+    queue = deque(targets)
+    for target in targets:
+        height[target] = 0
+    while queue:                                                                    # reverse breadth first search for the exact distance to the targets
+        node = queue.popleft()
+        edge = head[node]
+        while edge != -1:
+            neighbour = to[edge]
+            if height[neighbour] == n and neighbour != source and cap[edge ^ 1] > 0:
+                height[neighbour] = height[node] + 1
+                queue.append(neighbour)
+            edge = next_edge[edge]
+    if stats is not None:
+        stats.edges_scanned += sum(network.edges_until(node) for node in range(n) if height[node] < n)
+        stats.timed("heights", start)
+        start = time.perf_counter()
+    height[source] = n
+    count = [0] * (2 * n + 1)                                                       # the number of nodes at each height, used for the gap heuristic
+    for node in range(n):
+        count[height[node]] += 1
+
+    excess = [0] * n
+    pointer = list(head)
+    queued = [False] * n
+    active = deque() if fifo else []
+
+    def activate(node: int) -> None:
+        if not queued[node] and node != source and not is_target[node]:
+            queued[node] = True
+            if fifo:
+                active.append(node)
+            else:
+                heapq.heappush(active, (-height[node], node))
+
+    tolerance = 0
+    if network.typecode == "d":                                                     # rounding error that counts as no excess
+        edge = head[source]
+        while edge != -1:
+            tolerance += max(cap[edge], 0)
+            edge = next_edge[edge]
+        tolerance *= 1e-12
+
+    edge = head[source]
+    while edge != -1:                                                               # saturates every edge out of the source
+        capacity = cap[edge]
+        if capacity > 0:
+            cap[edge] = 0
+            cap[edge ^ 1] += capacity
+            excess[source] -= capacity
+            excess[to[edge]] += capacity
+            activate(to[edge])
+            if stats is not None:
+                stats.augmented(1, capacity)
+        edge = next_edge[edge]
+    if stats is not None:
+        stats.edges_scanned += network.edges_until(source)
+
+    while active:
+        node = active.popleft() if fifo else heapq.heappop(active)[1]
+        queued[node] = False
+        while excess[node] > tolerance:                                             # discharges the node
+            edge = pointer[node]
+            if edge == -1:                                                          # relabels the node to one above its lowest residual neighbour
+                if stats is not None:
+                    stats.edges_scanned += 2 * network.edges_until(node)              # the pass that ran out of edges and the relabel
+                old = height[node]
+                new = 2 * n
+                edge = head[node]
+                while edge != -1:
+                    if cap[edge] > 0 and height[to[edge]] < new:
+                        new = height[to[edge]]
+                    edge = next_edge[edge]
+                new = min(new + 1, 2 * n)                                           # heights never pass 2n, even when no edge is left
+                count[old] -= 1
+                if count[old] == 0 and old < n:                                     # gap heuristic, nothing above the gap can reach a target
+                    for other in range(n):
+                        if old < height[other] < n:
+                            count[height[other]] -= 1
+                            height[other] = n + 1
+                            count[n + 1] += 1
+                    new = max(new, n + 1)
+                height[node] = new
+                count[new] += 1
+                pointer[node] = head[node]
+                continue
+
+            neighbour = to[edge]
+            if cap[edge] > 0 and height[node] == height[neighbour] + 1:             # pushes downhill
+                pushed = min(excess[node], cap[edge])
+                cap[edge] -= pushed
+                cap[edge ^ 1] += pushed
+                excess[node] -= pushed
+                excess[neighbour] += pushed
+                activate(neighbour)
+                if stats is not None:
+                    stats.augmented(1, pushed)
+            else:
+                pointer[node] = next_edge[edge]
+    if stats is not None:
+        stats.edges_scanned += sum(network.edges_until(node, pointer[node]) for node in range(n) if pointer[node] != head[node])
+        stats.timed("discharge", start)
+    gap = 1
+    while count[gap]:                                                               # there are fewer nodes than heights below the source
+        gap += 1
+    return sum(excess[target] for target in set(targets)), bytearray(h > gap for h in height)
 
-def maxThroughput(connections:list, maxIn:list, maxOut:list, origin_out:int, targets_out:list) -> float:
+ALGORITHMS = {
+    "ford_fulkerson": ford_fulkerson,
+    "dinic": dinic,
+    "push_relabel": push_relabel,
+    "push_relabel_fifo": lambda network, source, targets, stats=None: push_relabel(network, source, targets, True, stats),
+}
+
+def maxThroughput(connections:list, maxIn:list, maxOut:list, origin_out:int, targets_out:list, algorithm:str = None, detailed:bool = False, reduce:bool = False,
+                  time_limit:float = None, max_augmentations:int = None, stats:SolverStats = None):
     '''
     Function description:
     The following function calculates the maximum flow from the given origin node to the given target nodes.
-    It does so by converting the given graph 'connections' into a adjacency list that ford fulkerson can be 
+    It does so by converting the given graph 'connections' into a flow network that ford fulkerson can be
     performed on. It uses depth first search to find the maximum flow from the the origin to the targets.
     it continues to perform dfs until there isn't anymore flow can pass through the network flow graph.
+    Passing "dinic", "push_relabel" or "push_relabel_fifo" as the algorithm solves the same split graph with
+    a solver whose running time depends only on the size of the graph and not on the capacities.
+    An origin that is also a target raises ValueError.
+    With detailed set, the flow on every connection and datacentre and the minimum cut are read from the
+    network the solver leaves behind and returned as a ThroughputResult. With reduce set, the problem is first
+    shrunk by reduce_datacentres, and a detailed result is mapped back to the original datacentres.
+    Giving a time limit or an augmentation budget solves with dinic until the budget runs out, and returns
+    a ThroughputBounds holding the flow found so far and an upper bound from the best cut seen. It can't be
+    combined with detailed or with an algorithm other than dinic, and raises ValueError if it is.
+    Passing a SolverStats records the time spent reducing, building, solving and expanding along with what
+    the solver did, and calls its callback when the call finishes.
 
     Approach description (if main function):
     The approach to the problem was to transform the connections graph such that it contains the maxIn and maxOut
     capacities. This would then allow me to perform the ford fulkerson algorithm to determine the maximum flow.
 
     :Input:
-    argv1 "connections": a list of tuples representing the connections between datacentres, in addition to 
-    the edge capacity. 
+    argv1 "connections": a list of tuples representing the connections between datacentres, in addition to
+    the edge capacity.
     argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
-    argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre 
+    argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
     argv4 "origin": an integer representing the starting node
     argv5 "targets": a list of integers representing the end nodes
+    argv6 "algorithm": the name of the max flow algorithm, one of the keys of ALGORITHMS, or None for ford fulkerson,
+    or for dinic when there is a time limit or augmentation budget
+    argv7 "detailed": boolean value that returns a ThroughputResult instead of only the maximum flow
+    argv8 "reduce": boolean value that solves the problem made by reduce_datacentres instead
+    argv9 "time_limit": the number of seconds the solve may take, or None for no limit
+    argv10 "max_augmentations": the number of augmenting paths the solve may use, or None for no limit
+    argv11 "stats": an optional SolverStats that the call is recorded in
 
     :Output, return or postcondition:
-    returns the maximum flow from the origin to the targets.
+    returns the maximum flow from the origin to the targets, or a ThroughputResult when detailed is set, or a
+    ThroughputBounds when there is a time limit or augmentation budget.
+
+
+    :Time complexity:
+    O(V+E), where V represents the number of datacentres and E represents the number of edges, per augmenting path
+    for ford fulkerson, or the bounds given for the algorithm in ALGORITHMS otherwise
 
-    :Time complexity: 
-    O(V+E), where V represents the number of datacentres and E represents the number of edges
-    
     :Aux space complexity:
-    O(V), where V represents the number of datacentres
+    O(V+E), where V represents the number of datacentres and E represents the number of edges
     '''
-    adj_list = convert_to_adj_list(connections, maxIn, maxOut)                      
+    if algorithm is not None and algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown max flow algorithm {algorithm!r}")
+    if origin_out in targets_out:
+        raise ValueError("the origin can't also be a target")
+    bounded = time_limit is not None or max_augmentations is not None
+    if bounded and detailed:
+        raise ValueError("detailed results need a solve without a time limit or augmentation budget")
+    if bounded and algorithm not in (None, "dinic"):
+        raise ValueError(f"a time limit or augmentation budget always solves with dinic, so {algorithm!r} can't be chosen")
+    if algorithm is None:
+        algorithm = "ford_fulkerson"
+    if stats is not None:
+        start = time.perf_counter()
+    if reduce:
+        reduced = reduce_datacentres(connections, maxIn, maxOut, origin_out, targets_out)
+        original = (connections, maxIn, maxOut)
+        connections, maxIn, maxOut = reduced.connections, reduced.maxIn, reduced.maxOut
+        origin_out, targets_out = reduced.origin_out, reduced.targets_out
+        if stats is not None:
+            stats.timed("reduce", start)
+            start = time.perf_counter()
+
+    network = convert_to_flow_network(connections, maxIn, maxOut)
     origin_out = 2*origin_out + 1                                                   # determines the new origin value
     targets_out = [2*t + 1 for t in targets_out]                                    # calculates the new target values
+    if stats is not None:
+        stats.timed("build", start)
+        start = time.perf_counter()
+    if bounded:
+        result = ThroughputBounds(network, origin_out, targets_out, stats).refine(time_limit, max_augmentations)
+    else:
+        result, source_side = ALGORITHMS[algorithm](network, origin_out, targets_out, stats=stats)
+    if stats is not None:
+        stats.timed("solve", start)
+        start = time.perf_counter()
+    if detailed:
+        result = ThroughputResult(network, len(maxIn), result, source_side)
+        if reduce:
+            result = reduced.expand(result, *original)
+        if stats is not None:
+            stats.timed("expand", start)
+    if stats is not None and stats.callback is not None:
+        stats.callback(stats)
+    return result
 
-    max_flow = 0
-    while True:                                                                    
-        visited = [False] * len(adj_list)                                           # initialises a list with all values set to false to indicate whether a node has been visited in the adjacency list
-        flow = dfs(origin_out, float('inf'), visited, adj_list, targets_out)        # performs dfs
-        if flow == 0:                                                               # if there are not changes, break from the while loop
-            break
-        max_flow += flow                                                            
-    return max_flow
-
-class Node:
-    def __init__(self, char: str) -> None:
+class ThroughputResult:
+    def __init__(self, network: FlowNetwork, datacentres: int, throughput: float, source_side: bytearray) -> None:
         '''
         Function description:
-        This function initialises the class. It serves as the foundation of the node class by storing 
-        several variables.
+        This function initialises the class from the network a solver has finished with. The flow on every
+        forward edge is the capacity of its twin, so the flow on the connections and through the datacentres 
+        are copied out of the capacity array with one strided copy each, in the order of the input.
 
         :Input:
-        argv1 "char": a string that represents a character
+        argv1 "network": the FlowNetwork left by the solver, built by convert_to_flow_network
+        argv2 "datacentres": the number of datacentres
+        argv3 "throughput": the maximum flow found by the solver
+        argv4 "source_side": the bytearray marking the source side of the minimum cut, returned by the solver
 
         :Output, return or postcondition:
+        edge_flow[i] is the flow on connections[i], node_flow[i] is the flow through datacentre i 
 
         :Time complexity:
-        O(1)
+        O(n + m), where n is the number of datacentres and m is the number of connections
 
         :Aux space complexity:
-        O(1)
+        O(n + m), where n is the number of datacentres and m is the number of connections
         '''
-        self.head = char                                                    # represents a character in the Trie
-        self.is_end = False                                                 # boolean used to check whether or not the character is the end of a sentence
-        self.alphabet = [None]*26                                           # represents the next possible chars
-        self.freq = 0                                                       # how often the word is used
-        self.completed_word = None                                          # what word is completed
+        self.network = network
+        self.datacentres = datacentres
+        self.throughput = throughput
+        self.source_side = source_side                                              # marks the in and out nodes on the source side of the cut
+        capacities = memoryview(network.cap)
+        self.node_flow = array(network.typecode)
+        self.node_flow.frombytes(capacities[1:2 * datacentres:2].tobytes())         # twins of the in to out edges
+        self.edge_flow = array(network.typecode)
+        self.edge_flow.frombytes(capacities[2 * datacentres + 1::2].tobytes())      # twins of the connection edges
 
-class CatsTrie:
-    def __init__(self, sentences: list) -> None:
+    def source_datacentres(self) -> list:
         '''
         Function description:
-        initialises the class by creating a root node. the function then proceeds to add the characters from the sentence
-        in the given sentences list, into a trie.
-
-        :Input:
-        argv1 "sentences": a list of words used to "train" the CatsTrie model
-        
-        :Output, return or postcondition:
-        the CatsTrie stores the sentence in sentences as a Trie.
+        returns the datacentres whose out node is on the source side of the minimum cut
 
         :Time complexity:
-        O(N), where N is the number of characters in sentences
+        O(n), where n is the number of datacentres
 
         :Aux space complexity:
-        O(N), where N is the number of characters in sentences
+        O(n), where n is the number of datacentres
         '''
-        self.root = Node("")                                                # cretes the first node and dub it to be the root node
-        self.most_freq_word = ("", 0)                                       # initialises a tuple containing the most frequent word and it's frequency
-        for sentence in sentences:                                          # loops through all of the sentence in sentences 
-            self.add(sentence)                                              # then proceeds to add them to the Trie represented by nodes
+        return [node for node in range(self.datacentres) if self.source_side[2 * node + 1]]
 
-    def char_to_index(self, char:str) -> int:
+    def cut_connections(self) -> list:
         '''
         Function description:
-        basic function to calculate the relative index of a character
+        returns the indices of the connections that cross the minimum cut, which are all saturated
 
-        :Input:
-        argv1 "char": a character to be converted
+        :Time complexity:
+        O(m), where m is the number of connections
 
-        :Output, return or postcondition:
-        returns an integer valure representing the index of the input character
+        :Aux space complexity:
+        O(m), where m is the number of connections
+        '''
+        to = self.network.to
+        return [index for index in range(len(self.edge_flow))
+                if self.source_side[to[2 * (self.datacentres + index) + 1]] and not self.source_side[to[2 * (self.datacentres + index)]]]
+
+    def cut_datacentres(self) -> list:
+        '''
+        Function description:
+        returns the datacentres whose maxIn/maxOut limit crosses the minimum cut, which are all saturated
 
         :Time complexity:
-        O(1)
+        O(n), where n is the number of datacentres
 
         :Aux space complexity:
-        O(1)
+        O(n), where n is the number of datacentres
         '''
-        char_index_list = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 
-                           'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 
-                           's', 't', 'u', 'v', 'w', 'x', 'y', 'z']          # the alphabet
+        return [node for node in range(self.datacentres) if self.source_side[2 * node] and not self.source_side[2 * node + 1]]
 
-        for i in range(len(char_index_list)):                               
-            if char == char_index_list[i]:
-                return int(i)
-
-    def add(self, sentence: str) -> None:
+class ThroughputBounds:
+    def __init__(self, network: FlowNetwork, source: int, targets: list, stats: SolverStats = None) -> None:
         '''
         Function description:
-        Adds a sentence to the CatsTrie. It does so by iterating through a given sentence and traversing through
-        the linked list representing a trie, and creating new nodes representing each character in the sentence.
-        It then updates the attributes of the last node. After that, it goes back to all the nodes that it has visited
-        and updates the attributes of those nodes. Lastly the function keeps track of the most frequent nodes.  
+        This function initialises the class, which solves a network with dinic a bit at a time and always knows
+        how far the answer can be from the maximum flow. The flow found so far is a lower bound. Any cut that
+        separates the source from the targets, with the residual capacity leaving its source side added to the
+        flow, is an upper bound, so the best cut seen is kept. The first ones are the cut around the source and
+        the cut around the targets, and every dinic phase adds the cuts between its levels.
 
         :Input:
-        argv1 "sentence": a string that has its characters placed within the Trie
+        argv1 "network": the FlowNetwork being solved, which is updated in place
+        argv2 "source": int value representing the index of the source node
+        argv3 "targets": list of integers representing the target nodes
+        argv4 "stats": an optional SolverStats that every refine is recorded in
 
         :Output, return or postcondition:
-        None
+        lower is the flow found so far, upper is the capacity of the best cut seen and source_side marks the
+        source side of that cut. complete is set once they are equal and the flow is the maximum flow.
 
         :Time complexity:
-        O(M), where M is the length of the sentence
-                
+        O(V+E), where V is the number of nodes and E is the number of edges
+
         :Aux space complexity:
-        O(M), where M is the length of the sentence
+        O(V), where V is the number of nodes
         '''
-        node = self.root                                                    # makes the start node the root node
-        for char in sentence:
-            index = self.char_to_index(char)
-            if node.alphabet[index] is None:                                # if the next character in the sentence isn't represented in the trie
-                node.alphabet[index] = Node(char)                           # create a new node at the index of the new character symbolizing a branch off from an existing branch)
-            node = node.alphabet[index]                                     # appoint the new node as the starting node to run it back through the loop
-        node.is_end = True                                                  # once the loop finishes, it symbolizes the end of a word, thus the end node will update the boolean to represent that
-        node.freq += 1                                                      # updates the freq of that word being used
-        node.completed_word = sentence                                      # stores the completed sentence in the node
-        self.update(sentence, self.root, node.freq)                         # updates the frequency of all the previous node/char it went by
+        head, next_edge, to, cap = network.head, network.next_edge, network.to, network.cap
+        self.network = network
+        self.source = source
+        self.targets = targets
+        self.stats = stats
+        self.lower = 0
+        self.complete = False
+        self.augmentations = 0
+        self.deadline = None
+        self.augmentation_limit = None
 
-        if node.freq > self.most_freq_word[1]:                              # checks whether or not the current word has a greater frequency then all the other ones we've seen
-            self.most_freq_word = (node.completed_word, node.freq)          # updates the most frequent word
+        is_target = bytearray(len(network))
+        for target in targets:
+            is_target[target] = 1
+        around_source = 0
+        edge = head[source]
+        while edge != -1:                                                           # residual capacity out of the source
+            around_source += cap[edge]
+            edge = next_edge[edge]
+        around_targets = 0
+        for target in set(targets):                                                 # residual capacity into the targets from the other nodes
+            edge = head[target]
+            while edge != -1:
+                if not is_target[to[edge]]:
+                    around_targets += cap[edge ^ 1]
+                edge = next_edge[edge]
+        if around_source <= around_targets:
+            self.upper = around_source
+            self.source_side = bytearray(len(network))
+            self.source_side[source] = 1
+        else:
+            self.upper = around_targets
+            self.source_side = bytearray(b"\x01") * len(network)
+            for target in targets:
+                self.source_side[target] = 0
 
-    def update(self, sentence: str, node: Node, freq: int) -> None:
+    def refine(self, time_limit: float = None, max_augmentations: int = None) -> "ThroughputBounds":
         '''
         Function description:
-        iterates through a given sentence, and then it checks to see whether or not the character is none and whether
-        or not the frequency of the sentence is greater than that of the frequency of the word in the current node.
-        it then updates accordingly and moves on to the next node.
+        carries on solving from the flow found so far, until the flow is the maximum flow or the budget runs out.
+        The budget is checked before every phase and after every augmenting path, so the time limit can be
+        passed by at most one phase's breadth first search.
 
         :Input:
-        argv1 "sentence": a string representing the sentence
-        argv2 "node": a node representing the current position in the trie
-        argv3 "freq": the frequency to be updated
+        argv1 "time_limit": the number of seconds this call may take, or None for no limit
+        argv2 "max_augmentations": the number of augmenting paths this call may use, or None for no limit
+
+        :Output, return or postcondition:
+        returns the bounds, updated
+
+        :Time complexity:
+        at most the time of dinic
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        if self.complete:
+            return self
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.augmentation_limit = None if max_augmentations is None else self.augmentations + max_augmentations
+        if self.lower >= self.upper:
+            self.finish(self.source_side)
+        else:
+            dinic(self.network, self.source, self.targets, self, self.stats)
+        return self
+
+    def out_of_budget(self) -> bool:
+        '''
+        Function description:
+        returns whether the time limit or the augmentation budget of the current refine has run out
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if self.augmentation_limit is not None and self.augmentations >= self.augmentation_limit:
+            return True
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def augmented(self, flow: float) -> bool:
+        '''
+        Function description:
+        counts an augmenting path, and finishes when the flow has reached the best cut seen
+
+        :Input:
+        argv1 "flow": the flow sent along the path
+
+        :Output, return or postcondition:
+        returns whether the flow is now the maximum flow
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.lower += flow
+        self.augmentations += 1
+        if self.lower >= self.upper:
+            self.finish(self.source_side)
+        return self.complete
+
+    def observe_levels(self, level: list) -> bool:
+        '''
+        Function description:
+        offers the cuts of a dinic level graph. The nodes below each level up to the closest target form the
+        source side of a cut, and since a residual edge never skips a level, the residual capacity leaving it is
+        on the edges from the last level of the side to the next one. The smallest of them is kept if it improves
+        on the best cut seen.
+
+        :Input:
+        argv1 "level": the levels from bfs_levels, where -1 means the node can't be reached
+
+        :Output, return or postcondition:
+        returns whether the flow is now the maximum flow
+
+        :Time complexity:
+        O(V+E), where V is the number of nodes and E is the number of edges
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        head, next_edge, to, cap = self.network.head, self.network.next_edge, self.network.to, self.network.cap
+        closest = min(level[target] for target in self.targets if level[target] >= 0)
+        leaving = [0] * closest                                                     # residual capacity from each level to the next
+        for node in range(len(level)):
+            depth = level[node]
+            if 0 <= depth < closest:
+                edge = head[node]
+                while edge != -1:
+                    if cap[edge] > 0 and level[to[edge]] == depth + 1:
+                        leaving[depth] += cap[edge]
+                    edge = next_edge[edge]
+        best = min(range(closest), key=leaving.__getitem__)
+        if self.lower + leaving[best] < self.upper:
+            self.upper = self.lower + leaving[best]
+            self.source_side = bytearray(0 <= depth <= best for depth in level)
+        if self.lower >= self.upper:
+            self.finish(self.source_side)
+        return self.complete
+
+    def finish(self, source_side: bytearray) -> None:
+        '''
+        Function description:
+        records that the flow found is the maximum flow, with the given minimum cut
+
+        :Input:
+        argv1 "source_side": the bytearray marking the source side of a minimum cut
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.upper = self.lower
+        self.source_side = source_side
+        self.complete = True
+
+LINK, PARALLEL, SERIES = 0, 1, 2                                                    # kinds of the edges of a ReducedNetwork
+
+class ReducedNetwork:
+    def __init__(self, datacentre_ids: list, connections: list, records: list, maxIn: list, maxOut: list,
+                 origin_out: int, targets_out: list, back_in: bytearray, back_out: bytearray, cycles: list) -> None:
+        '''
+        Function description:
+        This function initialises the class, which holds the smaller problem made by reduce_datacentres and
+        what is needed to map its results back to the original datacentres and connections. Every reduced
+        connection has a record [capacity, kind, payload]: a LINK is the original connection with the index in
+        payload, a PARALLEL is a list of records between the same datacentres, and a SERIES is a tuple of the
+        record into a contracted datacentre, the datacentre, and the record out of it.
+
+        :Input:
+        argv1 "datacentre_ids": the original id of every reduced datacentre
+        argv2 "connections": the reduced connections
+        argv3 "records": the record of every reduced connection
+        argv4 "maxIn": the maxIn limit of every reduced datacentre
+        argv5 "maxOut": the maxOut limit of every reduced datacentre
+        argv6 "origin_out": the reduced id of the origin
+        argv7 "targets_out": the reduced ids of the targets
+        argv8 "back_in": marks the original datacentres whose in node can reach a target
+        argv9 "back_out": marks the original datacentres whose out node can reach a target
+        argv10 "cycles": the (datacentre, SERIES record) pairs of the cycles that were dropped while contracting
+
+        :Output, return or postcondition:
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.datacentre_ids = datacentre_ids
+        self.connections = connections
+        self.records = records
+        self.maxIn = maxIn
+        self.maxOut = maxOut
+        self.origin_out = origin_out
+        self.targets_out = targets_out
+        self.back_in = back_in
+        self.back_out = back_out
+        self.cycles = cycles
+
+    def expand(self, result: ThroughputResult, connections: list, maxIn: list, maxOut: list) -> ThroughputResult:
+        '''
+        Function description:
+        maps a ThroughputResult of the reduced problem back to the original one. The flow of a SERIES goes
+        through every part of it, and the flow of a PARALLEL is shared out by filling its parts in order.
+        Datacentres that were removed keep no flow and go on the sink side of the cut, except that every in or
+        out node that can't reach a target goes on the source side, since no link leaves it for the sink side,
+        and so does every in node whose out node is there, since the in node only leads to it. A contracted datacentre goes on the same side as its
+        neighbours, unless its reduced connection is cut, in which case it goes on whichever side makes its
+        smallest part the cut one. The capacities of a network built from the original connections are then
+        set to match, so the returned result works the same as one from the original problem.
+
+        :Input:
+        argv1 "result": the ThroughputResult of solving the reduced problem
+        argv2 "connections": the original connections
+        argv3 "maxIn": the original maxIn limits
+        argv4 "maxOut": the original maxOut limits
+
+        :Output, return or postcondition:
+        returns a ThroughputResult for the original connections and datacentres
+
+        :Time complexity:
+        O(n + m), where n is the number of datacentres and m is the number of connections
+
+        :Aux space complexity:
+        O(n + m), where n is the number of datacentres and m is the number of connections
+        '''
+        n = len(maxIn)
+        node_flow = [0] * n
+        edge_flow = [0] * len(connections)
+        side = bytearray(2 * n)
+        for reduced, node in enumerate(self.datacentre_ids):
+            node_flow[node] = result.node_flow[reduced]
+            side[2 * node] = result.source_side[2 * reduced]
+            side[2 * node + 1] = result.source_side[2 * reduced + 1]
+
+        for node in range(n):                                                       # nothing can be cut after a node that can't reach a target
+            if not self.back_in[node]:
+                side[2 * node] = 1
+            if not self.back_out[node]:
+                side[2 * node + 1] = 1
+            if side[2 * node + 1]:                                                  # the in node only leads to the out node, which covers dropped links into it
+                side[2 * node] = 1
+
+        stack = []
+        for index, (from_node, to_node, _) in enumerate(self.connections):
+            from_node, to_node = self.datacentre_ids[from_node], self.datacentre_ids[to_node]
+            stack.append((self.records[index], result.edge_flow[index], side[2 * from_node + 1], side[2 * to_node]))
+        cycles = list(self.cycles)
+        while stack or cycles:
+            if not stack:                                                           # a cycle is expanded once its datacentre has a side, so the last dropped goes first
+                node, record = cycles.pop()
+                stack.append((record, 0, side[2 * node + 1], side[2 * node]))
+                continue
+            (capacity, kind, payload), flow, from_side, to_side = stack.pop()
+            if kind == LINK:
+                edge_flow[payload] = flow
+            elif kind == PARALLEL:
+                for part in payload:                                                # fills the parts in order
+                    share = min(flow, part[0])
+                    flow -= share
+                    stack.append((part, share, from_side, to_side))
+            else:
+                into, node, out_of = payload
+                node_flow[node] = flow
+                if from_side and not to_side:                                       # the record is cut, so the smallest part has to be cut
+                    limit = min(maxIn[node], maxOut[node])
+                    if into[0] <= limit and into[0] <= out_of[0]:
+                        in_side = out_side = 0
+                    elif limit <= out_of[0]:
+                        in_side, out_side = 1, 0
+                    else:
+                        in_side = out_side = 1
+                else:
+                    in_side = out_side = from_side and to_side
+                side[2 * node], side[2 * node + 1] = in_side, out_side
+                stack.append((into, flow, from_side, in_side))
+                stack.append((out_of, flow, out_side, to_side))
+
+        network = convert_to_flow_network(connections, maxIn, maxOut)
+        cap = network.cap
+        for node in range(n):
+            cap[2 * node] -= node_flow[node]
+            cap[2 * node + 1] = node_flow[node]
+        for index in range(len(connections)):
+            edge = 2 * (n + index)
+            cap[edge] -= edge_flow[index]
+            cap[edge + 1] = edge_flow[index]
+        return ThroughputResult(network, n, result.throughput, side)
+
+def reduce_datacentres(connections: list, maxIn: list, maxOut: list, origin_out: int, targets_out: list) -> ReducedNetwork:
+    '''
+    Function description:
+    This function shrinks a throughput problem before it is solved, without changing its maximum flow.
+    A forward sweep from the origin and a backward sweep from the targets over the split in/out nodes keep
+    only the connections that the origin can reach and that can reach a target. Connections with no capacity,
+    connections into the origin or out of a target and self loops are dropped, since flow never uses them.
+    Connections between the same two datacentres are merged by adding their capacities, and every datacentre
+    other than the origin and the targets that is left with one connection in and one out is contracted into
+    a single connection with the smallest of the three capacities. Merging and contracting repeat until
+    neither applies.
+
+    :Input:
+    argv1 "connections": a list of tuples representing the connections between datacentres, in addition to
+    the edge capacity.
+    argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+    argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+    argv4 "origin_out": an integer representing the starting datacentre
+    argv5 "targets_out": a list of integers representing the end datacentres
+
+    :Output, return or postcondition:
+    returns a ReducedNetwork, which always keeps the origin and the targets
+
+    :Time complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+
+    :Aux space complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+    '''
+    n = len(maxIn)
+    limit = [min(maxIn[node], maxOut[node]) for node in range(n)]
+    is_target = [False] * n
+    for target in targets_out:
+        is_target[target] = True
+    outgoing = [[] for _ in range(n)]
+    incoming = [[] for _ in range(n)]
+    for index, (from_node, to_node, capacity) in enumerate(connections):
+        if capacity > 0 and from_node != to_node and to_node != origin_out and not is_target[from_node]:
+            outgoing[from_node].append(index)
+            incoming[to_node].append(index)
+
+    reach_in, reach_out = bytearray(n), bytearray(n)                                # forward sweep from the origin
+    reach_out[origin_out] = 1
+    queue = deque([origin_out])
+    while queue:
+        node = queue.popleft()
+        for index in outgoing[node]:
+            to_node = connections[index][1]
+            reach_in[to_node] = 1
+            if limit[to_node] > 0 and not reach_out[to_node]:
+                reach_out[to_node] = 1
+                queue.append(to_node)
+
+    back_in, back_out = bytearray(n), bytearray(n)                                  # backward sweep from the targets
+    for target in targets_out:
+        back_out[target] = 1
+        if limit[target] > 0 and not back_in[target]:
+            back_in[target] = 1
+            queue.append(target)
+    while queue:
+        node = queue.popleft()
+        for index in incoming[node]:
+            from_node = connections[index][0]
+            back_out[from_node] = 1
+            if limit[from_node] > 0 and from_node != origin_out and not back_in[from_node]:
+                back_in[from_node] = 1
+                queue.append(from_node)
+
+    out_records = [{} for _ in range(n)]                                            # record of the connection between two datacentres, by tail and by head
+    in_records = [{} for _ in range(n)]
+    for node in range(n):
+        if not reach_out[node]:
+            continue
+        for index in outgoing[node]:
+            from_node, to_node, capacity = connections[index]
+            if back_in[to_node]:
+                merge_record(out_records, in_records, from_node, to_node, [capacity, LINK, index])
+
+    cycles = []
+    work = [node for node in range(n)]
+    while work:                                                                     # contracts datacentres with one connection in and one out
+        node = work.pop()
+        if node == origin_out or is_target[node] or len(in_records[node]) != 1 or len(out_records[node]) != 1:
+            continue
+        (from_node, into), = in_records[node].items()
+        (to_node, out_of), = out_records[node].items()
+        del out_records[from_node][node], in_records[to_node][node]
+        in_records[node].clear()
+        out_records[node].clear()
+        record = [min(into[0], limit[node], out_of[0]), SERIES, (into, node, out_of)]
+        if from_node != to_node:
+            merge_record(out_records, in_records, from_node, to_node, record)
+        else:                                                                       # a cycle back to the same datacentre never carries flow
+            cycles.append((from_node, record))
+        work.append(from_node)
+        work.append(to_node)
+
+    kept = [node for node in range(n) if out_records[node] or in_records[node] or node == origin_out or is_target[node]]
+    reduced_id = {node: reduced for reduced, node in enumerate(kept)}
+    reduced_connections, records = [], []
+    for node in kept:
+        for to_node, record in out_records[node].items():
+            reduced_connections.append((reduced_id[node], reduced_id[to_node], record[0]))
+            records.append(record)
+    return ReducedNetwork(kept, reduced_connections, records, [maxIn[node] for node in kept], [maxOut[node] for node in kept],
+                          reduced_id[origin_out], [reduced_id[target] for target in targets_out], back_in, back_out, cycles)
+
+def merge_record(out_records: list, in_records: list, from_node: int, to_node: int, record: list) -> None:
+    '''
+    Function description:
+    adds the record of a connection between two datacentres, merging it with the record already between them.
+
+    :Input:
+    argv1 "out_records": the records of every datacentre by the datacentre they lead to
+    argv2 "in_records": the records of every datacentre by the datacentre they come from
+    argv3 "from_node": the datacentre the connection starts at
+    argv4 "to_node": the datacentre the connection leads to
+    argv5 "record": the record of the connection
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    existing = out_records[from_node].get(to_node)
+    if existing is None:
+        out_records[from_node][to_node] = in_records[to_node][from_node] = record
+    elif existing[1] == PARALLEL:
+        existing[0] += record[0]
+        existing[2].append(record)
+    else:
+        merged = [existing[0] + record[0], PARALLEL, [existing, record]]
+        out_records[from_node][to_node] = in_records[to_node][from_node] = merged
+
+class IncrementalThroughput:
+    def __init__(self, connections: list, maxIn: list, maxOut: list, origin_out: int, targets_out: list, algorithm: str = "dinic") -> None:
+        '''
+        Function description:
+        This function initialises the class by building the flow network and solving it once with the given
+        algorithm. The residual network and the flow are kept afterwards, so that changes to the capacities can
+        repair the current flow instead of solving again from zero. Every repair augments with dinic starting
+        from the flow that is already there. An origin that is also a target raises ValueError.
+
+        :Input:
+        argv1 "connections": a list of tuples representing the connections between datacentres, in addition to
+        the edge capacity.
+        argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+        argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+        argv4 "origin_out": an integer representing the starting node
+        argv5 "targets_out": a list of integers representing the end nodes
+        argv6 "algorithm": the name of the max flow algorithm used for the first solve, one of the keys of ALGORITHMS
+
+        :Output, return or postcondition:
+        throughput holds the maximum flow from the origin to the targets.
+
+        :Time complexity:
+        the time complexity of the chosen algorithm
+
+        :Aux space complexity:
+        O(V+E), where V represents the number of datacentres and E represents the number of edges
+        '''
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown max flow algorithm {algorithm!r}")
+        if origin_out in targets_out:
+            raise ValueError("the origin can't also be a target")
+        self.maxIn = list(maxIn)
+        self.maxOut = list(maxOut)
+        self.datacentres = len(maxIn)
+        self.connection_count = len(connections)
+        self.network = convert_to_flow_network(connections, maxIn, maxOut)
+        self.source = 2 * origin_out + 1
+        self.targets = [2 * t + 1 for t in targets_out]
+        self.is_target = [False] * len(self.network)
+        for target in self.targets:
+            self.is_target[target] = True
+        self.throughput = ALGORITHMS[algorithm](self.network, self.source, self.targets)[0]
+
+    @classmethod
+    def from_network(cls, network: FlowNetwork, maxIn: list, maxOut: list, origin_out: int, targets_out: list, throughput: float) -> "IncrementalThroughput":
+        '''
+        Function description:
+        creates the class around a network built by convert_to_flow_network that already holds a maximum flow,
+        instead of building and solving it again.
+
+        :Input:
+        argv1 "network": the solved FlowNetwork, which is updated in place by later changes
+        argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+        argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+        argv4 "origin_out": an integer representing the starting node
+        argv5 "targets_out": a list of integers representing the end nodes
+        argv6 "throughput": the maximum flow held by the network
+
+        :Output, return or postcondition:
+        returns an IncrementalThroughput using the network
+
+        :Time complexity:
+        O(V), where V is the number of nodes
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        state = cls.__new__(cls)
+        state.maxIn = list(maxIn)
+        state.maxOut = list(maxOut)
+        state.datacentres = len(maxIn)
+        state.connection_count = (len(network.to) - 2 * state.datacentres) // 2
+        state.network = network
+        state.source = 2 * origin_out + 1
+        state.targets = [2 * t + 1 for t in targets_out]
+        state.is_target = [False] * len(network)
+        for target in state.targets:
+            state.is_target[target] = True
+        state.throughput = throughput
+        return state
+
+    def copy(self) -> "IncrementalThroughput":
+        '''
+        Function description:
+        returns a copy with its own capacities, so it can be changed without changing this one.
+
+        :Time complexity:
+        O(V+E), where V is the number of nodes and E is the number of edges
+
+        :Aux space complexity:
+        O(V+E), where V is the number of nodes and E is the number of edges
+        '''
+        return IncrementalThroughput.from_network(self.network.copy(), self.maxIn, self.maxOut, self.source // 2,
+                                                  [target // 2 for target in self.targets], self.throughput)
+
+    def connection_edge(self, index: int) -> int:
+        '''
+        Function description:
+        returns the index of the network edge of connections[index]
+
+        :Input:
+        argv1 "index": the index of the connection
+
+        :Output, return or postcondition:
+        returns the index of the forward edge in the network
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if not 0 <= index < self.connection_count:
+            raise IndexError(f"connection {index} does not exist")
+        return 2 * (self.datacentres + index)
+
+    def update_edge(self, index: int, capacity: float) -> float:
+        '''
+        Function description:
+        changes the capacity of connections[index] and repairs the flow.
+
+        :Input:
+        argv1 "index": the index of the connection
+        argv2 "capacity": the new capacity of the connection
+
+        :Output, return or postcondition:
+        returns the new maximum flow from the origin to the targets
+
+        :Time complexity:
+        O(V^2 * E) in the worst case, where V is the number of nodes and E is the number of edges, but only
+        a few paths are searched when the change is small
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        return self._set_capacity(self.connection_edge(index), capacity)
+
+    def add_edge(self, from_node: int, to_node: int, capacity: float) -> int:
+        '''
+        Function description:
+        adds a new connection between two datacentres and pushes any extra flow it allows.
+
+        :Input:
+        argv1 "from_node": the datacentre the connection starts at
+        argv2 "to_node": the datacentre the connection leads to
+        argv3 "capacity": the capacity of the connection
+
+        :Output, return or postcondition:
+        returns the index of the new connection, which comes after all the existing ones
+
+        :Time complexity:
+        O(V^2 * E) in the worst case, where V is the number of nodes and E is the number of edges
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        self.network.add_edge(2 * from_node + 1, 2 * to_node, capacity)
+        self.connection_count += 1
+        if capacity > 0:
+            self.throughput += dinic(self.network, self.source, self.targets)[0]
+        return self.connection_count - 1
+
+    def remove_edge(self, index: int) -> float:
+        '''
+        Function description:
+        removes connections[index] by setting its capacity to 0, so the indices of the other connections
+        stay the same.
+
+        :Input:
+        argv1 "index": the index of the connection
+
+        :Output, return or postcondition:
+        returns the new maximum flow from the origin to the targets
+
+        :Time complexity:
+        same as update_edge
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        return self.update_edge(index, 0)
+
+    def set_node_limit(self, node: int, maxIn: float = None, maxOut: float = None) -> float:
+        '''
+        Function description:
+        changes the maximum flow into and/or out of a datacentre and repairs the flow.
+
+        :Input:
+        argv1 "node": the datacentre being changed
+        argv2 "maxIn": the new maximum flow into the datacentre, or None to keep the current one
+        argv3 "maxOut": the new maximum flow out of the datacentre, or None to keep the current one
+
+        :Output, return or postcondition:
+        returns the new maximum flow from the origin to the targets
+
+        :Time complexity:
+        same as update_edge
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        if maxIn is not None:
+            self.maxIn[node] = maxIn
+        if maxOut is not None:
+            self.maxOut[node] = maxOut
+        return self._set_capacity(2 * node, min(self.maxIn[node], self.maxOut[node]))
+
+    def _set_capacity(self, edge: int, capacity: float) -> float:
+        '''
+        Function description:
+        changes the capacity of a forward edge of the network. The flow on the edge is read from its twin.
+        If the new capacity still fits the flow, only the residual capacity changes and more flow is pushed
+        when it grew. Otherwise the flow that no longer fits is cancelled with _cancel and the network is
+        augmented again, since other routes may make up for some of it. A capacity that isn't an integer
+        switches a network built from integers to floats first.
+
+        :Input:
+        argv1 "edge": the index of the forward edge
+        argv2 "capacity": the new capacity of the edge
+
+        :Output, return or postcondition:
+        returns the new maximum flow from the origin to the targets
+
+        :Time complexity:
+        O(V^2 * E) in the worst case, where V is the number of nodes and E is the number of edges
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        self.network.fit(capacity)
+        cap, to = self.network.cap, self.network.to
+        flow = cap[edge ^ 1]                                                        # the twin of a forward edge holds the flow on it
+        if capacity >= flow:
+            grew = capacity - flow > cap[edge]
+            cap[edge] = capacity - flow
+            if grew:
+                self.throughput += dinic(self.network, self.source, self.targets)[0]
+        else:
+            cap[edge] = 0
+            cap[edge ^ 1] = capacity
+            self._cancel(to[edge ^ 1], to[edge], flow - capacity)
+            self.throughput += dinic(self.network, self.source, self.targets)[0]
+        return self.throughput
+
+    def _cancel(self, tail: int, head: int, amount: float) -> None:
+        '''
+        Function description:
+        restores a valid flow after the flow on the edge from tail to head was cut by amount, which leaves
+        tail with that much extra flow coming in and head with that much too little. The extra flow at the
+        tail is sent on to the head around the edge where possible and otherwise back to the source.
+        Whatever the head is still missing is then taken back from the targets, or from the source when 
+        the cut edge was part of a cycle through it, and only the part taken from the targets lowers the
+        throughput. Both steps follow residual paths, which always exist because the flow was valid before.
+
+        :Input:
+        argv1 "tail": the node the edge starts at
+        argv2 "head": the node the edge leads to
+        argv3 "amount": the flow removed from the edge
+
+        :Output, return or postcondition:
+        the network holds a valid flow again and throughput is updated
+
+        :Time complexity:
+        O(P * (V+E)), where P is the number of paths used, V is the number of nodes and E is the number of edges
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        cap = self.network.cap
+        missing = amount
+        remaining = amount if tail != self.source else 0
+        rounding = amount * 1e-9 if self.network.typecode == "d" else 0             # float capacities can leave a tiny amount behind
+        while remaining > rounding:                                                        # moves the extra flow at the tail to the head or the source
+            path, goal = self._find_path(tail, {head, self.source}, backward=False)
+            pushed = min(remaining, min(cap[edge] for edge in path))
+            for edge in path:
+                cap[edge] -= pushed
+                cap[edge ^ 1] += pushed
+            remaining -= pushed
+            if goal == head:
+                missing -= pushed
+
+        if self.is_target[head]:                                                    # the head absorbs less flow
+            self.throughput -= missing
+            return
+        goals = set(self.targets)
+        goals.add(self.source)
+        while missing > rounding:                                                   # takes the flow the head is missing back from the targets or the source
+            path, goal = self._find_path(head, goals, backward=True)
+            pushed = min(missing, min(cap[edge] for edge in path))
+            for edge in path:
+                cap[edge] -= pushed
+                cap[edge ^ 1] += pushed
+            missing -= pushed
+            if goal != self.source:
+                self.throughput -= pushed
+
+    def _find_path(self, start: int, goals, backward: bool) -> tuple:
+        '''
+        Function description:
+        breadth first search for a residual path from the start to any goal, or from any goal to the start
+        when backward is set. The search never continues past a target, and only reaches a target backwards
+        through the reverse edge of the flow coming into it, since targets never send flow on.
+
+        :Input:
+        argv1 "start": the node the search starts from
+        argv2 "goals": a set of the nodes the path may end at
+        argv3 "backward": boolean value that searches along reversed residual edges
+
+        :Output, return or postcondition:
+        returns the list of residual edges on the path and the goal that was found
+
+        :Time complexity:
+        O(V+E), where V is the number of nodes and E is the number of edges
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        head, next_edge, to, cap = self.network.head, self.network.next_edge, self.network.to, self.network.cap
+        parent = {start: None}                                                      # residual edge and previous node used to reach each node
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node != start and node in goals:                                     # walks the parents back to the start
+                goal = node
+                path = []
+                while parent[node] is not None:
+                    edge, node = parent[node]
+                    path.append(edge)
+                return path, goal
+            if node != start and self.is_target[node]:
+                continue
+            edge = head[node]
+            while edge != -1:
+                neighbour = to[edge]
+                residual = edge ^ 1 if backward else edge                           # the residual edge runs from neighbour to node when going backward
+                if cap[residual] > 0 and neighbour not in parent:
+                    if not (backward and self.is_target[neighbour] and residual & 1 == 0):
+                        parent[neighbour] = (residual, node)
+                        queue.append(neighbour)
+                edge = next_edge[edge]
+        raise RuntimeError("the residual network holds no valid flow")
+
+def max_throughput_batch(connections: list, maxIn: list, maxOut: list, queries: list, algorithm: str = "dinic", processes: int = None) -> list:
+    '''
+    Function description:
+    This function calculates the maximum throughput for many (origin_out, targets_out) queries on the same datacentres.
+    The flow network is built once and copied into a shared memory block that every worker process attaches to
+    when it starts, so the topology is never pickled per query. Each query then solves its own copy of the
+    capacities, and the results come back in the same order as the queries. A query whose origin is also one
+    of its targets raises ValueError before anything is solved.
+
+    :Input:
+    argv1 "connections": a list of tuples representing the connections between datacentres, in addition to
+    the edge capacity.
+    argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+    argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+    argv4 "queries": a list of (origin_out, targets_out) pairs
+    argv5 "algorithm": the name of the max flow algorithm, one of the keys of ALGORITHMS
+    argv6 "processes": the number of worker processes, None for one per core or 1 to solve in this process
+
+    :Output, return or postcondition:
+    returns a list with the maximum flow for every query, in the order of queries
+
+    :Time complexity:
+    O(V+E) to build the network, plus the time of the chosen algorithm per query, divided over the processes
+
+    :Aux space complexity:
+    O(V+E) shared by all the processes, plus O(E) per process for the capacities being solved
+    '''
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown max flow algorithm {algorithm!r}")
+    network = convert_to_flow_network(connections, maxIn, maxOut)
+    tasks = [(origin_out, list(targets_out), algorithm) for origin_out, targets_out in queries]
+    if any(origin_out in targets_out for origin_out, targets_out, _ in tasks):
+        raise ValueError("the origin of a query can't also be one of its targets")
+    if processes == 1 or len(tasks) <= 1:
+        return [solve_query(network, *task) for task in tasks]
+
+    block, layout = share_network(network)
+    try:
+        with Pool(processes, initializer=attach_network, initargs=(block.name, layout)) as pool:
+            return pool.map(solve_shared_query, tasks)
+    finally:
+        block.close()
+        block.unlink()
+
+def solve_query(network: FlowNetwork, origin_out: int, targets_out: list, algorithm: str) -> float:
+    '''
+    Function description:
+    solves one throughput query on a copy of the capacities of the network, leaving the network unchanged.
+
+    :Input:
+    argv1 "network": the FlowNetwork built from the datacentres
+    argv2 "origin_out": an integer representing the starting datacentre
+    argv3 "targets_out": a list of integers representing the end datacentres
+    argv4 "algorithm": the name of the max flow algorithm, one of the keys of ALGORITHMS
+
+    :Output, return or postcondition:
+    returns the maximum flow from the origin to the targets
+
+    :Time complexity:
+    O(E) for the copy, plus the time of the chosen algorithm
+
+    :Aux space complexity:
+    O(E), where E is the number of edges
+    '''
+    return ALGORITHMS[algorithm](network.copy(), 2 * origin_out + 1, [2 * t + 1 for t in targets_out])[0]
+
+def share_network(network: FlowNetwork) -> tuple:
+    '''
+    Function description:
+    copies the edge arrays of a network into one new shared memory block, capacities first so that every
+    array stays aligned to its item size. The caller owns the block and has to close and unlink it.
+
+    :Input:
+    argv1 "network": the FlowNetwork being shared
+
+    :Output, return or postcondition:
+    returns the SharedMemory block and the layout needed by network_from_buffer to read it back
+
+    :Time complexity:
+    O(V+E), where V is the number of nodes and E is the number of edges
+
+    :Aux space complexity:
+    O(V+E) of shared memory
+    '''
+    parts = [bytes(network.cap), bytes(network.head), bytes(network.next_edge), bytes(network.to)]
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(len(part) for part in parts)))
+    offset = 0
+    for part in parts:
+        block.buf[offset:offset + len(part)] = part
+        offset += len(part)
+    return block, (network.typecode, len(network), len(network.to))
+
+def network_from_buffer(buffer, layout: tuple) -> FlowNetwork:
+    '''
+    Function description:
+    creates a FlowNetwork whose arrays are memoryviews over a buffer written by share_network, without copying it.
+
+    :Input:
+    argv1 "buffer": the buffer holding the arrays
+    argv2 "layout": the typecode, the number of nodes and the number of edges of the network
+
+    :Output, return or postcondition:
+    returns a FlowNetwork reading straight from the buffer
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    typecode, node_count, edge_count = layout
+    view = memoryview(buffer)
+    cap_end = 8 * edge_count
+    head_end = cap_end + 4 * node_count
+    next_end = head_end + 4 * edge_count
+    return FlowNetwork.from_arrays(view[head_end - 4 * node_count:head_end].cast("i"), view[head_end:next_end].cast("i"),
+                                   view[next_end:next_end + 4 * edge_count].cast("i"), view[:cap_end].cast(typecode), typecode)
+
+_shared = {}                                                                        # the shared memory block and network of a worker process
+
+def attach_network(name: str, layout: tuple) -> None:
+    '''
+    Function description:
+    runs once in every worker process of max_throughput_batch and attaches to the shared network.
+
+    :Input:
+    argv1 "name": the name of the shared memory block
+    argv2 "layout": the layout returned by share_network
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    block = shared_memory.SharedMemory(name=name)
+    _shared["block"] = block                                                        # keeps the block open for as long as the worker runs
+    _shared["network"] = network_from_buffer(block.buf, layout)
+
+def solve_shared_query(task: tuple) -> float:
+    '''
+    Function description:
+    solves one query of max_throughput_batch in a worker process against the shared network.
+
+    :Input:
+    argv1 "task": the origin_out, targets_out and algorithm of the query
+
+    :Output, return or postcondition:
+    returns the maximum flow from the origin to the targets
+
+    :Time complexity:
+    O(E) for the copy, plus the time of the chosen algorithm
+
+    :Aux space complexity:
+    O(E), where E is the number of edges
+    '''
+    return solve_query(_shared["network"], *task)
+
+def failure_sweep(connections: list, maxIn: list, maxOut: list, origin_out: int, targets_out: list, algorithm: str = "dinic", processes: int = None) -> list:
+    '''
+    Function description:
+    This function calculates how much throughput is lost when any single connection or datacentre fails.
+    The network is solved once, and a failure that carries none of that flow loses nothing, since the
+    flow is still valid and nothing can be gained by taking capacity away. Every other failure is repaired
+    with IncrementalThroughput from a copy of the solved residual network, which only moves the flow that went
+    through the failed element instead of solving from zero. A datacentre fails by setting its in to out
+    edge to 0, which stops any flow going through it, and the origin failing loses everything. The repairs
+    are shared out over worker processes that attach to the solved network in shared memory.
+
+    :Input:
+    argv1 "connections": a list of tuples representing the connections between datacentres, in addition to
+    the edge capacity.
+    argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+    argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+    argv4 "origin_out": an integer representing the starting datacentre
+    argv5 "targets_out": a list of integers representing the end datacentres
+    argv6 "algorithm": the name of the max flow algorithm used for the first solve, one of the keys of ALGORITHMS
+    argv7 "processes": the number of worker processes, None for one per core or 1 to repair in this process
+
+    :Output, return or postcondition:
+    returns a list with a row ("connection", index, throughput, loss) for every connection followed by a row
+    ("datacentre", index, throughput, loss) for every datacentre, where throughput is the maximum flow left
+    after the failure and loss is how much lower it is than with nothing failed
+
+    :Time complexity:
+    the time of the chosen algorithm once, plus O(V+E) and the repair for every failure that carries flow
+
+    :Aux space complexity:
+    O(V+E) shared by all the processes, plus O(V+E) per process for the repair being done
+    '''
+    base = IncrementalThroughput(connections, maxIn, maxOut, origin_out, targets_out, algorithm)
+    n, cap = len(maxIn), base.network.cap
+    elements = [("connection", index, 2 * (n + index)) for index in range(len(connections))]
+    elements += [("datacentre", node, 2 * node) for node in range(n)]
+    throughput = {}                                                                 # maximum flow left after each failure
+    tasks = []
+    for kind, index, edge in elements:
+        if kind == "datacentre" and index == origin_out:
+            throughput[edge] = 0
+        elif cap[edge ^ 1] == 0:                                                    # the failure carries no flow
+            throughput[edge] = base.throughput
+        else:
+            tasks.append(edge)
+
+    if processes == 1 or len(tasks) <= 1:
+        for edge in tasks:
+            throughput[edge] = base.copy()._set_capacity(edge, 0)
+    else:
+        block, layout = share_network(base.network)
+        try:
+            with Pool(processes, initializer=attach_failure_state,
+                      initargs=(block.name, layout, maxIn, maxOut, origin_out, targets_out, base.throughput)) as pool:
+                throughput.update(zip(tasks, pool.map(solve_shared_failure, tasks)))
+        finally:
+            block.close()
+            block.unlink()
+    return [(kind, index, throughput[edge], base.throughput - throughput[edge]) for kind, index, edge in elements]
+
+def attach_failure_state(name: str, layout: tuple, maxIn: list, maxOut: list, origin_out: int, targets_out: list, throughput: float) -> None:
+    '''
+    Function description:
+    runs once in every worker process of failure_sweep, and attaches to the solved network in shared memory.
+
+    :Input:
+    argv1 "name": the name of the shared memory block
+    argv2 "layout": the layout returned by share_network
+    argv3 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+    argv4 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+    argv5 "origin_out": an integer representing the starting datacentre
+    argv6 "targets_out": a list of integers representing the end datacentres
+    argv7 "throughput": the maximum flow held by the shared network
+
+    :Time complexity:
+    O(V), where V is the number of nodes
+
+    :Aux space complexity:
+    O(V), where V is the number of nodes
+    '''
+    attach_network(name, layout)
+    _shared["state"] = IncrementalThroughput.from_network(_shared["network"], maxIn, maxOut, origin_out, targets_out, throughput)
+
+def solve_shared_failure(edge: int) -> float:
+    '''
+    Function description:
+    repairs the shared solved network of failure_sweep after the failure of one edge, in a worker process.
+
+    :Input:
+    argv1 "edge": the index of the forward edge that fails
+
+    :Output, return or postcondition:
+    returns the maximum flow left after the failure
+
+    :Time complexity:
+    O(V+E) for the copy, plus the time of the repair
+
+    :Aux space complexity:
+    O(V+E), where V is the number of nodes and E is the number of edges
+    '''
+    return _shared["state"].copy()._set_capacity(edge, 0)
+
+class ThroughputIndex:
+    def __init__(self, connections: list, maxIn: list, maxOut: list, algorithm: str = "dinic") -> None:
+        '''
+        Function description:
+        This function initialises the class by building an index that answers the maximum throughput between any
+        two datacentres. When the index can be exact, it is a Gomory-Hu flow tree built with Gusfield's method,
+        using n - 1 max flow computations, after which every pair is answered by the smallest weight on the tree
+        path between them. A tree only describes the cuts of an undirected graph, so it is exact only when every
+        link has a link of the same capacity going back, and no maxIn/maxOut limit can be smaller than the links
+        coming into that datacentre, in which case each in/out pair of the split graph can be merged into one 
+        node without changing any cut. Otherwise exact is False, reason says why, and every pair is solved on 
+        the split graph the first time it is asked for and cached under its origin.
+
+        :Input:
+        argv1 "connections": a list of tuples representing the connections between datacentres, in addition to
+        the edge capacity.
+        argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+        argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+        argv4 "algorithm": the name of the max flow algorithm, one of the keys of ALGORITHMS
+
+        :Output, return or postcondition:
+        the index is ready to answer throughput queries
+
+        :Time complexity:
+        O(n * F), where n is the number of datacentres and F is the time of one max flow, when exact, otherwise O(n + m)
+
+        :Aux space complexity:
+        O(n + m), where n is the number of datacentres and m is the number of connections
+        '''
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown max flow algorithm {algorithm!r}")
+        self.datacentres = len(maxIn)
+        self.algorithm = algorithm
+        self.network = convert_to_flow_network(connections, maxIn, maxOut)
+        self.exact, self.reason = cut_tree_exactness(connections, maxIn, maxOut)
+        self.parent = None                                                          # parent of every datacentre in the tree, rooted at 0
+        self.weight = None                                                          # max flow between every datacentre and its parent
+        self.depth = None
+        self.rows = {}                                                              # cached results of inexact queries, by origin and then target
+        if self.exact:
+            self._build_tree(connections)
+
+    def _build_tree(self, connections: list) -> None:
+        '''
+        Function description:
+        builds the flow tree with Gusfield's method. Every datacentre s is cut from its current parent t, and
+        the datacentres after s that are on the same side of the minimum cut as s and share its parent are 
+        moved under s. The cuts are taken on the merged graph, where every link is an undirected edge.
+
+        :Input:
+        argv1 "connections": a list of tuples representing the connections between datacentres
+
+        :Output, return or postcondition:
+        parent, weight and depth describe the tree
+
+        :Time complexity:
+        O(n * F), where n is the number of datacentres and F is the time of one max flow
+
+        :Aux space complexity:
+        O(n + m), where n is the number of datacentres and m is the number of connections
+        '''
+        n = self.datacentres
+        merged = FlowNetwork(n, self.network.typecode)
+        for from_node, to_node, capacity in connections:
+            if from_node != to_node:
+                merged.add_edge(from_node, to_node, capacity)                       # the links are symmetric, so each only adds its own direction
+        self.parent = [0] * n
+        self.weight = [0] * n
+        for s in range(1, n):
+            t = self.parent[s]
+            network = merged.copy()
+            self.weight[s], source_side = ALGORITHMS[self.algorithm](network, s, [t])
+            for v in range(s + 1, n):
+                if source_side[v] and self.parent[v] == t:
+                    self.parent[v] = s
+        self._set_depths()
+
+    def _set_depths(self) -> None:
+        '''
+        Function description:
+        computes the depth of every datacentre in the tree, so paths can be walked up to where they meet.
+
+        :Time complexity:
+        O(n), where n is the number of datacentres
+
+        :Aux space complexity:
+        O(n), where n is the number of datacentres
+        '''
+        self.depth = [-1] * self.datacentres
+        if self.datacentres:
+            self.depth[0] = 0
+        for node in range(self.datacentres):
+            chain = []
+            while self.depth[node] < 0:                                             # climbs until a datacentre with a known depth
+                chain.append(node)
+                node = self.parent[node]
+            for above in reversed(chain):
+                self.depth[above] = self.depth[self.parent[above]] + 1
+
+    def throughput(self, origin_out: int, target_out: int) -> float:
+        '''
+        Function description:
+        returns the maximum throughput from the origin to the target. When the index is exact this is the 
+        smallest weight on the tree path between them, otherwise it is solved once and cached.
+
+        :Input:
+        argv1 "origin_out": an integer representing the starting datacentre
+        argv2 "target_out": an integer representing the end datacentre
+
+        :Output, return or postcondition:
+        returns the maximum flow from the origin to the target
+
+        :Time complexity:
+        O(n), where n is the number of datacentres, when exact, otherwise the time of one max flow the first time
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if origin_out == target_out:
+            raise ValueError("the origin and the target must be different datacentres")
+        if self.exact:
+            best = float("inf")
+            a, b = origin_out, target_out
+            while a != b:                                                           # walks the deeper end up until both ends meet
+                if self.depth[a] < self.depth[b]:
+                    a, b = b, a
+                best = min(best, self.weight[a])
+                a = self.parent[a]
+            return best
+
+        row = self.rows.setdefault(origin_out, {})
+        if target_out not in row:
+            if self.network is None:
+                raise LookupError(f"throughput from {origin_out} to {target_out} is not cached and the index has no network")
+            row[target_out] = solve_query(self.network, origin_out, [target_out], self.algorithm)
+        return row[target_out]
+
+    def save(self, path: str) -> None:
+        '''
+        Function description:
+        writes the tree, or the cached results of an inexact index, to a json file.
+
+        :Input:
+        argv1 "path": the file being written
+
+        :Time complexity:
+        O(n + q), where n is the number of datacentres and q is the number of cached results
+
+        :Aux space complexity:
+        O(n + q), where n is the number of datacentres and q is the number of cached results
+        '''
+        with open(path, "w") as file:
+            json.dump({"version": 1, "datacentres": self.datacentres, "algorithm": self.algorithm, "exact": self.exact,
+                       "reason": self.reason, "parent": self.parent, "weight": self.weight,
+                       "rows": {origin: list(row.items()) for origin, row in self.rows.items()}}, file)
+
+    @classmethod
+    def load(cls, path: str, connections: list = None, maxIn: list = None, maxOut: list = None) -> "ThroughputIndex":
+        '''
+        Function description:
+        reads an index written by save. An inexact index can only solve pairs that are not cached yet when 
+        the datacentres are given again.
+
+        :Input:
+        argv1 "path": the file being read
+        argv2 "connections": optionally, the connections the index was built from
+        argv3 "maxIn": optionally, the maxIn limits the index was built from
+        argv4 "maxOut": optionally, the maxOut limits the index was built from
+
+        :Output, return or postcondition:
+        returns the ThroughputIndex stored in the file
+
+        :Time complexity:
+        O(n + q), where n is the number of datacentres and q is the number of cached results
+
+        :Aux space complexity:
+        O(n + q), where n is the number of datacentres and q is the number of cached results
+        '''
+        with open(path) as file:
+            data = json.load(file)
+        if data["version"] != 1:
+            raise ValueError(f"unsupported index version {data['version']}")
+        index = cls.__new__(cls)
+        index.datacentres = data["datacentres"]
+        index.algorithm = data["algorithm"]
+        index.exact, index.reason = data["exact"], data["reason"]
+        index.parent, index.weight = data["parent"], data["weight"]
+        index.rows = {int(origin): dict(row) for origin, row in data["rows"].items()}
+        index.network = convert_to_flow_network(connections, maxIn, maxOut) if connections is not None else None
+        index.depth = None
+        if index.exact:
+            index._set_depths()
+        return index
+
+def cut_tree_exactness(connections: list, maxIn: list, maxOut: list) -> tuple:
+    '''
+    Function description:
+    checks whether a flow tree can give the exact throughput between every pair of datacentres. The links
+    have to be symmetric, with the same total capacity in both directions between every pair, and the 
+    smaller of maxIn and maxOut of every datacentre has to be at least the total capacity of the links into
+    it, since then a cut through the datacentre is never smaller than the cut through the links into it.
+
+    :Input:
+    argv1 "connections": a list of tuples representing the connections between datacentres
+    argv2 "maxIn": a list of numeric values that dictates the total maximum flow into a datacentre
+    argv3 "maxOut": a list numeric values that dictates the total maximum flow out from a datacentre
+
+    :Output, return or postcondition:
+    returns True and an empty string if the tree is exact, otherwise False and the reason
+
+    :Time complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+
+    :Aux space complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+    '''
+    link = {}
+    incoming = [0] * len(maxIn)
+    for from_node, to_node, capacity in connections:
+        link[(from_node, to_node)] = link.get((from_node, to_node), 0) + capacity
+        incoming[to_node] += capacity
+    for (from_node, to_node), capacity in link.items():
+        if from_node != to_node and link.get((to_node, from_node), 0) != capacity:
+            return False, f"the links between datacentres {from_node} and {to_node} have different capacities in each direction"
+    for node in range(len(maxIn)):
+        if min(maxIn[node], maxOut[node]) < incoming[node]:
+            return False, f"the maxIn/maxOut limit of datacentre {node} is smaller than the links into it"
+    return True, ""
+
+def write_edge_list(path: str, connections: list) -> None:
+    '''
+    Function description:
+    writes connections as a binary edge list, three native 64 bit integers (from, to, capacity) per connection,
+    which is the format load_flow_network maps into memory.
+
+    :Input:
+    argv1 "path": the file being written
+    argv2 "connections": a list of tuples representing the connections between datacentres, with integer capacities
+
+    :Time complexity:
+    O(m), where m is the number of connections
+
+    :Aux space complexity:
+    O(m), where m is the number of connections
+    '''
+    records = array("q")
+    for connection in connections:
+        records.extend(connection)
+    with open(path, "wb") as file:
+        records.tofile(file)
+
+def write_node_limits(path: str, limits: list) -> None:
+    '''
+    Function description:
+    writes maxIn or maxOut as one native 64 bit integer per datacentre.
+
+    :Input:
+    argv1 "path": the file being written
+    argv2 "limits": a list of integer limits, where the index represents the datacentre
+
+    :Time complexity:
+    O(n), where n is the number of datacentres
+
+    :Aux space complexity:
+    O(n), where n is the number of datacentres
+    '''
+    with open(path, "wb") as file:
+        array("q", limits).tofile(file)
+
+def map_int64_file(path: str) -> memoryview:
+    '''
+    Function description:
+    maps a file of native 64 bit integers read only into memory and returns it as a memoryview of integers.
+    Pages are only read from disk when they are touched.
+
+    :Input:
+    argv1 "path": the file being mapped
+
+    :Output, return or postcondition:
+    returns a memoryview of the integers in the file
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1), the file is shared with the page cache
+    '''
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return memoryview(array("q"))
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)               # the mapping stays valid after the file is closed
+    if hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return memoryview(mapped).cast("q")
+
+def read_csv_numbers(path: str, columns: int, chunk_bytes: int = 1 << 20) -> array:
+    '''
+    Function description:
+    reads the comma separated integers of a csv file a chunk of lines at a time into one array, without a list
+    or tuple for any line. Each chunk is joined into one string and split once, so the only Python objects made
+    per value are the short lived strings and integers of parsing, which text can't avoid. Empty lines and
+    lines starting with # are skipped.
+
+    :Input:
+    argv1 "path": the file being read
+    argv2 "columns": the number of integers on every line
+    argv3 "chunk_bytes": roughly how many bytes are read at a time
+
+    :Output, return or postcondition:
+    returns an array of 64 bit integers holding the lines one after another
+
+    :Time complexity:
+    O(s), where s is the size of the file
+
+    :Aux space complexity:
+    O(v + chunk_bytes), where v is the number of integers in the file
+    '''
+    values = array("q")
+    with open(path) as file:
+        while True:
+            lines = file.readlines(chunk_bytes)
+            if not lines:
+                break
+            text = ",".join(line for line in lines if line.strip() and not line.lstrip().startswith("#"))
+            if text:
+                values.extend(map(int, text.split(",")))                            # int skips the spaces and newlines around each value
+    if len(values) % columns:
+        raise ValueError(f"every line of {path} must hold {columns} integers")
+    return values
+
+def peak_rss_kb() -> int:
+    '''
+    Function description:
+    reads the peak resident memory of the whole process so far.
+
+    :Output, return or postcondition:
+    returns the peak in kilobytes, or None where it can't be measured
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":                                                    # macOS reports bytes instead of kilobytes
+        peak //= 1024
+    return peak
+
+def load_flow_network(edges_path: str, max_in_path: str, max_out_path: str, chunk_edges: int = 1 << 16) -> tuple:
+    '''
+    Function description:
+    This function builds the split in/out node FlowNetwork of convert_to_flow_network straight from files,
+    without ever holding the connections as a list of tuples. Files ending in .csv are read as text, with
+    one "from,to,capacity" connection or one limit per line, into a flat array of integers by read_csv_numbers.
+    Any other file is read as native 64 bit integers, as written by write_edge_list and write_node_limits, and
+    binary edge lists are mapped into memory. All the edge arrays are allocated once at full size, and the edge
+    list is then worked through a chunk at a time: the capacity column is copied into place with one strided
+    memoryview copy per chunk, and only the node links are set one edge at a time. The edge numbering is the
+    same as convert_to_flow_network, so the network can be solved with solve_query or any algorithm in ALGORITHMS.
+    A csv edge list is held whole as 24 bytes per connection while the network is built, and parsing it still
+    makes short lived strings and integers for every value.
+
+    :Input:
+    argv1 "edges_path": the file of connections
+    argv2 "max_in_path": the file of maxIn limits, one per datacentre
+    argv3 "max_out_path": the file of maxOut limits, one per datacentre
+    argv4 "chunk_edges": the number of connections handled at a time
+
+    :Output, return or postcondition:
+    returns the FlowNetwork and a dictionary with the number of datacentres and connections, the seconds taken,
+    peak_rss_kb, the peak resident memory of the whole process in kilobytes, which includes anything it did
+    before loading, and rss_growth_kb, how much loading raised that peak, which is 0 if the process had already
+    used more. Both are None where they can't be measured.
+
+    :Time complexity:
+    O(n + m), where n is the number of datacentres and m is the number of connections
+
+    :Aux space complexity:
+    O(n + m) for the network, plus O(chunk_edges) while reading a binary edge list
+    '''
+    rss_before = peak_rss_kb()
+    start = time.perf_counter()
+    limits = []
+    for path in (max_in_path, max_out_path):
+        if path.endswith(".csv"):
+            limits.append(read_csv_numbers(path, 1))
+        else:
+            limits.append(map_int64_file(path))
+    maxIn, maxOut = limits
+    if len(maxIn) != len(maxOut):
+        raise ValueError("maxIn and maxOut must have a limit for every datacentre")
+    n = len(maxIn)
+
+    if edges_path.endswith(".csv"):
+        records = read_csv_numbers(edges_path, 3)
+    else:
+        records = map_int64_file(edges_path)
+        if len(records) % 3:
+            raise ValueError("a binary edge list must hold three integers per connection")
+    m = len(records) // 3
+    edge_count = 2 * (n + m)
+    network = FlowNetwork.from_arrays(array("i", [-1]) * (2 * n), array("i", bytes(4 * edge_count)),
+                                      array("i", bytes(4 * edge_count)), array("q", bytes(8 * edge_count)), "q")
+    head, next_edge, to, cap = network.head, network.next_edge, network.to, network.cap
+    for node in range(n):                                                       # the in to out edge of every datacentre, in the same order as add_edge
+        edge = 2 * node
+        cap[edge] = min(maxIn[node], maxOut[node])
+        to[edge], to[edge + 1] = 2 * node + 1, 2 * node
+        next_edge[edge], next_edge[edge + 1] = head[2 * node], head[2 * node + 1]
+        head[2 * node], head[2 * node + 1] = edge, edge + 1
+
+    cap_view = memoryview(cap)
+    for first in range(0, m, chunk_edges):
+        last = min(first + chunk_edges, m)
+        chunk = records[3 * first:3 * last]
+        if last > first and (min(chunk[0::3]) < 0 or max(chunk[0::3]) >= n or min(chunk[1::3]) < 0 or max(chunk[1::3]) >= n):
+            raise ValueError(f"a connection between {first} and {last - 1} refers to a datacentre that has no limits")
+        cap_view[2 * (n + first):2 * (n + last):2] = chunk[2::3]                # copies the capacity column without touching single values
+        edge = 2 * (n + first)
+        for from_node, to_node in zip(chunk[0::3], chunk[1::3]):                # links the edge and its twin into the lists of their nodes
+            out_from, in_to = 2 * from_node + 1, 2 * to_node
+            to[edge], to[edge + 1] = in_to, out_from
+            next_edge[edge], next_edge[edge + 1] = head[out_from], head[in_to]
+            head[out_from], head[in_to] = edge, edge + 1
+            edge += 2
+
+    rss_after = peak_rss_kb()
+    return network, {"datacentres": n, "connections": m, "seconds": time.perf_counter() - start, "peak_rss_kb": rss_after,
+                     "rss_growth_kb": None if rss_after is None else rss_after - rss_before}
+
+SNAPSHOT_MAGIC = b"FBNETWRK"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sHcc4xqqqq")                                     # magic, version, byte order, typecode, datacentres, nodes, edges, data offset
+SNAPSHOT_OFFSET = 4096                                                              # the edge arrays start on their own page
+
+def save_network_snapshot(path: str, network: FlowNetwork, datacentres: int) -> None:
+    '''
+    Function description:
+    This function saves a network built by convert_to_flow_network or load_flow_network as a versioned binary
+    snapshot. A header page holds the version, the byte order, the typecode of the capacities and the sizes,
+    and is followed by the capacity, head, next_edge and to arrays in the same layout as share_network.
+    Datacentre i keeps the in and out nodes 2 * i and 2 * i + 1, its in to out edge is 2 * i and connections[j]
+    is edge 2 * (n + j), with every twin at e ^ 1, so no id mapping has to be stored. The file is written
+    next to the path and moved into place, so a worker never maps a half written snapshot.
+
+    :Input:
+    argv1 "path": the file being written
+    argv2 "network": the FlowNetwork being saved, before it is solved
+    argv3 "datacentres": the number of datacentres
+
+    :Output, return or postcondition:
+    the snapshot can be opened with NetworkSnapshot
+
+    :Time complexity:
+    O(V+E), where V is the number of nodes and E is the number of edges
+
+    :Aux space complexity:
+    O(1) besides the arrays of the network
+    '''
+    if len(network) != 2 * datacentres:
+        raise ValueError("the network must have an in and an out node for every datacentre")
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, b"<" if sys.byteorder == "little" else b">",
+                                  network.typecode.encode(), datacentres, len(network), len(network.to), SNAPSHOT_OFFSET)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as file:
+        file.write(header.ljust(SNAPSHOT_OFFSET, b"\0"))
+        for values in (network.cap, network.head, network.next_edge, network.to):
+            file.write(memoryview(values).cast("B"))
+    os.replace(partial, path)
+
+class NetworkSnapshot:
+    def __init__(self, path: str) -> None:
+        '''
+        Function description:
+        This function initialises the class by mapping a snapshot written by save_network_snapshot read only into
+        memory, after checking its header. Nothing is read or built up front, so opening a snapshot takes the
+        same time for any size of network, and every process that maps the same file shares one copy of it in
+        the page cache. network reads straight from the mapping and can't be solved in place. Every solve instead
+        gets its own copy on write mapping of the file from residual, where only the pages of capacities that
+        the solve changes are copied.
+
+        :Input:
+        argv1 "path": the snapshot file
+
+        :Output, return or postcondition:
+        network is the read only FlowNetwork of the snapshot and datacentres is the number of datacentres
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1), the file is shared with the page cache
+        '''
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        header = self.file.read(SNAPSHOT_HEADER.size)
+        if len(header) < SNAPSHOT_HEADER.size or header[:8] != SNAPSHOT_MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a network snapshot")
+        magic, version, byteorder, typecode, datacentres, node_count, edge_count, offset = SNAPSHOT_HEADER.unpack(header)
+        if version != SNAPSHOT_VERSION:
+            self.file.close()
+            raise ValueError(f"{path} is a version {version} snapshot, but only version {SNAPSHOT_VERSION} can be read")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            self.file.close()
+            raise ValueError(f"{path} was written on a machine with the other byte order")
+        if size != offset + 8 * edge_count + 4 * node_count + 8 * edge_count:
+            self.file.close()
+            raise ValueError(f"{path} is truncated or has extra data")
+        self.datacentres = datacentres
+        self.layout = (typecode.decode(), node_count, edge_count)
+        self.offset = offset
+        self.size = size
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.network = network_from_buffer(memoryview(self.mapping)[offset:], self.layout)
+
+    def residual(self) -> FlowNetwork:
+        '''
+        Function description:
+        returns a network that shares the read only edge structure, with capacities from a private copy on
+        write mapping of the file, so it can be solved without changing the snapshot or any other solve.
+
+        :Output, return or postcondition:
+        returns a FlowNetwork that can be solved in place
+
+        :Time complexity:
+        O(1), plus O(1) for every page of capacities the solve changes
+
+        :Aux space complexity:
+        O(P), where P is the number of pages of capacities that the solve changes
+        '''
+        typecode, node_count, edge_count = self.layout
+        private = mmap.mmap(self.file.fileno(), self.offset + 8 * edge_count, access=mmap.ACCESS_COPY)
+        cap = memoryview(private)[self.offset:].cast(typecode)
+        network = self.network
+        return FlowNetwork.from_arrays(network.head, network.next_edge, network.to, cap, typecode)
+
+    def throughput(self, origin_out: int, targets_out: list, algorithm: str = "dinic") -> float:
+        '''
+        Function description:
+        calculates the maximum flow from the origin datacentre to the target datacentres on a residual copy.
+
+        :Input:
+        argv1 "origin_out": an integer representing the starting datacentre
+        argv2 "targets_out": a list of integers representing the end datacentres
+        argv3 "algorithm": the name of the max flow algorithm, one of the keys of ALGORITHMS
+
+        :Output, return or postcondition:
+        returns the maximum flow from the origin to the targets
+
+        :Time complexity:
+        the time of the chosen algorithm
+
+        :Aux space complexity:
+        the space of the chosen algorithm, plus the pages of capacities it changes
+        '''
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown max flow algorithm {algorithm!r}")
+        return ALGORITHMS[algorithm](self.residual(), 2 * origin_out + 1, [2 * t + 1 for t in targets_out])[0]
+
+    def close(self) -> None:
+        '''
+        Function description:
+        closes the snapshot file. The mapping itself is released once no network uses it anymore.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.file.close()
+
+
+CATS_SNAPSHOT_MAGIC = b"CATSTRIE"
+CATS_SNAPSHOT_VERSION = 3
+CATS_SNAPSHOT_HEADER = struct.Struct("<8sHccc3xqqqqq")                      # magic, version, byte order, kind, typecode of the counts, k_max, nodes, sentences, text bytes, data offset
+CATS_SNAPSHOT_OFFSET = 4096                                                 # the arrays start on their own page
+
+class CatsTrie:
+    snapshot_kind = b"C"                                                    # marks the layout of the arrays in a snapshot
+    def __init__(self, sentences: list, k_max: int = 10) -> None:
+        '''
+        Function description:
+        initialises the class by creating a root node. the function then proceeds to add the characters from the sentence
+        in the given sentences list, into a trie, all at once with build. The nodes aren't objects: every node is an
+        index into flat arrays, where char holds the character leading to the node, first_child and next_sibling link
+        the children of a node together in alphabetical order, and top holds the ids of the k_max best sentences
+        that start with the prefix of each node, best first, in the k_max slots from node * k_max, and terminal the
+        sentence that ends at each node. Every distinct sentence is stored once in the sentences table, with its
+        frequency in counts.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+        argv2 "k_max": the most completions autoComplete can return for a prompt
+
+        :Output, return or postcondition:
+        the CatsTrie stores the sentence in sentences as a Trie.
+
+        :Time complexity:
+        O(N * k_max), where N is the number of characters in sentences
+
+        :Aux space complexity:
+        O(N * k_max), where N is the number of characters in sentences
+        '''
+        if k_max < 1:
+            raise ValueError("k_max must be at least 1")
+        self.k_max = k_max
+        self.empty = array("i", [-1]) * k_max                               # the top slots of a new node
+        self.char = array("I", [0])                                         # the character leading to each node, as a code point
+        self.first_child = array("i", [-1])                                 # the first child of each node, -1 if there is none
+        self.next_sibling = array("i", [-1])                                # the next child of the same parent, -1 at the end
+        self.top = array("i", self.empty)                                   # the ids of the best sentences through each node, -1 for unused slots
+        self.terminal = array("i", [-1])                                    # the id of the sentence that ends at each node, -1 if none does
+        self.sentences = []                                                 # every distinct sentence, where the index is its id
+        self.sentence_ids = {}                                              # the id of every sentence
+        self.counts = array("q")                                            # how often each sentence has been added, as floats once decayed
+        self.most_freq_word = ("", 0)                                       # initialises a tuple containing the most frequent word and it's frequency
+        self.build(sentences)
+
+    def build(self, sentences: list) -> None:
+        '''
+        Function description:
+        adds every sentence to an empty trie in one go, which is much faster than calling add for each of them.
+        Duplicate sentences are counted first, and the distinct ones are sorted, so every sentence shares the
+        longest prefix it can with the one before it. A stack holds the nodes of the previous sentence, the nodes
+        past the shared prefix are popped, and the rest of the sentence is added as the last children, which
+        keeps the siblings in alphabetical order. A sentence's own node is never reached by an earlier sentence,
+        so its list of best sentences starts as just itself, and every popped node merges its list into the list of
+        its parent, so the lists of every node are settled bottom up without a second pass. Since the ids follow
+        the sorted order, a smaller id means a lexicographically smaller sentence.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+
+        :Output, return or postcondition:
+        the CatsTrie stores the sentence in sentences as a Trie.
+
+        :Time complexity:
+        O(N * k_max + S log S * M), where N is the number of characters in sentences, S is the number of distinct
+        sentences and M is the length of the longest one, for the sort
+
+        :Aux space complexity:
+        O(N * k_max), where N is the number of characters in sentences
+        '''
+        if len(self.char) > 1 or self.top[0] != -1:
+            raise ValueError("build needs an empty CatsTrie")
+        frequency = {}
+        for sentence in sentences:                                          # counts the duplicate sentences up front
+            frequency[sentence] = frequency.get(sentence, 0) + 1
+        self.sentences = sorted(frequency)
+        self.sentence_ids = {sentence: sentence_id for sentence_id, sentence in enumerate(self.sentences)}
+        self.counts = array("q", [frequency[sentence] for sentence in self.sentences])
+
+        char, first_child, next_sibling, top, empty = self.char, self.first_child, self.next_sibling, self.top, self.empty
+        terminal = self.terminal
+        last_child = [-1]                                                   # the last child of every node added so far
+        stack = [0]                                                         # the nodes of the previous sentence, the root first
+        bests = [[]]                                                        # the best sentences found so far for every node on the stack
+        previous = ""
+        for sentence_id, sentence in enumerate(self.sentences):
+            shared = 0
+            limit = min(len(previous), len(sentence))
+            while shared < limit and previous[shared] == sentence[shared]:
+                shared += 1
+            while len(stack) > shared + 1:                                  # hands the best sentences of every popped node up to its parent
+                self.settle(stack, bests)
+            node = stack[-1]
+            for character in sentence[shared:]:                             # the rest of the sentence becomes a chain of new last children
+                new = len(char)
+                char.append(ord(character))
+                first_child.append(-1)
+                next_sibling.append(-1)
+                top.extend(empty)
+                terminal.append(-1)
+                last_child.append(-1)
+                if last_child[node] == -1:
+                    first_child[node] = new
+                else:
+                    next_sibling[last_child[node]] = new
+                last_child[node] = new
+                node = new
+                stack.append(node)
+                bests.append([])
+            terminal[node] = sentence_id
+            bests[-1] = [sentence_id]
+            previous = sentence
+        while stack:
+            self.settle(stack, bests)
+        if top[0] != -1:
+            self.most_freq_word = (self.sentences[top[0]], self.counts[top[0]])
+
+    def settle(self, stack: list, bests: list) -> None:
+        '''
+        Function description:
+        pops the deepest node off the stack of build, stores its best sentences and merges them into its parent's.
+        Most nodes are part of a chain with nothing else below the parent yet, and they hand their list up as it is.
+
+        :Input:
+        argv1 "stack": the nodes being built, the root first
+        argv2 "bests": the best sentences found so far for every node on the stack
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        node, best = stack.pop(), bests.pop()
+        start = node * self.k_max
+        for slot, sentence_id in enumerate(best, start):
+            self.top[slot] = sentence_id
+        if bests:
+            bests[-1] = self.merge_best(bests[-1], best) if bests[-1] else best
+
+    def merge_best(self, best: list, other: list) -> list:
+        '''
+        Function description:
+        merges two lists of the best sentences of different nodes, keeping the k_max best. It is only used by build,
+        where a smaller id means a lexicographically smaller sentence.
+
+        :Input:
+        argv1 "best": a list of sentence ids, best first
+        argv2 "other": another list of sentence ids, best first, with none in common with best
+
+        :Output, return or postcondition:
+        returns the merged list of at most k_max sentence ids, best first
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        counts = self.counts
+        merged = []
+        i = j = 0
+        while len(merged) < self.k_max and (i < len(best) or j < len(other)):
+            if j == len(other) or (i < len(best) and (counts[best[i]] > counts[other[j]] or
+                                                      (counts[best[i]] == counts[other[j]] and best[i] < other[j]))):
+                merged.append(best[i])
+                i += 1
+            else:
+                merged.append(other[j])
+                j += 1
+        return merged
+
+    def better(self, sentence_id: int, other_id: int) -> bool:
+        '''
+        Function description:
+        decides whether one sentence is a better completion than another. The more frequent sentence wins, and
+        when they are used equally often the lexicographically smaller one wins.
+
+        :Input:
+        argv1 "sentence_id": the id of the sentence being compared
+        argv2 "other_id": the id of the sentence it is compared to, or -1 for no sentence
+
+        :Output, return or postcondition:
+        returns True if the first sentence is the better completion
+
+        :Time complexity:
+        O(M), where M is the length of the shorter sentence, only when the frequencies are equal
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if other_id == -1:
+            return True
+        count, other_count = self.counts[sentence_id], self.counts[other_id]
+        return count > other_count or (count == other_count and self.sentences[sentence_id] < self.sentences[other_id])
+
+    def promote(self, node: int, sentence_id: int) -> None:
+        '''
+        Function description:
+        puts a sentence that just became more frequent into its place in the list of best sentences of a node.
+        If it is already in the list it moves up past the sentences it now beats, and otherwise it goes in when
+        there is a free slot or it beats the last one, which then drops out.
+
+        :Input:
+        argv1 "node": the node whose list is updated
+        argv2 "sentence_id": the id of the sentence that became more frequent
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(k_max * M), where M is the length of the longest sentence, since ties compare the sentences
+
+        :Aux space complexity:
+        O(1)
+        '''
+        top = self.top
+        start = node * self.k_max
+        slot, end = start, start + self.k_max
+        while slot < end and top[slot] != -1 and top[slot] != sentence_id:
+            slot += 1
+        if slot == end:                                                     # the list is full and doesn't hold the sentence
+            slot = end - 1
+            if not self.better(sentence_id, top[slot]):
+                return
+        while slot > start and self.better(sentence_id, top[slot - 1]):     # moves the sentences it beats down one slot
+            top[slot] = top[slot - 1]
+            slot -= 1
+        top[slot] = sentence_id
+
+    def add(self, sentence: str) -> None:
+        '''
+        Function description:
+        Adds a sentence to the CatsTrie. It does so by iterating through a given sentence and traversing through
+        the trie, creating new nodes for the characters that aren't there yet in alphabetical order among their
+        siblings. Since adding a sentence only makes that sentence more frequent, the only change to the list of
+        best sentences of every node on the way is that this one moves up or comes in, so both are settled in the
+        same pass. Lastly the function keeps track of the most frequent sentence, which is the best of the root.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(M * k_max), where M is the length of the sentence
+
+        :Aux space complexity:
+        O(M * k_max), where M is the length of the sentence
+        '''
+        sentence_id = self.sentence_ids.get(sentence)
+        if sentence_id is None:                                             # interns the sentence the first time it is seen
+            sentence_id = len(self.sentences)
+            self.sentence_ids[sentence] = sentence_id
+            self.sentences.append(sentence)
+            self.counts.append(0)
+        self.counts[sentence_id] += 1
+
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = 0                                                            # makes the start node the root node
+        self.promote(node, sentence_id)
+        for character in sentence:
+            code = ord(character)
+            previous, child = -1, first_child[node]
+            while child != -1 and char[child] < code:                       # finds the child, or where it belongs among the siblings
+                previous, child = child, next_sibling[child]
+            if child == -1 or char[child] != code:                          # if the next character in the sentence isn't represented in the trie
+                new = len(char)
+                char.append(code)
+                first_child.append(-1)
+                next_sibling.append(child)
+                self.top.extend(self.empty)
+                self.terminal.append(-1)
+                if previous == -1:
+                    first_child[node] = new
+                else:
+                    next_sibling[previous] = new
+                child = new
+            node = child
+            self.promote(node, sentence_id)                                 # this section is extremely important since it dictates the most likely sentence from each prompt
+        self.terminal[node] = sentence_id
+        self.most_freq_word = (self.sentences[self.top[0]], self.counts[self.top[0]])
+
+    def remove(self, sentence: str, count: int = 1) -> None:
+        '''
+        Function description:
+        takes a sentence away from the CatsTrie count times, or for as often as it has been added if that is less.
+        A sentence with nothing left is no longer suggested, while its nodes stay in the trie. Since the sentence
+        can drop out of a list and let in one that wasn't there, the lists of the nodes on its path are
+        recomputed bottom up, each from the lists of its children and the sentence ending there, so no subtree is
+        ever searched.
+
+        :Input:
+        argv1 "sentence": a string that was added to the CatsTrie
+        argv2 "count": how many times it is taken away, more than 0
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(M * C * k_max * log(C * k_max)), where M is the length of the sentence and C is the most children a
+        node on its path has
+
+        :Aux space complexity:
+        O(M + C * k_max), where M is the length of the sentence and C is the most children a node on its path has
+        '''
+        if count <= 0:
+            raise ValueError("count must be more than 0")
+        sentence_id = self.sentence_ids.get(sentence)
+        if sentence_id is None or self.counts[sentence_id] <= 0:
+            raise ValueError(f"{sentence!r} isn't in the CatsTrie")
+        self.counts[sentence_id] = max(self.counts[sentence_id] - count, 0)
+        nodes, depths = [0], [0]
+        self.descend(sentence, nodes, depths)                               # the path of the sentence, the root first
+        for node in reversed(nodes):
+            self.recompute(node)
+        best = self.top[0]
+        self.most_freq_word = ("", 0) if best == -1 else (self.sentences[best], self.counts[best])
+
+    def recompute(self, node: int) -> None:
+        '''
+        Function description:
+        works the list of best sentences of a node out again from the lists of its children and the sentence that
+        ends at it, which are the best sentences of every part of its subtree.
+
+        :Input:
+        argv1 "node": the node whose list is recomputed, after the lists of its children are right
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(C * k_max * log(C * k_max)), where C is the number of children of the node
+
+        :Aux space complexity:
+        O(C * k_max), where C is the number of children of the node
+        '''
+        top, counts, k_max = self.top, self.counts, self.k_max
+        candidates = []
+        own = self.terminal[node]
+        if own != -1 and counts[own] > 0:
+            candidates.append(own)
+        child = self.first_child[node]
+        while child != -1:                                                  # every child's list is already best first
+            for sentence_id in top[child * k_max:child * k_max + k_max]:
+                if sentence_id == -1:
+                    break
+                candidates.append(sentence_id)
+            child = self.next_sibling[child]
+        candidates.sort(key=lambda sentence_id: (-counts[sentence_id], self.sentences[sentence_id]))
+        del candidates[k_max:]
+        candidates.extend([-1] * (k_max - len(candidates)))
+        top[node * k_max:node * k_max + k_max] = array("i", candidates)
+
+    def decay(self, factor: float) -> None:
+        '''
+        Function description:
+        scales the frequency of every sentence by factor, so old traffic counts for less than what is added after.
+        Scaling every frequency alike keeps their order, so the lists of best sentences only change where a
+        sentence has aged out: one whose frequency falls below the smallest normal float, where scaling would
+        first lose precision and then reach 0, is taken out like remove takes out a sentence with nothing left.
+        Counts become floats the first time.
+
+        :Input:
+        argv1 "factor": the scale, more than 0 and at most 1
 
         :Output, return or postcondition:
         None
 
         :Time complexity:
+        O(S + A * M * C * k_max * log(C * k_max)), where S is the number of distinct sentences, A is the number
+        that age out, M is the length of the longest of them and C is the most children a node on their paths has
+
+        :Aux space complexity:
+        O(S + M + C * k_max), where S is the number of distinct sentences, M is the length of the longest that
+        ages out and C is the most children a node on its path has
+        '''
+        if not 0 < factor <= 1:
+            raise ValueError("factor must be more than 0 and at most 1")
+        counts = self.counts = array("d", [count * factor for count in self.counts])
+        aged = [sentence_id for sentence_id, count in enumerate(counts) if 0 < count < sys.float_info.min]
+        for sentence_id in aged:
+            counts[sentence_id] = 0
+        for sentence_id in aged:                                            # each path is recomputed once all are 0
+            nodes, depths = [0], [0]
+            self.descend(self.sentences[sentence_id], nodes, depths)
+            for node in reversed(nodes):
+                self.recompute(node)
+        best = self.top[0]
+        self.most_freq_word = ("", 0) if best == -1 else (self.sentences[best], self.counts[best])
+
+    def copy(self) -> "CatsTrie":
+        '''
+        Function description:
+        returns a copy with its own arrays and sentence table, so it can be changed without changing this one.
+        The arrays are copied whole, which is much faster than building the trie again.
+
+        :Output, return or postcondition:
+        returns a trie of the same class that answers the same as this one
+
+        :Time complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        trie = object.__new__(type(self))
+        for name, value in self.__dict__.items():
+            setattr(trie, name, value.copy() if isinstance(value, (list, dict)) else value[:] if isinstance(value, array) else value)
+        return trie
+
+    def reader_copy(self) -> "CatsTrie":
+        '''
+        Function description:
+        returns a copy that is only read from, for ConcurrentCatsTrie to publish. Only the flat arrays are copied.
+        The sentences list is shared, which is safe since sentences are only ever appended and the copy never
+        looks past the ids it knows, and sentence_ids is left out, since answering prompts never uses it. The copy
+        can't be changed, and this trie can only be changed by adding, removing and decaying.
+
+        :Output, return or postcondition:
+        returns a trie of the same class that answers the same as this one does now
+
+        :Time complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences, as copies of
+        flat arrays
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        trie = object.__new__(type(self))
+        for name, value in self.__dict__.items():
+            setattr(trie, name, value[:] if isinstance(value, array) else value)
+        trie.sentence_ids = None
+        return trie
+
+    def find_node(self, prompt: str) -> int:
+        '''
+        Function description:
+        follows the characters of a prompt down from the root.
+
+        :Input:
+        argv1 "prompt": a given string
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the length of the prompt
+
+        :Aux space complexity:
+        O(1)
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = 0
+        for character in prompt:                                            # iterates through the characters in the prompt
+            code = ord(character)
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:                          # checks to se if the prompt can be predicted
+                return -1
+            node = child                                                    # updates the current node to reflect the next next character in the prompt
+        return node
+
+    def autoComplete(self, prompt:str, k:int = None):
+        '''
+        Function description:
+        the function takes in a given prompt, using the characters from the prompt it iterates through the trie.
+        Once it completes it's iteration, the node that it finishes on will have stored in it the most likely word,
+        and the k most likely ones when k is given, so the size of the matching part of the trie never matters.
+
+        Approach description (if main function):
+        :Input:
+        argv1 "prompt": a given string
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns the most likely sentence, or None if there is none. With k, returns a list of up to k sentences,
+        most likely first, with ties going to the lexicographically smaller sentence.
+
+        :Time complexity:
+        O(X + Y), where X is the length of the prompt and Y is the length of the most frequence sentence in sentences,
+        or O(X + k) with k
+
+        :Aux space complexity:
+        O(1), or O(k) with k
+        '''
+        if k is not None and not 0 <= k <= self.k_max:
+            raise ValueError(f"k must be between 0 and k_max, which is {self.k_max}")
+        if prompt == "" and k is None:                                      # checks to see if there was a prompt given
+            return self.most_freq_word[0]                                   # if not then it will return the most frequent word
+
+        return self.completions(self.find_node(prompt), k)
+
+    def completions(self, node: int, k: int = None):
+        '''
+        Function description:
+        reads the completions of the prefix of a node from its list of best sentences.
+
+        :Input:
+        argv1 "node": the node reached by a prompt, or -1 if no sentence starts with it
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns the most likely sentence, or None if there is none. With k, returns a list of up to k sentences,
+        most likely first.
+
+        :Time complexity:
+        O(Y), where Y is the length of the most likely sentence, or O(k) with k
+
+        :Aux space complexity:
+        O(1), or O(k) with k
+        '''
+        if k is None:                                                       # a node whose sentences were all removed has no best one
+            return None if node == -1 or self.top[node * self.k_max] == -1 else self.sentences[self.top[node * self.k_max]]
+        if node == -1:                                                      # if it is an unpredictable prompt, there are no completions
+            return []
+        start = node * self.k_max
+        return [self.sentences[sentence_id] for sentence_id in self.top[start:start + k] if sentence_id != -1]
+
+    def descend(self, prompt: str, nodes: list, depths: list) -> int:
+        '''
+        Function description:
+        carries on following a prompt down from the last node of a path that a part of it already reached.
+
+        :Input:
+        argv1 "prompt": a given string, which starts with the prefix of the last node of the path
+        argv2 "nodes": the nodes on the path, the root first, which the nodes reached are added to
+        argv3 "depths": the length of the prefix every node on the path ends at
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the number of characters of the prompt past the path
+
+        :Aux space complexity:
+        O(X), where X is the number of characters of the prompt past the path
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node, depth = nodes[-1], depths[-1]
+        for character in prompt[depth:]:
+            code = ord(character)
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            node = child
+            depth += 1
+            nodes.append(node)
+            depths.append(depth)
+        return node
+
+    def autoComplete_many(self, prompts: list, k: int = None) -> list:
+        '''
+        Function description:
+        answers autoComplete for a batch of prompts, walking the trie once for every distinct path instead of once
+        for every prompt. The distinct prompts are sorted, so every prompt shares the longest prefix it can with
+        the one before it, and the path of the previous prompt is kept. Only the nodes past the shared prefix are
+        dropped, and the walk goes on from the deepest node left.
+
+        :Input:
+        argv1 "prompts": a list of prompts
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns what autoComplete returns for every prompt, in the order of prompts
+
+        :Time complexity:
+        O(P + D log D * X), where P is the number of distinct prompts plus the number of distinct prefixes of them,
+        D is the number of distinct prompts and X is the length of the longest one, for the sort
+
+        :Aux space complexity:
+        O(D + X), where D is the number of distinct prompts and X is the length of the longest one
+        '''
+        if k is not None and not 0 <= k <= self.k_max:
+            raise ValueError(f"k must be between 0 and k_max, which is {self.k_max}")
+        answers = {}
+        nodes, depths = [0], [0]                                            # the path of the previous prompt, the root first
+        previous = ""
+        for prompt in sorted(set(prompts)):
+            if prompt.startswith(previous):                                 # keystrokes of one user extend the prompt before
+                shared = len(previous)
+            else:
+                shared = 0
+                limit = min(len(previous), len(prompt))
+                while shared < limit and previous[shared] == prompt[shared]:
+                    shared += 1
+            while depths[-1] > shared:                                      # keeps the nodes the prompts share
+                nodes.pop()
+                depths.pop()
+            if prompt == "" and k is None:
+                answers[prompt] = self.most_freq_word[0]
+            else:
+                answers[prompt] = self.completions(self.descend(prompt, nodes, depths), k)
+            previous = prompt
+        return [answers[prompt] for prompt in prompts]
+
+    def snapshot_arrays(self) -> list:
+        '''
+        Function description:
+        lists the arrays of the nodes in the order a snapshot stores them.
+
+        :Output, return or postcondition:
+        returns the char, first_child, next_sibling and top arrays
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return [self.char, self.first_child, self.next_sibling, self.top]
+
+    def snapshot_parts(self) -> list:
+        '''
+        Function description:
+        lays the trie out as a versioned binary snapshot. A header page holds the version, the byte order, the
+        kind of trie and the sizes, and is followed by the counts, the offset of every sentence in the text, the
+        arrays of the nodes and lastly the text, which is every sentence encoded as UTF-8 one after another.
+        The 8 byte arrays come first so every array starts aligned.
+
+        :Output, return or postcondition:
+        returns the parts of the snapshot as buffers, to be written one after another
+
+        :Time complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+
+        :Aux space complexity:
+        O(N + S), where N is the number of characters in the sentences and S is the number of sentences
+        '''
+        encoded = [sentence.encode("utf-8", "surrogatepass") for sentence in self.sentences]
+        offsets = array("q", [0])
+        for text in encoded:
+            offsets.append(offsets[-1] + len(text))
+        arrays = self.snapshot_arrays()
+        header = CATS_SNAPSHOT_HEADER.pack(CATS_SNAPSHOT_MAGIC, CATS_SNAPSHOT_VERSION, b"<" if sys.byteorder == "little" else b">",
+                                           self.snapshot_kind, memoryview(self.counts).format.encode(), self.k_max, len(arrays[0]), len(encoded), offsets[-1], CATS_SNAPSHOT_OFFSET)
+        parts = [header.ljust(CATS_SNAPSHOT_OFFSET, b"\0"), memoryview(self.counts).cast("B"), memoryview(offsets).cast("B")]
+        parts.extend(memoryview(values).cast("B") for values in arrays)
+        parts.append(b"".join(encoded))
+        return parts
+
+    def save(self, path: str) -> None:
+        '''
+        Function description:
+        saves the trie as a snapshot that FrozenCatsTrie.load can map. The file is written next to the path and
+        moved into place, so a worker never maps a half written snapshot.
+
+        :Input:
+        argv1 "path": the file being written
+
+        :Output, return or postcondition:
+        the snapshot can be opened with FrozenCatsTrie.load
+
+        :Time complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+
+        :Aux space complexity:
+        O(N + S), where N is the number of characters in the sentences and S is the number of sentences
+        '''
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as file:
+            for part in self.snapshot_parts():
+                file.write(part)
+        os.replace(partial, path)
+
+    def freeze(self) -> "FrozenCatsTrie":
+        '''
+        Function description:
+        makes a read only copy of the trie, laid out in one buffer the same way as a saved snapshot.
+
+        :Output, return or postcondition:
+        returns a FrozenCatsTrie that answers the same as the trie does now
+
+        :Time complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+
+        :Aux space complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+        '''
+        return FrozenCatsTrie(b"".join(self.snapshot_parts()))
+
+class RadixCatsTrie(CatsTrie):
+    snapshot_kind = b"R"
+
+    def __init__(self, sentences: list, k_max: int = 10) -> None:
+        '''
+        Function description:
+        initialises the class, a CatsTrie where every run of nodes with a single child is merged into one edge.
+        The edge into every node is labelled with a slice of one of the stored sentences, kept as the id of the
+        sentence in label_sentence, where the slice starts in label_start and its length in label_length, so no
+        strings are copied. char still holds the first character of the label, which keeps the siblings in
+        alphabetical order and lets a lookup pick the right child from one character.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+        argv2 "k_max": the most completions autoComplete can return for a prompt
+
+        :Output, return or postcondition:
+        the RadixCatsTrie stores the sentence in sentences as a path compressed Trie.
+
+        :Time complexity:
+        O(N + S * k_max), where N is the number of characters in sentences and S is the number of distinct sentences,
+        besides the sort
+
+        :Aux space complexity:
+        O(S * k_max), where S is the number of distinct sentences, besides the sentences themselves
+        '''
+        self.label_sentence = array("i", [-1])                              # the sentence the label of each node is a slice of
+        self.label_start = array("i", [0])                                  # where the label starts in that sentence
+        self.label_length = array("i", [0])                                 # the number of characters in the label
+        super().__init__(sentences, k_max)
+
+    def new_node(self, sentence_id: int, start: int, length: int, next_sibling: int) -> int:
+        '''
+        Function description:
+        adds a node with no children whose label is a slice of a sentence.
+
+        :Input:
+        argv1 "sentence_id": the id of the sentence the label is a slice of
+        argv2 "start": where the label starts in the sentence
+        argv3 "length": the number of characters in the label, at least 1
+        argv4 "next_sibling": the next child of the same parent
+
+        :Output, return or postcondition:
+        returns the new node
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        node = len(self.char)
+        self.char.append(ord(self.sentences[sentence_id][start]))
+        self.first_child.append(-1)
+        self.next_sibling.append(next_sibling)
+        self.top.extend(self.empty)
+        self.terminal.append(-1)
+        self.label_sentence.append(sentence_id)
+        self.label_start.append(start)
+        self.label_length.append(length)
+        return node
+
+    def split(self, node: int, length: int) -> int:
+        '''
+        Function description:
+        splits the edge into a node after length characters. The node keeps its place among its siblings with the
+        first part of the label, and a new node under it takes the rest, with the children, the sentence ending
+        there and the best sentences the node had, since every sentence through the node went on through the whole edge.
+
+        :Input:
+        argv1 "node": the node whose edge is split
+        argv2 "length": the number of characters kept above the split, between 1 and the label length - 1
+
+        :Output, return or postcondition:
+        returns the new node, the only child of node
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        lower = self.new_node(self.label_sentence[node], self.label_start[node] + length, self.label_length[node] - length, -1)
+        self.first_child[lower] = self.first_child[node]
+        self.first_child[node] = lower
+        self.label_length[node] = length
+        self.terminal[lower], self.terminal[node] = self.terminal[node], -1
+        k_max = self.k_max
+        self.top[lower * k_max:lower * k_max + k_max] = self.top[node * k_max:node * k_max + k_max]
+        return lower
+
+    def build(self, sentences: list) -> None:
+        '''
+        Function description:
+        adds every sentence to an empty trie in one go, the same way as CatsTrie.build. Besides the nodes of the
+        previous sentence the stack holds how deep each one ends, and when the shared prefix ends inside the edge
+        into a popped node, that edge is split there first. The rest of the sentence is always a single new edge.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+
+        :Output, return or postcondition:
+        the RadixCatsTrie stores the sentence in sentences as a path compressed Trie.
+
+        :Time complexity:
+        O(N + S * k_max + S log S * M), where N is the number of characters in sentences, S is the number of
+        distinct sentences and M is the length of the longest one, for the sort
+
+        :Aux space complexity:
+        O(S * k_max), where S is the number of distinct sentences
+        '''
+        if len(self.char) > 1 or self.top[0] != -1:
+            raise ValueError("build needs an empty CatsTrie")
+        frequency = {}
+        for sentence in sentences:                                          # counts the duplicate sentences up front
+            frequency[sentence] = frequency.get(sentence, 0) + 1
+        self.sentences = sorted(frequency)
+        self.sentence_ids = {sentence: sentence_id for sentence_id, sentence in enumerate(self.sentences)}
+        self.counts = array("q", [frequency[sentence] for sentence in self.sentences])
+
+        first_child, next_sibling = self.first_child, self.next_sibling
+        stack = [0]                                                         # the nodes of the previous sentence, the root first
+        bests = [[]]                                                        # the best sentences found so far for every node on the stack
+        depths = [0]                                                        # the length of the prefix each node on the stack ends at
+        previous = ""
+        for sentence_id, sentence in enumerate(self.sentences):
+            shared = 0
+            limit = min(len(previous), len(sentence))
+            while shared < limit and previous[shared] == sentence[shared]:
+                shared += 1
+            last_child = -1                                                 # the last child of the top of the stack, the last node popped
+            while depths[-1] > shared:
+                if depths[-2] < shared:                                     # the shared prefix ends inside the edge, which is split there
+                    node = stack[-1]
+                    stack[-1] = self.split(node, shared - depths[-2])
+                    stack.insert(-1, node)
+                    bests.insert(-1, [])
+                    depths.insert(-1, shared)
+                last_child = stack[-1]
+                self.settle(stack, bests)
+                depths.pop()
+            if shared < len(sentence):                                      # the rest of the sentence becomes one new last child
+                new = self.new_node(sentence_id, shared, len(sentence) - shared, -1)
+                if last_child == -1:
+                    first_child[stack[-1]] = new
+                else:
+                    next_sibling[last_child] = new
+                stack.append(new)
+                bests.append([])
+                depths.append(len(sentence))
+            self.terminal[stack[-1]] = sentence_id
+            bests[-1] = [sentence_id]
+            previous = sentence
+        while stack:
+            self.settle(stack, bests)
+        if self.top[0] != -1:
+            self.most_freq_word = (self.sentences[self.top[0]], self.counts[self.top[0]])
+
+    def add(self, sentence: str) -> None:
+        '''
+        Function description:
+        Adds a sentence to the RadixCatsTrie, the same way as CatsTrie.add, one edge at a time. When the sentence
+        leaves an edge part of the way along, or ends inside it, the edge is split there, and whatever is left of
+        the sentence becomes a single new edge.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(M + E * k_max), where M is the length of the sentence and E is the number of edges on its path
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        sentence_id = self.sentence_ids.get(sentence)
+        if sentence_id is None:                                             # interns the sentence the first time it is seen
+            sentence_id = len(self.sentences)
+            self.sentence_ids[sentence] = sentence_id
+            self.sentences.append(sentence)
+            self.counts.append(0)
+        self.counts[sentence_id] += 1
+
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = depth = 0                                                    # starts at the root, with none of the sentence matched
+        self.promote(node, sentence_id)
+        while depth < len(sentence):
+            code = ord(sentence[depth])
+            previous, child = -1, first_child[node]
+            while child != -1 and char[child] < code:                       # finds the child, or where it belongs among the siblings
+                previous, child = child, next_sibling[child]
+            if child == -1 or char[child] != code:                          # the rest of the sentence is a new edge
+                new = self.new_node(sentence_id, depth, len(sentence) - depth, child)
+                if previous == -1:
+                    first_child[node] = new
+                else:
+                    next_sibling[previous] = new
+                self.promote(new, sentence_id)
+                node = new
+                break
+            label, start, length = self.sentences[self.label_sentence[child]], self.label_start[child], self.label_length[child]
+            shared, limit = 1, min(length, len(sentence) - depth)
+            while shared < limit and label[start + shared] == sentence[depth + shared]:
+                shared += 1
+            if shared < length:                                             # the sentence leaves the edge or ends inside it
+                self.split(child, shared)
+            node = child
+            depth += shared
+            self.promote(node, sentence_id)
+        self.terminal[node] = sentence_id
+        self.most_freq_word = (self.sentences[self.top[0]], self.counts[self.top[0]])
+
+    def find_node(self, prompt: str) -> int:
+        '''
+        Function description:
+        follows the prompt down from the root one edge at a time. A prompt that ends inside an edge reaches the
+        node below it, since every sentence with that prefix goes on along the rest of the edge.
+
+        :Input:
+        argv1 "prompt": a given string
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the length of the prompt
+
+        :Aux space complexity:
+        O(X), where X is the length of the prompt
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = depth = 0
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            length = self.label_length[child]
+            if not self.sentences[self.label_sentence[child]].startswith(prompt[depth:depth + length], self.label_start[child]):
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += length
+        return node
+
+    def descend(self, prompt: str, nodes: list, depths: list) -> int:
+        '''
+        Function description:
+        carries on following a prompt down from the last node of a path one edge at a time. A node reached by
+        a prompt that ends inside its edge is still added, with the depth its whole edge ends at, so another
+        prompt only keeps it when it shares the whole edge.
+
+        :Input:
+        argv1 "prompt": a given string, which starts with the prefix of the last node of the path
+        argv2 "nodes": the nodes on the path, the root first, which the nodes reached are added to
+        argv3 "depths": the length of the prefix every node on the path ends at
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the number of characters of the prompt past the path
+
+        :Aux space complexity:
+        O(X), where X is the number of characters of the prompt past the path
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node, depth = nodes[-1], depths[-1]
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            length = self.label_length[child]
+            if not self.sentences[self.label_sentence[child]].startswith(prompt[depth:depth + length], self.label_start[child]):
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += length
+            nodes.append(node)
+            depths.append(depth)
+        return node
+
+    def snapshot_arrays(self) -> list:
+        '''
+        Function description:
+        lists the arrays of the nodes in the order a snapshot stores them, with the labels after the ones every
+        CatsTrie has. A snapshot also stores where every label starts in the UTF-8 text of its sentence and how
+        many bytes it takes, so a FrozenCatsTrie compares prompts with the text without decoding it.
+
+        :Output, return or postcondition:
+        returns the char, first_child, next_sibling, top, label_sentence, label_start, label_length, label_byte_start
+        and label_byte_length arrays
+
+        :Time complexity:
+        O(V), where V is the number of nodes, when the sentences are ASCII, otherwise O(V * M), where M is the
+        length of the longest sentence
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        byte_start = array("i", self.label_start)
+        byte_length = array("i", self.label_length)
+        for node in range(1, len(self.char)):
+            sentence = self.sentences[self.label_sentence[node]]
+            if not sentence.isascii():                                      # a character can take more than one byte
+                start, end = self.label_start[node], self.label_start[node] + self.label_length[node]
+                byte_start[node] = len(sentence[:start].encode("utf-8", "surrogatepass"))
+                byte_length[node] = len(sentence[start:end].encode("utf-8", "surrogatepass"))
+        return super().snapshot_arrays() + [self.label_sentence, self.label_start, self.label_length, byte_start, byte_length]
+
+class SentenceTable:
+    def __init__(self, offsets: memoryview, text: memoryview) -> None:
+        '''
+        Function description:
+        initialises the class, the sentences of a snapshot, which are only decoded when they are looked up.
+
+        :Input:
+        argv1 "offsets": where every sentence starts in text, followed by the length of text
+        argv2 "text": every sentence encoded as UTF-8 one after another
+
+        :Output, return or postcondition:
+        the SentenceTable can be indexed by sentence id like the sentences list of a CatsTrie
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.offsets = offsets
+        self.text = text
+
+    def __len__(self) -> int:
+        '''
+        Function description:
+        counts the sentences in the table.
+
+        :Output, return or postcondition:
+        returns the number of sentences
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return len(self.offsets) - 1
+
+    def __getitem__(self, sentence_id: int) -> str:
+        '''
+        Function description:
+        decodes one sentence from the text.
+
+        :Input:
+        argv1 "sentence_id": the id of the sentence
+
+        :Output, return or postcondition:
+        returns the sentence
+
+        :Time complexity:
+        O(M), where M is the length of the sentence
+
+        :Aux space complexity:
         O(M), where M is the length of the sentence
+        '''
+        if not 0 <= sentence_id < len(self.offsets) - 1:
+            raise IndexError("sentence id out of range")
+        return str(self.text[self.offsets[sentence_id]:self.offsets[sentence_id + 1]], "utf-8", "surrogatepass")
+
+class FrozenCatsTrie(CatsTrie):
+    def __init__(self, buffer) -> None:
+        '''
+        Function description:
+        initialises the class over a snapshot of a CatsTrie or a RadixCatsTrie, after checking its header. The
+        arrays are read straight from the buffer and the sentences are only decoded when they are returned, so
+        nothing is unpacked up front and a trie of any size opens in the same time. It can't be changed.
+
+        :Input:
+        argv1 "buffer": the snapshot, as bytes or a mapping of the file
+
+        :Output, return or postcondition:
+        the FrozenCatsTrie answers autoComplete like the trie the snapshot was made from
+
+        :Time complexity:
+        O(M), where M is the length of the most frequent sentence
+
+        :Aux space complexity:
+        O(M), where M is the length of the most frequent sentence, the buffer is shared
+        '''
+        view = memoryview(buffer)
+        header = bytes(view[:CATS_SNAPSHOT_HEADER.size])
+        if len(header) < CATS_SNAPSHOT_HEADER.size or header[:8] != CATS_SNAPSHOT_MAGIC:
+            raise ValueError("not a CatsTrie snapshot")
+        magic, version, byteorder, kind, typecode, k_max, node_count, sentence_count, text_size, offset = CATS_SNAPSHOT_HEADER.unpack(header)
+        if version != CATS_SNAPSHOT_VERSION:
+            raise ValueError(f"a version {version} snapshot, but only version {CATS_SNAPSHOT_VERSION} can be read")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            raise ValueError("the snapshot was written on a machine with the other byte order")
+        if kind not in (b"C", b"R"):
+            raise ValueError(f"unknown kind of trie {kind!r}")
+        if typecode not in (b"q", b"d"):
+            raise ValueError(f"unknown typecode of the counts {typecode!r}")
+        labels = 5 if kind == b"R" else 0
+        if len(view) != offset + 8 * sentence_count + 8 * (sentence_count + 1) + 4 * node_count * (3 + k_max + labels) + text_size:
+            raise ValueError("the snapshot is truncated or has extra data")
+
+        def take(typecode: str, length: int) -> memoryview:               # the next array of the snapshot
+            nonlocal offset
+            size = length * (4 if typecode in "Ii" else 8)
+            part = view[offset:offset + size].cast(typecode)
+            offset += size
+            return part
+
+        self.snapshot_kind = kind
+        self.k_max = k_max
+        self.counts = take(typecode.decode(), sentence_count)
+        offsets = take("q", sentence_count + 1)
+        self.char = take("I", node_count)
+        self.first_child = take("i", node_count)
+        self.next_sibling = take("i", node_count)
+        self.top = take("i", node_count * k_max)
+        if labels:
+            self.label_sentence = take("i", node_count)
+            self.label_start = take("i", node_count)
+            self.label_length = take("i", node_count)
+            self.label_byte_start = take("i", node_count)
+            self.label_byte_length = take("i", node_count)
+        self.sentences = SentenceTable(offsets, view[offset:])
+        self.buffer = buffer
+        self.text_start = offset                                            # where the text starts in the buffer
+        self.file = None
+        best = self.top[0]
+        self.most_freq_word = ("", 0) if best == -1 else (self.sentences[best], self.counts[best])
+
+    @classmethod
+    def load(cls, path: str) -> "FrozenCatsTrie":
+        '''
+        Function description:
+        maps a snapshot written by save read only into memory. Every process that loads the same file shares
+        one copy of it in the page cache, and only the pages that lookups touch are ever read from disk.
+
+        :Input:
+        argv1 "path": the snapshot file
+
+        :Output, return or postcondition:
+        returns the FrozenCatsTrie of the snapshot
+
+        :Time complexity:
+        O(M), where M is the length of the most frequent sentence
+
+        :Aux space complexity:
+        O(M), where M is the length of the most frequent sentence, the file is shared with the page cache
+        '''
+        file = open(path, "rb")
+        try:
+            trie = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (ValueError, OSError) as error:
+            file.close()
+            raise ValueError(f"{path} can't be loaded: {error}") from error
+        trie.file = file
+        return trie
+
+    def build(self, sentences: list) -> None:
+        '''
+        Function description:
+        refuses to add sentences, since a snapshot is read only.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
 
         :Aux space complexity:
         O(1)
         '''
-        for char in sentence:
-            index = self.char_to_index(char)
-            next_char = node.alphabet[index]
-            if next_char is not None and next_char.freq < freq:             # it checks to see if the next sentence has a higher frequency.
-                next_char.freq = freq                                       # this section is extremely important since it dictates the most likely sentence from each prompt
-                next_char.completed_word = sentence
-            node = next_char
+        raise TypeError("a FrozenCatsTrie can't be changed")
 
-    def autoComplete(self, prompt:str) ->str:
+    def add(self, sentence: str) -> None:
         '''
         Function description:
-        the function takes in a given prompt, using the characters from the prompt it iterates through the trie. 
-        Once it completes it's iteration, the node that it finishes on will have stored in it the most likely word.
+        refuses to add a sentence, since a snapshot is read only.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def remove(self, sentence: str, count: int = 1) -> None:
+        '''
+        Function description:
+        refuses to take a sentence away, since a snapshot is read only.
+
+        :Input:
+        argv1 "sentence": a string that was added to the CatsTrie
+        argv2 "count": how many times it is taken away
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def decay(self, factor: float) -> None:
+        '''
+        Function description:
+        refuses to scale the frequencies, since a snapshot is read only.
+
+        :Input:
+        argv1 "factor": the scale
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def snapshot_arrays(self) -> list:
+        '''
+        Function description:
+        lists the arrays of the nodes in the order the snapshot stores them, so a FrozenCatsTrie can be saved again.
+
+        :Output, return or postcondition:
+        returns the arrays of the nodes, with the labels for the snapshot of a RadixCatsTrie
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        arrays = [self.char, self.first_child, self.next_sibling, self.top]
+        if self.snapshot_kind == b"R":
+            arrays += [self.label_sentence, self.label_start, self.label_length, self.label_byte_start, self.label_byte_length]
+        return arrays
+
+    def find_node(self, prompt: str) -> int:
+        '''
+        Function description:
+        follows the prompt down from the root, one character at a time in the snapshot of a CatsTrie and one edge
+        at a time in the snapshot of a RadixCatsTrie, where the prompt is encoded once and every edge compares its
+        bytes with the label's bytes in the text, so no sentence is decoded on the way down.
 
-        Approach description (if main function):
         :Input:
         argv1 "prompt": a given string
 
         :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the length of the prompt
+
+        :Aux space complexity:
+        O(X), where X is the length of the prompt
+        '''
+        if self.snapshot_kind != b"R":
+            return CatsTrie.find_node(self, prompt)
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        label_sentence, label_length = self.label_sentence, self.label_length
+        label_byte_start, label_byte_length = self.label_byte_start, self.label_byte_length
+        offsets, buffer, text_start = self.sentences.offsets, self.buffer, self.text_start
+        encoded = prompt.encode("utf-8", "surrogatepass")
+        node = depth = place = 0                                            # place is where depth is in encoded
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            end = place + label_byte_length[child]
+            piece = encoded[place:end]                                      # shorter when the prompt ends inside the edge
+            start = text_start + offsets[label_sentence[child]] + label_byte_start[child]
+            if buffer[start:start + len(piece)] != piece:
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += label_length[child]
+            place = end
+        return node
+
+    def descend(self, prompt: str, nodes: list, depths: list) -> int:
+        '''
+        Function description:
+        carries on following a prompt down from the last node of a path, the same way as the trie the snapshot
+        was made from, comparing the bytes of the labels in the snapshot of a RadixCatsTrie like find_node.
+
+        :Input:
+        argv1 "prompt": a given string, which starts with the prefix of the last node of the path
+        argv2 "nodes": the nodes on the path, the root first, which the nodes reached are added to
+        argv3 "depths": the length of the prefix every node on the path ends at
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the number of characters of the prompt past the path
+
+        :Aux space complexity:
+        O(X), where X is the number of characters of the prompt past the path
+        '''
+        if self.snapshot_kind != b"R":
+            return CatsTrie.descend(self, prompt, nodes, depths)
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        label_sentence, label_length = self.label_sentence, self.label_length
+        label_byte_start, label_byte_length = self.label_byte_start, self.label_byte_length
+        offsets, buffer, text_start = self.sentences.offsets, self.buffer, self.text_start
+        node, depth = nodes[-1], depths[-1]
+        encoded = prompt.encode("utf-8", "surrogatepass")
+        place = len(prompt[:depth].encode("utf-8", "surrogatepass"))        # where depth is in encoded
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            end = place + label_byte_length[child]
+            piece = encoded[place:end]                                      # shorter when the prompt ends inside the edge
+            start = text_start + offsets[label_sentence[child]] + label_byte_start[child]
+            if buffer[start:start + len(piece)] != piece:
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += label_length[child]
+            place = end
+            nodes.append(node)
+            depths.append(depth)
+        return node
+
+    def close(self) -> None:
+        '''
+        Function description:
+        closes the snapshot file. The mapping itself is released once nothing uses it anymore.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if self.file is not None:
+            self.file.close()
+
+class ConcurrentCatsTrie:
+    def __init__(self, sentences: list, k_max: int = 10, trie_class: type = CatsTrie, batch_size: int = 1000) -> None:
+        '''
+        Function description:
+        initialises the class, which serves autoComplete from many threads while others add sentences. Readers
+        only ever use the published snapshot, a copy of the trie that is never changed, so they take no lock and
+        never see a half applied write. Writes are queued, and every batch_size of them, or on publish, one writer
+        at a time applies the batch to its own trie and publishes a fresh copy of it by swapping the reference.
+        A reader keeps the snapshot it started with until it returns, and an old snapshot is freed once no reader
+        uses it anymore. A snapshot copies only the flat arrays and shares the append only sentences list. Writes
+        show up for readers once their batch is published.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+        argv2 "k_max": the most completions autoComplete can return for a prompt
+        argv3 "trie_class": the class of trie being served, CatsTrie or RadixCatsTrie
+        argv4 "batch_size": the number of queued writes that publishes a new snapshot
+
+        :Output, return or postcondition:
+        snapshot is the published trie and epoch counts how many times one has been published
+
+        :Time complexity:
+        the time of building the trie, plus O(V * k_max + S) for its first snapshot, where V is the number of nodes
+        and S is the number of distinct sentences
+
+        :Aux space complexity:
+        two copies of the trie, plus the ones old readers still use
+        '''
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.batch_size = batch_size
+        self.writer = trie_class(sentences, k_max)                          # the trie the writes are applied to, only touched under lock
+        self.snapshot = self.writer.reader_copy()                           # the published trie the readers use
+        self.epoch = 0
+        self.pending = []                                                   # the queued writes, as (method, arguments)
+        self.lock = threading.Lock()
+
+    @property
+    def most_freq_word(self) -> tuple:
+        '''
+        Function description:
+        returns the most frequent sentence of the published snapshot and its frequency.
 
         :Time complexity:
-        O(X + Y), where X is the length of the prompt and Y is the length of the most frequence sentence in sentences
+        O(1)
 
         :Aux space complexity:
         O(1)
         '''
-        if prompt == "":                                                    # checks to see if there was a prompt given
-            return self.most_freq_word[0]                                   # if not then it will return the most frequent word
+        return self.snapshot.most_freq_word
+
+    def autoComplete(self, prompt: str, k: int = None):
+        '''
+        Function description:
+        answers autoComplete from the published snapshot, without taking a lock.
+
+        :Input:
+        argv1 "prompt": a given string
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns what autoComplete of the published snapshot returns
+
+        :Time complexity:
+        O(X + Y), where X is the length of the prompt and Y is the length of the most frequence sentence in sentences,
+        or O(X + k) with k
+
+        :Aux space complexity:
+        O(1), or O(k) with k
+        '''
+        return self.snapshot.autoComplete(prompt, k)
+
+    def autoComplete_many(self, prompts: list, k: int = None) -> list:
+        '''
+        Function description:
+        answers a batch of prompts from the published snapshot, without taking a lock. Every prompt of the batch
+        is answered from the same snapshot.
+
+        :Input:
+        argv1 "prompts": a list of prompts
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns what autoComplete returns for every prompt, in the order of prompts
+
+        :Time complexity:
+        the time of autoComplete_many of the trie
+
+        :Aux space complexity:
+        the space of autoComplete_many of the trie
+        '''
+        return self.snapshot.autoComplete_many(prompts, k)
+
+    def queue(self, method: str, arguments: tuple) -> None:
+        '''
+        Function description:
+        queues a write, and applies the batch when it is full.
+
+        :Input:
+        argv1 "method": the name of the method of the trie that makes the write
+        argv2 "arguments": the arguments it is called with
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        with self.lock:
+            self.pending.append((method, arguments))
+            if len(self.pending) >= self.batch_size:
+                self.apply()
+
+    def add(self, sentence: str) -> None:
+        '''
+        Function description:
+        queues adding a sentence.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        self.queue("add", (sentence,))
+
+    def remove(self, sentence: str, count: int = 1) -> None:
+        '''
+        Function description:
+        queues taking a sentence away. Since earlier writes may still be queued, a sentence that isn't in the trie
+        when the batch is applied is left alone instead of raising.
+
+        :Input:
+        argv1 "sentence": a string that was added to the CatsTrie
+        argv2 "count": how many times it is taken away, more than 0
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        if count <= 0:
+            raise ValueError("count must be more than 0")
+        self.queue("remove", (sentence, count))
 
-        node = self.root
-        for char in prompt:                                                 # iterates through the characters in the prompt
-            index = self.char_to_index(char)                                # converts the character into an index
-            if node.alphabet[index] is None:                                # checks to se if the prompt can be predicted 
-                return None                                                 # if it is an unpredictable prompt, it returns None
-            node = node.alphabet[index]                                     # updates the current node to reflect the next next character in the prompt
-        return node.completed_word
\ No newline at end of file
+    def decay(self, factor: float) -> None:
+        '''
+        Function description:
+        queues scaling the frequency of every sentence by factor.
+
+        :Input:
+        argv1 "factor": the scale, more than 0 and at most 1
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        if not 0 < factor <= 1:
+            raise ValueError("factor must be more than 0 and at most 1")
+        self.queue("decay", (factor,))
+
+    def publish(self) -> None:
+        '''
+        Function description:
+        applies the queued writes and publishes the result, even if the batch isn't full.
+
+        :Output, return or postcondition:
+        readers see every write queued before the call
+
+        :Time complexity:
+        O(B * M * k_max + V * k_max + S), where B is the number of queued writes, M is the length of the longest
+        sentence, V is the number of nodes and S is the number of distinct sentences
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        with self.lock:
+            self.apply()
+
+    def apply(self) -> None:
+        '''
+        Function description:
+        applies the queued writes to the writer's trie in order, then publishes a reader_copy of it. Swapping the
+        reference is a single assignment, so a reader gets either the old snapshot or the new one.
+
+        :Output, return or postcondition:
+        None, it must be called holding the lock
+
+        :Time complexity:
+        O(B * M * k_max + V * k_max + S), where B is the number of queued writes, M is the length of the longest
+        sentence, V is the number of nodes and S is the number of distinct sentences
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        if not self.pending:
+            return
+        writer = self.writer
+        for method, arguments in self.pending:
+            if method == "remove":
+                sentence_id = writer.sentence_ids.get(arguments[0])
+                if sentence_id is None or writer.counts[sentence_id] <= 0:  # the sentence isn't there to take away
+                    continue
+            getattr(writer, method)(*arguments)
+        self.pending = []
+        self.snapshot = writer.reader_copy()
+        self.epoch += 1
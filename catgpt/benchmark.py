@@ -0,0 +1,471 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from catgpt import CatsTrie, RadixCatsTrie
+from server import percentile
+
+def vocabulary(count: int, rng: random.Random) -> list:
+    '''
+    Function description:
+    makes a list of distinct random lowercase words of 2 to 10 letters.
+
+    :Input:
+    argv1 "count": the number of words
+    argv2 "rng": the random number generator of the corpus
+
+    :Output, return or postcondition:
+    returns the words
+
+    :Time complexity:
+    O(count)
+
+    :Aux space complexity:
+    O(count)
+    '''
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))))
+    return sorted(words)
+
+def zipf_weights(count: int, skew: float) -> list:
+    '''
+    Function description:
+    returns the cumulative weights of a Zipf distribution over count ranks, where rank r has weight 1 / r^skew.
+
+    :Input:
+    argv1 "count": the number of ranks
+    argv2 "skew": the exponent, where 0 is uniform and larger values favour the first ranks more
+
+    :Output, return or postcondition:
+    returns the cumulative weights, for random.choices
+
+    :Time complexity:
+    O(count)
+
+    :Aux space complexity:
+    O(count)
+    '''
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+def zipf_words_corpus(size: int, rng: random.Random, length: int = 8, skew: float = 1.1) -> list:
+    '''
+    Function description:
+    makes sentences of 1 to length words, where the words are drawn from a Zipf distribution over a vocabulary,
+    so common words make common prefixes and most sentences are still distinct.
+
+    :Input:
+    argv1 "size": the number of sentences
+    argv2 "rng": the random number generator of the corpus
+    argv3 "length": the most words in a sentence
+    argv4 "skew": the exponent of the Zipf distribution of the words
+
+    :Output, return or postcondition:
+    returns the sentences
+
+    :Time complexity:
+    O(size * length * log(W)), where W is the size of the vocabulary
+
+    :Aux space complexity:
+    O(size * length)
+    '''
+    words = vocabulary(max(100, size // 10), rng)
+    weights = zipf_weights(len(words), skew)
+    return [" ".join(rng.choices(words, cum_weights=weights, k=rng.randint(1, length))) for _ in range(size)]
+
+def repeated_corpus(size: int, rng: random.Random, length: int = 8, skew: float = 1.1) -> list:
+    '''
+    Function description:
+    makes traffic where whole sentences repeat: a pool of distinct sentences a tenth the size of the corpus,
+    each drawn as many times as a Zipf distribution over the pool gives it, like popular queries.
+
+    :Input:
+    argv1 "size": the number of sentences
+    argv2 "rng": the random number generator of the corpus
+    argv3 "length": the most words in a sentence
+    argv4 "skew": the exponent of the Zipf distribution of the sentences
+
+    :Output, return or postcondition:
+    returns the sentences, with repeats
+
+    :Time complexity:
+    O(size * length)
+
+    :Aux space complexity:
+    O(size * length)
+    '''
+    pool = list(dict.fromkeys(zipf_words_corpus(max(1, size // 10), rng, length, 0.8)))
+    return rng.choices(pool, cum_weights=zipf_weights(len(pool), skew), k=size)
+
+def long_tail_corpus(size: int, rng: random.Random, length: int = 8, skew: float = 1.1) -> list:
+    '''
+    Function description:
+    makes long sentences of length to 4 * length words that share a few common openings and are nearly all
+    distinct past them, which gives the long chains of single child nodes that path compression merges.
+
+    :Input:
+    argv1 "size": the number of sentences
+    argv2 "rng": the random number generator of the corpus
+    argv3 "length": the fewest words in a sentence
+    argv4 "skew": the exponent of the Zipf distribution of the openings and the words
+
+    :Output, return or postcondition:
+    returns the sentences
+
+    :Time complexity:
+    O(size * length * log(W)), where W is the size of the vocabulary
+
+    :Aux space complexity:
+    O(size * length)
+    '''
+    words = vocabulary(max(1000, size), rng)
+    weights = zipf_weights(len(words), skew)
+    openings = [" ".join(rng.choices(words, cum_weights=weights, k=3)) for _ in range(50)]
+    opening_weights = zipf_weights(len(openings), skew)
+    return [rng.choices(openings, cum_weights=opening_weights)[0] + " " +
+            " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(length, 4 * length))) for _ in range(size)]
+
+GENERATORS = {
+    "zipf_words": zipf_words_corpus,
+    "repeated": repeated_corpus,
+    "long_tail": long_tail_corpus,
+}
+
+LAYOUTS = {
+    "catstrie": lambda sentences, k_max: CatsTrie(sentences, k_max),
+    "radix": lambda sentences, k_max: RadixCatsTrie(sentences, k_max),
+    "frozen": lambda sentences, k_max: CatsTrie(sentences, k_max).freeze(),
+    "frozen_radix": lambda sentences, k_max: RadixCatsTrie(sentences, k_max).freeze(),
+}
+
+def keystrokes(sentences: list, rng: random.Random, users: int, count: int) -> list:
+    '''
+    Function description:
+    replays users typing sentences one character at a time. Every user picks a sentence from the corpus, so
+    frequent sentences are typed more often, and sends the prompt after every keystroke. The users type at
+    the same time, so their prompts are interleaved, and a user who finishes starts another sentence.
+
+    :Input:
+    argv1 "sentences": the corpus, with repeats
+    argv2 "rng": the random number generator of the workload
+    argv3 "users": the number of users typing at once
+    argv4 "count": the number of prompts
+
+    :Output, return or postcondition:
+    returns the prompts in the order they are sent
+
+    :Time complexity:
+    O(count * M), where M is the length of the longest sentence
+
+    :Aux space complexity:
+    O(count * M), where M is the length of the longest sentence
+    '''
+    typing = [[rng.choice(sentences), 0] for _ in range(users)]           # the sentence of every user and how much of it is typed
+    prompts = []
+    while len(prompts) < count:
+        user = typing[rng.randrange(users)]
+        user[1] += 1
+        prompts.append(user[0][:user[1]])
+        if user[1] >= len(user[0]):
+            user[0], user[1] = rng.choice(sentences), 0
+    return prompts
+
+def retained_memory(function, *arguments) -> tuple:
+    '''
+    Function description:
+    calls the function with tracemalloc running, and measures both the memory that is still allocated when it
+    returns, which is what the result keeps, and the most it had allocated at once. This runs much slower than
+    the timed calls, so it is measured separately from them.
+
+    :Input:
+    argv1 "function": the function being measured
+    argv2 "arguments": the arguments it is called with
+
+    :Output, return or postcondition:
+    returns the bytes kept by the result and the peak bytes
+
+    :Time complexity:
+    the time of the function
+
+    :Aux space complexity:
+    the space of the function
+    '''
+    tracemalloc.start()
+    try:
+        result = function(*arguments)
+        kept, peak = tracemalloc.get_traced_memory()
+        del result
+        return kept, peak
+    finally:
+        tracemalloc.stop()
+
+def timed(function, *arguments) -> tuple:
+    '''
+    Function description:
+    calls the function and measures how long it took.
+
+    :Input:
+    argv1 "function": the function being measured
+    argv2 "arguments": the arguments it is called with
+
+    :Output, return or postcondition:
+    returns what the function returned and the wall time in seconds
+
+    :Time complexity:
+    the time of the function
+
+    :Aux space complexity:
+    the space of the function
+    '''
+    start = time.perf_counter()
+    value = function(*arguments)
+    return value, time.perf_counter() - start
+
+def latencies(trie, prompts: list, k: int) -> tuple:
+    '''
+    Function description:
+    times every autoComplete of a keystroke replay on its own.
+
+    :Input:
+    argv1 "trie": the trie being measured
+    argv2 "prompts": the prompts in the order they are sent
+    argv3 "k": the number of completions asked for
+
+    :Output, return or postcondition:
+    returns the answers and the sorted latencies in seconds
+
+    :Time complexity:
+    the time of autoComplete for every prompt
+
+    :Aux space complexity:
+    O(P * k), where P is the number of prompts
+    '''
+    clock = time.perf_counter
+    answers, seconds = [], []
+    for prompt in prompts:
+        start = clock()
+        answers.append(trie.autoComplete(prompt, k))
+        seconds.append(clock() - start)
+    seconds.sort()
+    return answers, seconds
+
+def run_case(generator: str, size: int, seed: int, length: int, skew: float, layouts: list, k: int, queries: int,
+             users: int, batch: int, adds: int, repeat: int, memory: bool) -> dict:
+    '''
+    Function description:
+    benchmarks every layout on one generated corpus. Building is timed apart from querying, and every build
+    time is the best of repeat runs. The keystroke replay is answered by every layout, one prompt at a time for
+    the latency percentiles, and in batches of batch prompts with autoComplete_many for the time per prompt
+    when a server batches them, and the answers of both are checked against the one at a time answers of the
+    first layout. The layouts that can be changed are also timed adding more sentences from the same generator.
+    The memory kept by a layout doesn't count the sentence strings, which the corpus already holds, but does
+    count the text a frozen layout copies.
+
+    :Input:
+    argv1 "generator": the name of the generator, one of the keys of GENERATORS
+    argv2 "size": the number of sentences
+    argv3 "seed": the seed of the generator and the workload
+    argv4 "length": the length parameter of the generator
+    argv5 "skew": the Zipf exponent of the generator
+    argv6 "layouts": the names of the layouts being measured, the first giving the reference answers
+    argv7 "k": the number of completions asked for
+    argv8 "queries": the number of prompts replayed
+    argv9 "users": the number of users typing at once
+    argv10 "batch": the number of prompts in a batch
+    argv11 "adds": the number of sentences added after building
+    argv12 "repeat": the number of timed builds
+    argv13 "memory": boolean value that also measures memory
+
+    :Output, return or postcondition:
+    returns a dictionary with the results for the corpus
+
+    :Time complexity:
+    the time of building and querying every layout, repeat times for the builds
+
+    :Aux space complexity:
+    the space of the largest layout
+    '''
+    rng = random.Random(seed)
+    sentences = GENERATORS[generator](size, rng, length, skew)
+    extra = GENERATORS[generator](adds, rng, length, skew)
+    prompts = keystrokes(sentences, rng, users, queries)
+    distinct = set(sentences)
+    characters = sum(len(sentence) for sentence in distinct)
+    case = {
+        "generator": generator, "size": size, "seed": seed, "length": length, "skew": skew,
+        "distinct": len(distinct), "characters": characters, "prompts": len(prompts), "layouts": {},
+    }
+
+    reference = None
+    for layout in layouts:
+        build = LAYOUTS[layout]
+        trie, seconds = timed(build, sentences, k)
+        for _ in range(repeat - 1):
+            seconds = min(seconds, timed(build, sentences, k)[1])
+        answers, seconds_each = latencies(trie, prompts, k)
+        if reference is None:
+            reference = answers
+        batched, batched_answers = 0.0, []
+        for start in range(0, len(prompts), batch):
+            group, seconds_batch = timed(trie.autoComplete_many, prompts[start:start + batch], k)
+            batched_answers.extend(group)
+            batched += seconds_batch
+        result = {
+            "build_seconds": seconds,
+            "nodes": len(trie.char),
+            "correct": answers == reference,
+            "batched_correct": batched_answers == reference,
+            "latency_us": {name: 1e6 * percentile(seconds_each, fraction)
+                           for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))},
+            "mean_latency_us": 1e6 * sum(seconds_each) / len(seconds_each) if seconds_each else 0.0,
+            "batched_us_per_prompt": 1e6 * batched / len(prompts) if prompts else 0.0,
+        }
+        try:
+            result["add_seconds"] = timed(lambda: [trie.add(sentence) for sentence in extra])[1]
+        except TypeError:                                                   # a frozen layout can't be changed
+            result["add_seconds"] = None
+        del trie
+        if memory:
+            kept, peak = retained_memory(build, sentences, k)
+            result.update({"kept_bytes": kept, "peak_bytes": peak,
+                           "bytes_per_character": kept / characters if characters else 0.0})
+        case["layouts"][layout] = result
+    return case
+
+def regressions(case: dict, baseline: dict, tolerance: float) -> list:
+    '''
+    Function description:
+    compares the memory and latency of a case with the same case in an earlier report, and lists every
+    measurement that grew by more than the tolerance.
+
+    :Input:
+    argv1 "case": the results for a corpus
+    argv2 "baseline": the results for the same corpus in an earlier report
+    argv3 "tolerance": the growth allowed, as a fraction
+
+    :Output, return or postcondition:
+    returns a list of (layout, measurement, baseline value, new value)
+
+    :Time complexity:
+    O(L), where L is the number of layouts
+
+    :Aux space complexity:
+    O(L), where L is the number of layouts
+    '''
+    found = []
+    for layout, result in case["layouts"].items():
+        old = baseline["layouts"].get(layout)
+        if old is None:
+            continue
+        for name, value, old_value in (("bytes_per_character", result.get("bytes_per_character"), old.get("bytes_per_character")),
+                                       ("p50_us", result["latency_us"]["p50"], old["latency_us"]["p50"]),
+                                       ("p99_us", result["latency_us"]["p99"], old["latency_us"]["p99"])):
+            if value is not None and old_value and value > old_value * (1 + tolerance):
+                found.append((layout, name, old_value, value))
+    return found
+
+def current_commit() -> str:
+    '''
+    Function description:
+    returns the git commit being benchmarked, or None outside a git checkout.
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: list = None) -> int:
+    '''
+    Function description:
+    runs the benchmark from the command line and writes a JSON report. Returns 1 when any layout disagrees
+    with the first one, or when a baseline report is given and the memory per character or a latency
+    percentile of a case grew by more than the tolerance, so it can hold the line before a deploy.
+
+    :Input:
+    argv1 "argv": the command line arguments, or None for sys.argv
+
+    :Output, return or postcondition:
+    returns the exit status
+
+    :Time complexity:
+    the time of every case
+
+    :Aux space complexity:
+    the space of the largest trie
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the catgpt trie layouts on generated corpora and keystroke replays.")
+    parser.add_argument("--generators", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 50000], help="number of sentences")
+    parser.add_argument("--lengths", nargs="+", type=int, default=[8], help="words per sentence, as used by the generator")
+    parser.add_argument("--skews", nargs="+", type=float, default=[1.1], help="Zipf exponents")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=list(LAYOUTS), help="the first gives the reference answers")
+    parser.add_argument("--k", type=int, default=5, help="completions asked for")
+    parser.add_argument("--queries", type=int, default=20000, help="prompts in the keystroke replay")
+    parser.add_argument("--users", type=int, default=64, help="users typing at once")
+    parser.add_argument("--batch", type=int, default=256, help="prompts per autoComplete_many")
+    parser.add_argument("--adds", type=int, default=2000, help="sentences added after building")
+    parser.add_argument("--repeat", type=int, default=1, help="timed builds, the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--baseline", help="an earlier report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="growth allowed over the baseline, as a fraction")
+    parser.add_argument("--output", default="benchmark.json")
+    arguments = parser.parse_args(argv)
+
+    known = {}                                                              # earlier cases by generator, size, seed, length and skew
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            for case in json.load(file)["cases"]:
+                known[case["generator"], case["size"], case["seed"], case["length"], case["skew"]] = case
+
+    cases = []
+    failures = 0
+    for generator in arguments.generators:
+        for size in arguments.sizes:
+            for length in arguments.lengths:
+                for skew in arguments.skews:
+                    for seed in arguments.seeds:
+                        case = run_case(generator, size, seed, length, skew, arguments.layouts, arguments.k, arguments.queries,
+                                        arguments.users, arguments.batch, arguments.adds, arguments.repeat, not arguments.no_memory)
+                        baseline = known.get((generator, size, seed, length, skew))
+                        case["regressions"] = regressions(case, baseline, arguments.tolerance) if baseline else []
+                        cases.append(case)
+                        failures += len(case["regressions"])
+                        for layout, result in case["layouts"].items():
+                            failures += (not result["correct"]) + (not result["batched_correct"])
+                            print(f"{generator:>10} {size:>7} {length:>3} {skew:>4} {seed:>3} {layout:>12} "
+                                  f"build {result['build_seconds']:8.4f}s {result['nodes']:>9} nodes "
+                                  f"p50 {result['latency_us']['p50']:7.2f}us p99 {result['latency_us']['p99']:7.2f}us"
+                                  f"{'' if 'bytes_per_character' not in result else format(result['bytes_per_character'], '8.2f') + ' B/char'}"
+                                  f"{'' if result['correct'] else '  MISMATCH'}"
+                                  f"{'' if result['batched_correct'] else '  BATCHED MISMATCH'}")
+                        for layout, name, old_value, value in case["regressions"]:
+                            print(f"{'':>10} {layout} {name} regressed from {old_value:.2f} to {value:.2f}")
+
+    report = {
+        "commit": current_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "k": arguments.k,
+        "cases": cases,
+    }
+    with open(arguments.output, "w") as file:
+        json.dump(report, file, indent=2)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
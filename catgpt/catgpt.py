@@ -1,83 +1,252 @@
-class Node:
-    def __init__(self, char: str) -> None:
+from array import array
+import mmap
+import os
+import struct
+import sys
+import threading
+
+CATS_SNAPSHOT_MAGIC = b"CATSTRIE"
+CATS_SNAPSHOT_VERSION = 3
+CATS_SNAPSHOT_HEADER = struct.Struct("<8sHccc3xqqqqq")                      # magic, version, byte order, kind, typecode of the counts, k_max, nodes, sentences, text bytes, data offset
+CATS_SNAPSHOT_OFFSET = 4096                                                 # the arrays start on their own page
+
+class CatsTrie:
+    snapshot_kind = b"C"                                                    # marks the layout of the arrays in a snapshot
+    def __init__(self, sentences: list, k_max: int = 10) -> None:
         '''
         Function description:
-        This function initialises the class. It serves as the foundation of the node class by storing 
-        several variables.
+        initialises the class by creating a root node. the function then proceeds to add the characters from the sentence
+        in the given sentences list, into a trie, all at once with build. The nodes aren't objects: every node is an
+        index into flat arrays, where char holds the character leading to the node, first_child and next_sibling link
+        the children of a node together in alphabetical order, and top holds the ids of the k_max best sentences
+        that start with the prefix of each node, best first, in the k_max slots from node * k_max, and terminal the
+        sentence that ends at each node. Every distinct sentence is stored once in the sentences table, with its
+        frequency in counts.
 
         :Input:
-        argv1 "char": a string that represents a character
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+        argv2 "k_max": the most completions autoComplete can return for a prompt
 
         :Output, return or postcondition:
+        the CatsTrie stores the sentence in sentences as a Trie.
 
         :Time complexity:
-        O(1)
+        O(N * k_max), where N is the number of characters in sentences
 
         :Aux space complexity:
-        O(1)
+        O(N * k_max), where N is the number of characters in sentences
         '''
-        self.head = char                                                    # represents a character in the Trie
-        self.is_end = False                                                 # boolean used to check whether or not the character is the end of a sentence
-        self.alphabet = [None]*26                                           # represents the next possible chars
-        self.freq = 0                                                       # how often the word is used
-        self.completed_word = None                                          # what word is completed
+        if k_max < 1:
+            raise ValueError("k_max must be at least 1")
+        self.k_max = k_max
+        self.empty = array("i", [-1]) * k_max                               # the top slots of a new node
+        self.char = array("I", [0])                                         # the character leading to each node, as a code point
+        self.first_child = array("i", [-1])                                 # the first child of each node, -1 if there is none
+        self.next_sibling = array("i", [-1])                                # the next child of the same parent, -1 at the end
+        self.top = array("i", self.empty)                                   # the ids of the best sentences through each node, -1 for unused slots
+        self.terminal = array("i", [-1])                                    # the id of the sentence that ends at each node, -1 if none does
+        self.sentences = []                                                 # every distinct sentence, where the index is its id
+        self.sentence_ids = {}                                              # the id of every sentence
+        self.counts = array("q")                                            # how often each sentence has been added, as floats once decayed
+        self.most_freq_word = ("", 0)                                       # initialises a tuple containing the most frequent word and it's frequency
+        self.build(sentences)
 
-class CatsTrie:
-    def __init__(self, sentences: list) -> None:
+    def build(self, sentences: list) -> None:
         '''
         Function description:
-        initialises the class by creating a root node. the function then proceeds to add the characters from the sentence
-        in the given sentences list, into a trie.
+        adds every sentence to an empty trie in one go, which is much faster than calling add for each of them.
+        Duplicate sentences are counted first, and the distinct ones are sorted, so every sentence shares the
+        longest prefix it can with the one before it. A stack holds the nodes of the previous sentence, the nodes
+        past the shared prefix are popped, and the rest of the sentence is added as the last children, which
+        keeps the siblings in alphabetical order. A sentence's own node is never reached by an earlier sentence,
+        so its list of best sentences starts as just itself, and every popped node merges its list into the list of
+        its parent, so the lists of every node are settled bottom up without a second pass. Since the ids follow
+        the sorted order, a smaller id means a lexicographically smaller sentence.
 
         :Input:
         argv1 "sentences": a list of words used to "train" the CatsTrie model
-        
+
         :Output, return or postcondition:
         the CatsTrie stores the sentence in sentences as a Trie.
 
         :Time complexity:
-        O(N), where N is the number of characters in sentences
+        O(N * k_max + S log S * M), where N is the number of characters in sentences, S is the number of distinct
+        sentences and M is the length of the longest one, for the sort
 
         :Aux space complexity:
-        O(N), where N is the number of characters in sentences
+        O(N * k_max), where N is the number of characters in sentences
         '''
-        self.root = Node("")                                                # cretes the first node and dub it to be the root node
-        self.most_freq_word = ("", 0)                                       # initialises a tuple containing the most frequent word and it's frequency
-        for sentence in sentences:                                          # loops through all of the sentence in sentences 
-            self.add(sentence)                                              # then proceeds to add them to the Trie represented by nodes
+        if len(self.char) > 1 or self.top[0] != -1:
+            raise ValueError("build needs an empty CatsTrie")
+        frequency = {}
+        for sentence in sentences:                                          # counts the duplicate sentences up front
+            frequency[sentence] = frequency.get(sentence, 0) + 1
+        self.sentences = sorted(frequency)
+        self.sentence_ids = {sentence: sentence_id for sentence_id, sentence in enumerate(self.sentences)}
+        self.counts = array("q", [frequency[sentence] for sentence in self.sentences])
+
+        char, first_child, next_sibling, top, empty = self.char, self.first_child, self.next_sibling, self.top, self.empty
+        terminal = self.terminal
+        last_child = [-1]                                                   # the last child of every node added so far
+        stack = [0]                                                         # the nodes of the previous sentence, the root first
+        bests = [[]]                                                        # the best sentences found so far for every node on the stack
+        previous = ""
+        for sentence_id, sentence in enumerate(self.sentences):
+            shared = 0
+            limit = min(len(previous), len(sentence))
+            while shared < limit and previous[shared] == sentence[shared]:
+                shared += 1
+            while len(stack) > shared + 1:                                  # hands the best sentences of every popped node up to its parent
+                self.settle(stack, bests)
+            node = stack[-1]
+            for character in sentence[shared:]:                             # the rest of the sentence becomes a chain of new last children
+                new = len(char)
+                char.append(ord(character))
+                first_child.append(-1)
+                next_sibling.append(-1)
+                top.extend(empty)
+                terminal.append(-1)
+                last_child.append(-1)
+                if last_child[node] == -1:
+                    first_child[node] = new
+                else:
+                    next_sibling[last_child[node]] = new
+                last_child[node] = new
+                node = new
+                stack.append(node)
+                bests.append([])
+            terminal[node] = sentence_id
+            bests[-1] = [sentence_id]
+            previous = sentence
+        while stack:
+            self.settle(stack, bests)
+        if top[0] != -1:
+            self.most_freq_word = (self.sentences[top[0]], self.counts[top[0]])
 
-    def char_to_index(self, char:str) -> int:
+    def settle(self, stack: list, bests: list) -> None:
         '''
         Function description:
-        basic function to calculate the relative index of a character
+        pops the deepest node off the stack of build, stores its best sentences and merges them into its parent's.
+        Most nodes are part of a chain with nothing else below the parent yet, and they hand their list up as it is.
 
         :Input:
-        argv1 "char": a character to be converted
+        argv1 "stack": the nodes being built, the root first
+        argv2 "bests": the best sentences found so far for every node on the stack
 
         :Output, return or postcondition:
-        returns an integer valure representing the index of the input character
+        None
 
         :Time complexity:
-        O(1)
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        node, best = stack.pop(), bests.pop()
+        start = node * self.k_max
+        for slot, sentence_id in enumerate(best, start):
+            self.top[slot] = sentence_id
+        if bests:
+            bests[-1] = self.merge_best(bests[-1], best) if bests[-1] else best
+
+    def merge_best(self, best: list, other: list) -> list:
+        '''
+        Function description:
+        merges two lists of the best sentences of different nodes, keeping the k_max best. It is only used by build,
+        where a smaller id means a lexicographically smaller sentence.
+
+        :Input:
+        argv1 "best": a list of sentence ids, best first
+        argv2 "other": another list of sentence ids, best first, with none in common with best
+
+        :Output, return or postcondition:
+        returns the merged list of at most k_max sentence ids, best first
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        counts = self.counts
+        merged = []
+        i = j = 0
+        while len(merged) < self.k_max and (i < len(best) or j < len(other)):
+            if j == len(other) or (i < len(best) and (counts[best[i]] > counts[other[j]] or
+                                                      (counts[best[i]] == counts[other[j]] and best[i] < other[j]))):
+                merged.append(best[i])
+                i += 1
+            else:
+                merged.append(other[j])
+                j += 1
+        return merged
+
+    def better(self, sentence_id: int, other_id: int) -> bool:
+        '''
+        Function description:
+        decides whether one sentence is a better completion than another. The more frequent sentence wins, and
+        when they are used equally often the lexicographically smaller one wins.
+
+        :Input:
+        argv1 "sentence_id": the id of the sentence being compared
+        argv2 "other_id": the id of the sentence it is compared to, or -1 for no sentence
+
+        :Output, return or postcondition:
+        returns True if the first sentence is the better completion
+
+        :Time complexity:
+        O(M), where M is the length of the shorter sentence, only when the frequencies are equal
 
         :Aux space complexity:
         O(1)
         '''
-        char_index_list = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 
-                           'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 
-                           's', 't', 'u', 'v', 'w', 'x', 'y', 'z']          # the alphabet
+        if other_id == -1:
+            return True
+        count, other_count = self.counts[sentence_id], self.counts[other_id]
+        return count > other_count or (count == other_count and self.sentences[sentence_id] < self.sentences[other_id])
+
+    def promote(self, node: int, sentence_id: int) -> None:
+        '''
+        Function description:
+        puts a sentence that just became more frequent into its place in the list of best sentences of a node.
+        If it is already in the list it moves up past the sentences it now beats, and otherwise it goes in when
+        there is a free slot or it beats the last one, which then drops out.
+
+        :Input:
+        argv1 "node": the node whose list is updated
+        argv2 "sentence_id": the id of the sentence that became more frequent
+
+        :Output, return or postcondition:
+        None
 
-        for i in range(len(char_index_list)):                               
-            if char == char_index_list[i]:
-                return int(i)
+        :Time complexity:
+        O(k_max * M), where M is the length of the longest sentence, since ties compare the sentences
+
+        :Aux space complexity:
+        O(1)
+        '''
+        top = self.top
+        start = node * self.k_max
+        slot, end = start, start + self.k_max
+        while slot < end and top[slot] != -1 and top[slot] != sentence_id:
+            slot += 1
+        if slot == end:                                                     # the list is full and doesn't hold the sentence
+            slot = end - 1
+            if not self.better(sentence_id, top[slot]):
+                return
+        while slot > start and self.better(sentence_id, top[slot - 1]):     # moves the sentences it beats down one slot
+            top[slot] = top[slot - 1]
+            slot -= 1
+        top[slot] = sentence_id
 
     def add(self, sentence: str) -> None:
         '''
         Function description:
         Adds a sentence to the CatsTrie. It does so by iterating through a given sentence and traversing through
-        the linked list representing a trie, and creating new nodes representing each character in the sentence.
-        It then updates the attributes of the last node. After that, it goes back to all the nodes that it has visited
-        and updates the attributes of those nodes. Lastly the function keeps track of the most frequent nodes.  
+        the trie, creating new nodes for the characters that aren't there yet in alphabetical order among their
+        siblings. Since adding a sentence only makes that sentence more frequent, the only change to the list of
+        best sentences of every node on the way is that this one moves up or comes in, so both are settled in the
+        same pass. Lastly the function keeps track of the most frequent sentence, which is the best of the root.
 
         :Input:
         argv1 "sentence": a string that has its characters placed within the Trie
@@ -86,80 +255,1336 @@ class CatsTrie:
         None
 
         :Time complexity:
-        O(M), where M is the length of the sentence
-                
+        O(M * k_max), where M is the length of the sentence
+
         :Aux space complexity:
-        O(M), where M is the length of the sentence
+        O(M * k_max), where M is the length of the sentence
         '''
-        node = self.root                                                    # makes the start node the root node
-        for char in sentence:
-            index = self.char_to_index(char)
-            if node.alphabet[index] is None:                                # if the next character in the sentence isn't represented in the trie
-                node.alphabet[index] = Node(char)                           # create a new node at the index of the new character symbolizing a branch off from an existing branch)
-            node = node.alphabet[index]                                     # appoint the new node as the starting node to run it back through the loop
-        node.is_end = True                                                  # once the loop finishes, it symbolizes the end of a word, thus the end node will update the boolean to represent that
-        node.freq += 1                                                      # updates the freq of that word being used
-        node.completed_word = sentence                                      # stores the completed sentence in the node
-        self.update(sentence, self.root, node.freq)                         # updates the frequency of all the previous node/char it went by
+        sentence_id = self.sentence_ids.get(sentence)
+        if sentence_id is None:                                             # interns the sentence the first time it is seen
+            sentence_id = len(self.sentences)
+            self.sentence_ids[sentence] = sentence_id
+            self.sentences.append(sentence)
+            self.counts.append(0)
+        self.counts[sentence_id] += 1
 
-        if node.freq > self.most_freq_word[1]:                              # checkss whether or not the current word has a greater frequency then all the other ones we've seen
-            self.most_freq_word = (node.completed_word, node.freq)          # updates the most frequent word
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = 0                                                            # makes the start node the root node
+        self.promote(node, sentence_id)
+        for character in sentence:
+            code = ord(character)
+            previous, child = -1, first_child[node]
+            while child != -1 and char[child] < code:                       # finds the child, or where it belongs among the siblings
+                previous, child = child, next_sibling[child]
+            if child == -1 or char[child] != code:                          # if the next character in the sentence isn't represented in the trie
+                new = len(char)
+                char.append(code)
+                first_child.append(-1)
+                next_sibling.append(child)
+                self.top.extend(self.empty)
+                self.terminal.append(-1)
+                if previous == -1:
+                    first_child[node] = new
+                else:
+                    next_sibling[previous] = new
+                child = new
+            node = child
+            self.promote(node, sentence_id)                                 # this section is extremely important since it dictates the most likely sentence from each prompt
+        self.terminal[node] = sentence_id
+        self.most_freq_word = (self.sentences[self.top[0]], self.counts[self.top[0]])
 
-    def update(self, sentence: str, node: Node, freq: int) -> None:
+    def remove(self, sentence: str, count: int = 1) -> None:
         '''
         Function description:
-        iterates through a given sentence, and then it checks to see whether or not the character is none and whether
-        or not the frequency of the sentence is greater than that of the frequency of the word in the current node.
-        it then updates accordingly and moves on to the next node.
+        takes a sentence away from the CatsTrie count times, or for as often as it has been added if that is less.
+        A sentence with nothing left is no longer suggested, while its nodes stay in the trie. Since the sentence
+        can drop out of a list and let in one that wasn't there, the lists of the nodes on its path are
+        recomputed bottom up, each from the lists of its children and the sentence ending there, so no subtree is
+        ever searched.
 
         :Input:
-        argv1 "sentence": a string representing the sentence
-        argv2 "node": a node representing the current position in the trie
-        argv3 "freq": the frequency to be updated
+        argv1 "sentence": a string that was added to the CatsTrie
+        argv2 "count": how many times it is taken away, more than 0
 
         :Output, return or postcondition:
         None
 
         :Time complexity:
-        O(M), where M is the length of the sentence
+        O(M * C * k_max * log(C * k_max)), where M is the length of the sentence and C is the most children a
+        node on its path has
+
+        :Aux space complexity:
+        O(M + C * k_max), where M is the length of the sentence and C is the most children a node on its path has
+        '''
+        if count <= 0:
+            raise ValueError("count must be more than 0")
+        sentence_id = self.sentence_ids.get(sentence)
+        if sentence_id is None or self.counts[sentence_id] <= 0:
+            raise ValueError(f"{sentence!r} isn't in the CatsTrie")
+        self.counts[sentence_id] = max(self.counts[sentence_id] - count, 0)
+        nodes, depths = [0], [0]
+        self.descend(sentence, nodes, depths)                               # the path of the sentence, the root first
+        for node in reversed(nodes):
+            self.recompute(node)
+        best = self.top[0]
+        self.most_freq_word = ("", 0) if best == -1 else (self.sentences[best], self.counts[best])
+
+    def recompute(self, node: int) -> None:
+        '''
+        Function description:
+        works the list of best sentences of a node out again from the lists of its children and the sentence that
+        ends at it, which are the best sentences of every part of its subtree.
+
+        :Input:
+        argv1 "node": the node whose list is recomputed, after the lists of its children are right
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(C * k_max * log(C * k_max)), where C is the number of children of the node
+
+        :Aux space complexity:
+        O(C * k_max), where C is the number of children of the node
+        '''
+        top, counts, k_max = self.top, self.counts, self.k_max
+        candidates = []
+        own = self.terminal[node]
+        if own != -1 and counts[own] > 0:
+            candidates.append(own)
+        child = self.first_child[node]
+        while child != -1:                                                  # every child's list is already best first
+            for sentence_id in top[child * k_max:child * k_max + k_max]:
+                if sentence_id == -1:
+                    break
+                candidates.append(sentence_id)
+            child = self.next_sibling[child]
+        candidates.sort(key=lambda sentence_id: (-counts[sentence_id], self.sentences[sentence_id]))
+        del candidates[k_max:]
+        candidates.extend([-1] * (k_max - len(candidates)))
+        top[node * k_max:node * k_max + k_max] = array("i", candidates)
+
+    def decay(self, factor: float) -> None:
+        '''
+        Function description:
+        scales the frequency of every sentence by factor, so old traffic counts for less than what is added after.
+        Scaling every frequency alike keeps their order, so the lists of best sentences only change where a
+        sentence has aged out: one whose frequency falls below the smallest normal float, where scaling would
+        first lose precision and then reach 0, is taken out like remove takes out a sentence with nothing left.
+        Counts become floats the first time.
+
+        :Input:
+        argv1 "factor": the scale, more than 0 and at most 1
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(S + A * M * C * k_max * log(C * k_max)), where S is the number of distinct sentences, A is the number
+        that age out, M is the length of the longest of them and C is the most children a node on their paths has
+
+        :Aux space complexity:
+        O(S + M + C * k_max), where S is the number of distinct sentences, M is the length of the longest that
+        ages out and C is the most children a node on its path has
+        '''
+        if not 0 < factor <= 1:
+            raise ValueError("factor must be more than 0 and at most 1")
+        counts = self.counts = array("d", [count * factor for count in self.counts])
+        aged = [sentence_id for sentence_id, count in enumerate(counts) if 0 < count < sys.float_info.min]
+        for sentence_id in aged:
+            counts[sentence_id] = 0
+        for sentence_id in aged:                                            # each path is recomputed once all are 0
+            nodes, depths = [0], [0]
+            self.descend(self.sentences[sentence_id], nodes, depths)
+            for node in reversed(nodes):
+                self.recompute(node)
+        best = self.top[0]
+        self.most_freq_word = ("", 0) if best == -1 else (self.sentences[best], self.counts[best])
+
+    def copy(self) -> "CatsTrie":
+        '''
+        Function description:
+        returns a copy with its own arrays and sentence table, so it can be changed without changing this one.
+        The arrays are copied whole, which is much faster than building the trie again.
+
+        :Output, return or postcondition:
+        returns a trie of the same class that answers the same as this one
+
+        :Time complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        trie = object.__new__(type(self))
+        for name, value in self.__dict__.items():
+            setattr(trie, name, value.copy() if isinstance(value, (list, dict)) else value[:] if isinstance(value, array) else value)
+        return trie
+
+    def reader_copy(self) -> "CatsTrie":
+        '''
+        Function description:
+        returns a copy that is only read from, for ConcurrentCatsTrie to publish. Only the flat arrays are copied.
+        The sentences list is shared, which is safe since sentences are only ever appended and the copy never
+        looks past the ids it knows, and sentence_ids is left out, since answering prompts never uses it. The copy
+        can't be changed, and this trie can only be changed by adding, removing and decaying.
+
+        :Output, return or postcondition:
+        returns a trie of the same class that answers the same as this one does now
+
+        :Time complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences, as copies of
+        flat arrays
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        trie = object.__new__(type(self))
+        for name, value in self.__dict__.items():
+            setattr(trie, name, value[:] if isinstance(value, array) else value)
+        trie.sentence_ids = None
+        return trie
+
+    def find_node(self, prompt: str) -> int:
+        '''
+        Function description:
+        follows the characters of a prompt down from the root.
+
+        :Input:
+        argv1 "prompt": a given string
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the length of the prompt
 
         :Aux space complexity:
         O(1)
         '''
-        for char in sentence:
-            index = self.char_to_index(char)
-            next_char = node.alphabet[index]
-            if next_char is not None and next_char.freq < freq:             # it checks to see if the next sentence has a higher frequency.
-                next_char.freq = freq                                       # this section is extremely important since it dictates the most likely sentence from each prompt
-                next_char.completed_word = sentence
-            node = next_char
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = 0
+        for character in prompt:                                            # iterates through the characters in the prompt
+            code = ord(character)
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:                          # checks to se if the prompt can be predicted
+                return -1
+            node = child                                                    # updates the current node to reflect the next next character in the prompt
+        return node
 
-    def autoComplete(self, prompt:str) ->str:
+    def autoComplete(self, prompt:str, k:int = None):
         '''
         Function description:
-        the function takes in a given prompt, using the characters from the prompt it iterates through the trie. 
-        Once it completes it's iteration, the node that it finishes on will have stored in it the most likely word.
+        the function takes in a given prompt, using the characters from the prompt it iterates through the trie.
+        Once it completes it's iteration, the node that it finishes on will have stored in it the most likely word,
+        and the k most likely ones when k is given, so the size of the matching part of the trie never matters.
 
         Approach description (if main function):
         :Input:
         argv1 "prompt": a given string
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
 
         :Output, return or postcondition:
+        returns the most likely sentence, or None if there is none. With k, returns a list of up to k sentences,
+        most likely first, with ties going to the lexicographically smaller sentence.
 
         :Time complexity:
-        O(X + Y), where X is the length of the prompt and Y is the length of the most frequence sentence in sentences
+        O(X + Y), where X is the length of the prompt and Y is the length of the most frequence sentence in sentences,
+        or O(X + k) with k
 
         :Aux space complexity:
-        O(1)
+        O(1), or O(k) with k
         '''
-        if prompt == "":                                                    # checks to see if there was a prompt given
+        if k is not None and not 0 <= k <= self.k_max:
+            raise ValueError(f"k must be between 0 and k_max, which is {self.k_max}")
+        if prompt == "" and k is None:                                      # checks to see if there was a prompt given
             return self.most_freq_word[0]                                   # if not then it will return the most frequent word
 
-        node = self.root
-        for char in prompt:                                                 # iterates through the characters in the prompt
-            index = self.char_to_index(char)                                # converts the character into an index
-            if node.alphabet[index] is None:                                # checks to se if the prompt can be predicted 
-                return None                                                 # if it is an unpredictable prompt, it returns None
-            node = node.alphabet[index]                                     # updates the current node to reflect the next next character in the prompt
-        return node.completed_word
+        return self.completions(self.find_node(prompt), k)
+
+    def completions(self, node: int, k: int = None):
+        '''
+        Function description:
+        reads the completions of the prefix of a node from its list of best sentences.
+
+        :Input:
+        argv1 "node": the node reached by a prompt, or -1 if no sentence starts with it
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns the most likely sentence, or None if there is none. With k, returns a list of up to k sentences,
+        most likely first.
+
+        :Time complexity:
+        O(Y), where Y is the length of the most likely sentence, or O(k) with k
+
+        :Aux space complexity:
+        O(1), or O(k) with k
+        '''
+        if k is None:                                                       # a node whose sentences were all removed has no best one
+            return None if node == -1 or self.top[node * self.k_max] == -1 else self.sentences[self.top[node * self.k_max]]
+        if node == -1:                                                      # if it is an unpredictable prompt, there are no completions
+            return []
+        start = node * self.k_max
+        return [self.sentences[sentence_id] for sentence_id in self.top[start:start + k] if sentence_id != -1]
+
+    def descend(self, prompt: str, nodes: list, depths: list) -> int:
+        '''
+        Function description:
+        carries on following a prompt down from the last node of a path that a part of it already reached.
+
+        :Input:
+        argv1 "prompt": a given string, which starts with the prefix of the last node of the path
+        argv2 "nodes": the nodes on the path, the root first, which the nodes reached are added to
+        argv3 "depths": the length of the prefix every node on the path ends at
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the number of characters of the prompt past the path
+
+        :Aux space complexity:
+        O(X), where X is the number of characters of the prompt past the path
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node, depth = nodes[-1], depths[-1]
+        for character in prompt[depth:]:
+            code = ord(character)
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            node = child
+            depth += 1
+            nodes.append(node)
+            depths.append(depth)
+        return node
+
+    def autoComplete_many(self, prompts: list, k: int = None) -> list:
+        '''
+        Function description:
+        answers autoComplete for a batch of prompts, walking the trie once for every distinct path instead of once
+        for every prompt. The distinct prompts are sorted, so every prompt shares the longest prefix it can with
+        the one before it, and the path of the previous prompt is kept. Only the nodes past the shared prefix are
+        dropped, and the walk goes on from the deepest node left.
+
+        :Input:
+        argv1 "prompts": a list of prompts
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns what autoComplete returns for every prompt, in the order of prompts
+
+        :Time complexity:
+        O(P + D log D * X), where P is the number of distinct prompts plus the number of distinct prefixes of them,
+        D is the number of distinct prompts and X is the length of the longest one, for the sort
+
+        :Aux space complexity:
+        O(D + X), where D is the number of distinct prompts and X is the length of the longest one
+        '''
+        if k is not None and not 0 <= k <= self.k_max:
+            raise ValueError(f"k must be between 0 and k_max, which is {self.k_max}")
+        answers = {}
+        nodes, depths = [0], [0]                                            # the path of the previous prompt, the root first
+        previous = ""
+        for prompt in sorted(set(prompts)):
+            if prompt.startswith(previous):                                 # keystrokes of one user extend the prompt before
+                shared = len(previous)
+            else:
+                shared = 0
+                limit = min(len(previous), len(prompt))
+                while shared < limit and previous[shared] == prompt[shared]:
+                    shared += 1
+            while depths[-1] > shared:                                      # keeps the nodes the prompts share
+                nodes.pop()
+                depths.pop()
+            if prompt == "" and k is None:
+                answers[prompt] = self.most_freq_word[0]
+            else:
+                answers[prompt] = self.completions(self.descend(prompt, nodes, depths), k)
+            previous = prompt
+        return [answers[prompt] for prompt in prompts]
+
+    def snapshot_arrays(self) -> list:
+        '''
+        Function description:
+        lists the arrays of the nodes in the order a snapshot stores them.
+
+        :Output, return or postcondition:
+        returns the char, first_child, next_sibling and top arrays
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return [self.char, self.first_child, self.next_sibling, self.top]
+
+    def snapshot_parts(self) -> list:
+        '''
+        Function description:
+        lays the trie out as a versioned binary snapshot. A header page holds the version, the byte order, the
+        kind of trie and the sizes, and is followed by the counts, the offset of every sentence in the text, the
+        arrays of the nodes and lastly the text, which is every sentence encoded as UTF-8 one after another.
+        The 8 byte arrays come first so every array starts aligned.
+
+        :Output, return or postcondition:
+        returns the parts of the snapshot as buffers, to be written one after another
+
+        :Time complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+
+        :Aux space complexity:
+        O(N + S), where N is the number of characters in the sentences and S is the number of sentences
+        '''
+        encoded = [sentence.encode("utf-8", "surrogatepass") for sentence in self.sentences]
+        offsets = array("q", [0])
+        for text in encoded:
+            offsets.append(offsets[-1] + len(text))
+        arrays = self.snapshot_arrays()
+        header = CATS_SNAPSHOT_HEADER.pack(CATS_SNAPSHOT_MAGIC, CATS_SNAPSHOT_VERSION, b"<" if sys.byteorder == "little" else b">",
+                                           self.snapshot_kind, memoryview(self.counts).format.encode(), self.k_max, len(arrays[0]), len(encoded), offsets[-1], CATS_SNAPSHOT_OFFSET)
+        parts = [header.ljust(CATS_SNAPSHOT_OFFSET, b"\0"), memoryview(self.counts).cast("B"), memoryview(offsets).cast("B")]
+        parts.extend(memoryview(values).cast("B") for values in arrays)
+        parts.append(b"".join(encoded))
+        return parts
+
+    def save(self, path: str) -> None:
+        '''
+        Function description:
+        saves the trie as a snapshot that FrozenCatsTrie.load can map. The file is written next to the path and
+        moved into place, so a worker never maps a half written snapshot.
+
+        :Input:
+        argv1 "path": the file being written
+
+        :Output, return or postcondition:
+        the snapshot can be opened with FrozenCatsTrie.load
+
+        :Time complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+
+        :Aux space complexity:
+        O(N + S), where N is the number of characters in the sentences and S is the number of sentences
+        '''
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as file:
+            for part in self.snapshot_parts():
+                file.write(part)
+        os.replace(partial, path)
+
+    def freeze(self) -> "FrozenCatsTrie":
+        '''
+        Function description:
+        makes a read only copy of the trie, laid out in one buffer the same way as a saved snapshot.
+
+        :Output, return or postcondition:
+        returns a FrozenCatsTrie that answers the same as the trie does now
+
+        :Time complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+
+        :Aux space complexity:
+        O(N + V * k_max), where N is the number of characters in the sentences and V is the number of nodes
+        '''
+        return FrozenCatsTrie(b"".join(self.snapshot_parts()))
+
+class RadixCatsTrie(CatsTrie):
+    snapshot_kind = b"R"
+
+    def __init__(self, sentences: list, k_max: int = 10) -> None:
+        '''
+        Function description:
+        initialises the class, a CatsTrie where every run of nodes with a single child is merged into one edge.
+        The edge into every node is labelled with a slice of one of the stored sentences, kept as the id of the
+        sentence in label_sentence, where the slice starts in label_start and its length in label_length, so no
+        strings are copied. char still holds the first character of the label, which keeps the siblings in
+        alphabetical order and lets a lookup pick the right child from one character.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+        argv2 "k_max": the most completions autoComplete can return for a prompt
+
+        :Output, return or postcondition:
+        the RadixCatsTrie stores the sentence in sentences as a path compressed Trie.
+
+        :Time complexity:
+        O(N + S * k_max), where N is the number of characters in sentences and S is the number of distinct sentences,
+        besides the sort
+
+        :Aux space complexity:
+        O(S * k_max), where S is the number of distinct sentences, besides the sentences themselves
+        '''
+        self.label_sentence = array("i", [-1])                              # the sentence the label of each node is a slice of
+        self.label_start = array("i", [0])                                  # where the label starts in that sentence
+        self.label_length = array("i", [0])                                 # the number of characters in the label
+        super().__init__(sentences, k_max)
+
+    def new_node(self, sentence_id: int, start: int, length: int, next_sibling: int) -> int:
+        '''
+        Function description:
+        adds a node with no children whose label is a slice of a sentence.
+
+        :Input:
+        argv1 "sentence_id": the id of the sentence the label is a slice of
+        argv2 "start": where the label starts in the sentence
+        argv3 "length": the number of characters in the label, at least 1
+        argv4 "next_sibling": the next child of the same parent
+
+        :Output, return or postcondition:
+        returns the new node
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        node = len(self.char)
+        self.char.append(ord(self.sentences[sentence_id][start]))
+        self.first_child.append(-1)
+        self.next_sibling.append(next_sibling)
+        self.top.extend(self.empty)
+        self.terminal.append(-1)
+        self.label_sentence.append(sentence_id)
+        self.label_start.append(start)
+        self.label_length.append(length)
+        return node
+
+    def split(self, node: int, length: int) -> int:
+        '''
+        Function description:
+        splits the edge into a node after length characters. The node keeps its place among its siblings with the
+        first part of the label, and a new node under it takes the rest, with the children, the sentence ending
+        there and the best sentences the node had, since every sentence through the node went on through the whole edge.
+
+        :Input:
+        argv1 "node": the node whose edge is split
+        argv2 "length": the number of characters kept above the split, between 1 and the label length - 1
+
+        :Output, return or postcondition:
+        returns the new node, the only child of node
+
+        :Time complexity:
+        O(k_max)
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        lower = self.new_node(self.label_sentence[node], self.label_start[node] + length, self.label_length[node] - length, -1)
+        self.first_child[lower] = self.first_child[node]
+        self.first_child[node] = lower
+        self.label_length[node] = length
+        self.terminal[lower], self.terminal[node] = self.terminal[node], -1
+        k_max = self.k_max
+        self.top[lower * k_max:lower * k_max + k_max] = self.top[node * k_max:node * k_max + k_max]
+        return lower
+
+    def build(self, sentences: list) -> None:
+        '''
+        Function description:
+        adds every sentence to an empty trie in one go, the same way as CatsTrie.build. Besides the nodes of the
+        previous sentence the stack holds how deep each one ends, and when the shared prefix ends inside the edge
+        into a popped node, that edge is split there first. The rest of the sentence is always a single new edge.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+
+        :Output, return or postcondition:
+        the RadixCatsTrie stores the sentence in sentences as a path compressed Trie.
+
+        :Time complexity:
+        O(N + S * k_max + S log S * M), where N is the number of characters in sentences, S is the number of
+        distinct sentences and M is the length of the longest one, for the sort
+
+        :Aux space complexity:
+        O(S * k_max), where S is the number of distinct sentences
+        '''
+        if len(self.char) > 1 or self.top[0] != -1:
+            raise ValueError("build needs an empty CatsTrie")
+        frequency = {}
+        for sentence in sentences:                                          # counts the duplicate sentences up front
+            frequency[sentence] = frequency.get(sentence, 0) + 1
+        self.sentences = sorted(frequency)
+        self.sentence_ids = {sentence: sentence_id for sentence_id, sentence in enumerate(self.sentences)}
+        self.counts = array("q", [frequency[sentence] for sentence in self.sentences])
+
+        first_child, next_sibling = self.first_child, self.next_sibling
+        stack = [0]                                                         # the nodes of the previous sentence, the root first
+        bests = [[]]                                                        # the best sentences found so far for every node on the stack
+        depths = [0]                                                        # the length of the prefix each node on the stack ends at
+        previous = ""
+        for sentence_id, sentence in enumerate(self.sentences):
+            shared = 0
+            limit = min(len(previous), len(sentence))
+            while shared < limit and previous[shared] == sentence[shared]:
+                shared += 1
+            last_child = -1                                                 # the last child of the top of the stack, the last node popped
+            while depths[-1] > shared:
+                if depths[-2] < shared:                                     # the shared prefix ends inside the edge, which is split there
+                    node = stack[-1]
+                    stack[-1] = self.split(node, shared - depths[-2])
+                    stack.insert(-1, node)
+                    bests.insert(-1, [])
+                    depths.insert(-1, shared)
+                last_child = stack[-1]
+                self.settle(stack, bests)
+                depths.pop()
+            if shared < len(sentence):                                      # the rest of the sentence becomes one new last child
+                new = self.new_node(sentence_id, shared, len(sentence) - shared, -1)
+                if last_child == -1:
+                    first_child[stack[-1]] = new
+                else:
+                    next_sibling[last_child] = new
+                stack.append(new)
+                bests.append([])
+                depths.append(len(sentence))
+            self.terminal[stack[-1]] = sentence_id
+            bests[-1] = [sentence_id]
+            previous = sentence
+        while stack:
+            self.settle(stack, bests)
+        if self.top[0] != -1:
+            self.most_freq_word = (self.sentences[self.top[0]], self.counts[self.top[0]])
+
+    def add(self, sentence: str) -> None:
+        '''
+        Function description:
+        Adds a sentence to the RadixCatsTrie, the same way as CatsTrie.add, one edge at a time. When the sentence
+        leaves an edge part of the way along, or ends inside it, the edge is split there, and whatever is left of
+        the sentence becomes a single new edge.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
 
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(M + E * k_max), where M is the length of the sentence and E is the number of edges on its path
+
+        :Aux space complexity:
+        O(k_max)
+        '''
+        sentence_id = self.sentence_ids.get(sentence)
+        if sentence_id is None:                                             # interns the sentence the first time it is seen
+            sentence_id = len(self.sentences)
+            self.sentence_ids[sentence] = sentence_id
+            self.sentences.append(sentence)
+            self.counts.append(0)
+        self.counts[sentence_id] += 1
+
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = depth = 0                                                    # starts at the root, with none of the sentence matched
+        self.promote(node, sentence_id)
+        while depth < len(sentence):
+            code = ord(sentence[depth])
+            previous, child = -1, first_child[node]
+            while child != -1 and char[child] < code:                       # finds the child, or where it belongs among the siblings
+                previous, child = child, next_sibling[child]
+            if child == -1 or char[child] != code:                          # the rest of the sentence is a new edge
+                new = self.new_node(sentence_id, depth, len(sentence) - depth, child)
+                if previous == -1:
+                    first_child[node] = new
+                else:
+                    next_sibling[previous] = new
+                self.promote(new, sentence_id)
+                node = new
+                break
+            label, start, length = self.sentences[self.label_sentence[child]], self.label_start[child], self.label_length[child]
+            shared, limit = 1, min(length, len(sentence) - depth)
+            while shared < limit and label[start + shared] == sentence[depth + shared]:
+                shared += 1
+            if shared < length:                                             # the sentence leaves the edge or ends inside it
+                self.split(child, shared)
+            node = child
+            depth += shared
+            self.promote(node, sentence_id)
+        self.terminal[node] = sentence_id
+        self.most_freq_word = (self.sentences[self.top[0]], self.counts[self.top[0]])
+
+    def find_node(self, prompt: str) -> int:
+        '''
+        Function description:
+        follows the prompt down from the root one edge at a time. A prompt that ends inside an edge reaches the
+        node below it, since every sentence with that prefix goes on along the rest of the edge.
+
+        :Input:
+        argv1 "prompt": a given string
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the length of the prompt
+
+        :Aux space complexity:
+        O(X), where X is the length of the prompt
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node = depth = 0
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            length = self.label_length[child]
+            if not self.sentences[self.label_sentence[child]].startswith(prompt[depth:depth + length], self.label_start[child]):
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += length
+        return node
+
+    def descend(self, prompt: str, nodes: list, depths: list) -> int:
+        '''
+        Function description:
+        carries on following a prompt down from the last node of a path one edge at a time. A node reached by
+        a prompt that ends inside its edge is still added, with the depth its whole edge ends at, so another
+        prompt only keeps it when it shares the whole edge.
+
+        :Input:
+        argv1 "prompt": a given string, which starts with the prefix of the last node of the path
+        argv2 "nodes": the nodes on the path, the root first, which the nodes reached are added to
+        argv3 "depths": the length of the prefix every node on the path ends at
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the number of characters of the prompt past the path
+
+        :Aux space complexity:
+        O(X), where X is the number of characters of the prompt past the path
+        '''
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        node, depth = nodes[-1], depths[-1]
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            length = self.label_length[child]
+            if not self.sentences[self.label_sentence[child]].startswith(prompt[depth:depth + length], self.label_start[child]):
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += length
+            nodes.append(node)
+            depths.append(depth)
+        return node
+
+    def snapshot_arrays(self) -> list:
+        '''
+        Function description:
+        lists the arrays of the nodes in the order a snapshot stores them, with the labels after the ones every
+        CatsTrie has. A snapshot also stores where every label starts in the UTF-8 text of its sentence and how
+        many bytes it takes, so a FrozenCatsTrie compares prompts with the text without decoding it.
+
+        :Output, return or postcondition:
+        returns the char, first_child, next_sibling, top, label_sentence, label_start, label_length, label_byte_start
+        and label_byte_length arrays
+
+        :Time complexity:
+        O(V), where V is the number of nodes, when the sentences are ASCII, otherwise O(V * M), where M is the
+        length of the longest sentence
+
+        :Aux space complexity:
+        O(V), where V is the number of nodes
+        '''
+        byte_start = array("i", self.label_start)
+        byte_length = array("i", self.label_length)
+        for node in range(1, len(self.char)):
+            sentence = self.sentences[self.label_sentence[node]]
+            if not sentence.isascii():                                      # a character can take more than one byte
+                start, end = self.label_start[node], self.label_start[node] + self.label_length[node]
+                byte_start[node] = len(sentence[:start].encode("utf-8", "surrogatepass"))
+                byte_length[node] = len(sentence[start:end].encode("utf-8", "surrogatepass"))
+        return super().snapshot_arrays() + [self.label_sentence, self.label_start, self.label_length, byte_start, byte_length]
+
+class SentenceTable:
+    def __init__(self, offsets: memoryview, text: memoryview) -> None:
+        '''
+        Function description:
+        initialises the class, the sentences of a snapshot, which are only decoded when they are looked up.
+
+        :Input:
+        argv1 "offsets": where every sentence starts in text, followed by the length of text
+        argv2 "text": every sentence encoded as UTF-8 one after another
+
+        :Output, return or postcondition:
+        the SentenceTable can be indexed by sentence id like the sentences list of a CatsTrie
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.offsets = offsets
+        self.text = text
+
+    def __len__(self) -> int:
+        '''
+        Function description:
+        counts the sentences in the table.
+
+        :Output, return or postcondition:
+        returns the number of sentences
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return len(self.offsets) - 1
+
+    def __getitem__(self, sentence_id: int) -> str:
+        '''
+        Function description:
+        decodes one sentence from the text.
+
+        :Input:
+        argv1 "sentence_id": the id of the sentence
+
+        :Output, return or postcondition:
+        returns the sentence
+
+        :Time complexity:
+        O(M), where M is the length of the sentence
+
+        :Aux space complexity:
+        O(M), where M is the length of the sentence
+        '''
+        if not 0 <= sentence_id < len(self.offsets) - 1:
+            raise IndexError("sentence id out of range")
+        return str(self.text[self.offsets[sentence_id]:self.offsets[sentence_id + 1]], "utf-8", "surrogatepass")
+
+class FrozenCatsTrie(CatsTrie):
+    def __init__(self, buffer) -> None:
+        '''
+        Function description:
+        initialises the class over a snapshot of a CatsTrie or a RadixCatsTrie, after checking its header. The
+        arrays are read straight from the buffer and the sentences are only decoded when they are returned, so
+        nothing is unpacked up front and a trie of any size opens in the same time. It can't be changed.
+
+        :Input:
+        argv1 "buffer": the snapshot, as bytes or a mapping of the file
+
+        :Output, return or postcondition:
+        the FrozenCatsTrie answers autoComplete like the trie the snapshot was made from
+
+        :Time complexity:
+        O(M), where M is the length of the most frequent sentence
+
+        :Aux space complexity:
+        O(M), where M is the length of the most frequent sentence, the buffer is shared
+        '''
+        view = memoryview(buffer)
+        header = bytes(view[:CATS_SNAPSHOT_HEADER.size])
+        if len(header) < CATS_SNAPSHOT_HEADER.size or header[:8] != CATS_SNAPSHOT_MAGIC:
+            raise ValueError("not a CatsTrie snapshot")
+        magic, version, byteorder, kind, typecode, k_max, node_count, sentence_count, text_size, offset = CATS_SNAPSHOT_HEADER.unpack(header)
+        if version != CATS_SNAPSHOT_VERSION:
+            raise ValueError(f"a version {version} snapshot, but only version {CATS_SNAPSHOT_VERSION} can be read")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            raise ValueError("the snapshot was written on a machine with the other byte order")
+        if kind not in (b"C", b"R"):
+            raise ValueError(f"unknown kind of trie {kind!r}")
+        if typecode not in (b"q", b"d"):
+            raise ValueError(f"unknown typecode of the counts {typecode!r}")
+        labels = 5 if kind == b"R" else 0
+        if len(view) != offset + 8 * sentence_count + 8 * (sentence_count + 1) + 4 * node_count * (3 + k_max + labels) + text_size:
+            raise ValueError("the snapshot is truncated or has extra data")
+
+        def take(typecode: str, length: int) -> memoryview:               # the next array of the snapshot
+            nonlocal offset
+            size = length * (4 if typecode in "Ii" else 8)
+            part = view[offset:offset + size].cast(typecode)
+            offset += size
+            return part
+
+        self.snapshot_kind = kind
+        self.k_max = k_max
+        self.counts = take(typecode.decode(), sentence_count)
+        offsets = take("q", sentence_count + 1)
+        self.char = take("I", node_count)
+        self.first_child = take("i", node_count)
+        self.next_sibling = take("i", node_count)
+        self.top = take("i", node_count * k_max)
+        if labels:
+            self.label_sentence = take("i", node_count)
+            self.label_start = take("i", node_count)
+            self.label_length = take("i", node_count)
+            self.label_byte_start = take("i", node_count)
+            self.label_byte_length = take("i", node_count)
+        self.sentences = SentenceTable(offsets, view[offset:])
+        self.buffer = buffer
+        self.text_start = offset                                            # where the text starts in the buffer
+        self.file = None
+        best = self.top[0]
+        self.most_freq_word = ("", 0) if best == -1 else (self.sentences[best], self.counts[best])
+
+    @classmethod
+    def load(cls, path: str) -> "FrozenCatsTrie":
+        '''
+        Function description:
+        maps a snapshot written by save read only into memory. Every process that loads the same file shares
+        one copy of it in the page cache, and only the pages that lookups touch are ever read from disk.
+
+        :Input:
+        argv1 "path": the snapshot file
+
+        :Output, return or postcondition:
+        returns the FrozenCatsTrie of the snapshot
+
+        :Time complexity:
+        O(M), where M is the length of the most frequent sentence
+
+        :Aux space complexity:
+        O(M), where M is the length of the most frequent sentence, the file is shared with the page cache
+        '''
+        file = open(path, "rb")
+        try:
+            trie = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (ValueError, OSError) as error:
+            file.close()
+            raise ValueError(f"{path} can't be loaded: {error}") from error
+        trie.file = file
+        return trie
+
+    def build(self, sentences: list) -> None:
+        '''
+        Function description:
+        refuses to add sentences, since a snapshot is read only.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def add(self, sentence: str) -> None:
+        '''
+        Function description:
+        refuses to add a sentence, since a snapshot is read only.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def remove(self, sentence: str, count: int = 1) -> None:
+        '''
+        Function description:
+        refuses to take a sentence away, since a snapshot is read only.
+
+        :Input:
+        argv1 "sentence": a string that was added to the CatsTrie
+        argv2 "count": how many times it is taken away
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def decay(self, factor: float) -> None:
+        '''
+        Function description:
+        refuses to scale the frequencies, since a snapshot is read only.
+
+        :Input:
+        argv1 "factor": the scale
+
+        :Output, return or postcondition:
+        raises TypeError
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        raise TypeError("a FrozenCatsTrie can't be changed")
+
+    def snapshot_arrays(self) -> list:
+        '''
+        Function description:
+        lists the arrays of the nodes in the order the snapshot stores them, so a FrozenCatsTrie can be saved again.
+
+        :Output, return or postcondition:
+        returns the arrays of the nodes, with the labels for the snapshot of a RadixCatsTrie
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        arrays = [self.char, self.first_child, self.next_sibling, self.top]
+        if self.snapshot_kind == b"R":
+            arrays += [self.label_sentence, self.label_start, self.label_length, self.label_byte_start, self.label_byte_length]
+        return arrays
+
+    def find_node(self, prompt: str) -> int:
+        '''
+        Function description:
+        follows the prompt down from the root, one character at a time in the snapshot of a CatsTrie and one edge
+        at a time in the snapshot of a RadixCatsTrie, where the prompt is encoded once and every edge compares its
+        bytes with the label's bytes in the text, so no sentence is decoded on the way down.
+
+        :Input:
+        argv1 "prompt": a given string
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the length of the prompt
+
+        :Aux space complexity:
+        O(X), where X is the length of the prompt
+        '''
+        if self.snapshot_kind != b"R":
+            return CatsTrie.find_node(self, prompt)
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        label_sentence, label_length = self.label_sentence, self.label_length
+        label_byte_start, label_byte_length = self.label_byte_start, self.label_byte_length
+        offsets, buffer, text_start = self.sentences.offsets, self.buffer, self.text_start
+        encoded = prompt.encode("utf-8", "surrogatepass")
+        node = depth = place = 0                                            # place is where depth is in encoded
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            end = place + label_byte_length[child]
+            piece = encoded[place:end]                                      # shorter when the prompt ends inside the edge
+            start = text_start + offsets[label_sentence[child]] + label_byte_start[child]
+            if buffer[start:start + len(piece)] != piece:
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += label_length[child]
+            place = end
+        return node
+
+    def descend(self, prompt: str, nodes: list, depths: list) -> int:
+        '''
+        Function description:
+        carries on following a prompt down from the last node of a path, the same way as the trie the snapshot
+        was made from, comparing the bytes of the labels in the snapshot of a RadixCatsTrie like find_node.
+
+        :Input:
+        argv1 "prompt": a given string, which starts with the prefix of the last node of the path
+        argv2 "nodes": the nodes on the path, the root first, which the nodes reached are added to
+        argv3 "depths": the length of the prefix every node on the path ends at
+
+        :Output, return or postcondition:
+        returns the node reached by the prompt, or -1 if no sentence starts with it
+
+        :Time complexity:
+        O(X), where X is the number of characters of the prompt past the path
+
+        :Aux space complexity:
+        O(X), where X is the number of characters of the prompt past the path
+        '''
+        if self.snapshot_kind != b"R":
+            return CatsTrie.descend(self, prompt, nodes, depths)
+        char, first_child, next_sibling = self.char, self.first_child, self.next_sibling
+        label_sentence, label_length = self.label_sentence, self.label_length
+        label_byte_start, label_byte_length = self.label_byte_start, self.label_byte_length
+        offsets, buffer, text_start = self.sentences.offsets, self.buffer, self.text_start
+        node, depth = nodes[-1], depths[-1]
+        encoded = prompt.encode("utf-8", "surrogatepass")
+        place = len(prompt[:depth].encode("utf-8", "surrogatepass"))        # where depth is in encoded
+        while depth < len(prompt):
+            code = ord(prompt[depth])
+            child = first_child[node]
+            while child != -1 and char[child] < code:
+                child = next_sibling[child]
+            if child == -1 or char[child] != code:
+                return -1
+            end = place + label_byte_length[child]
+            piece = encoded[place:end]                                      # shorter when the prompt ends inside the edge
+            start = text_start + offsets[label_sentence[child]] + label_byte_start[child]
+            if buffer[start:start + len(piece)] != piece:
+                return -1                                                   # the prompt leaves the edge part of the way along
+            node = child
+            depth += label_length[child]
+            place = end
+            nodes.append(node)
+            depths.append(depth)
+        return node
+
+    def close(self) -> None:
+        '''
+        Function description:
+        closes the snapshot file. The mapping itself is released once nothing uses it anymore.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if self.file is not None:
+            self.file.close()
+
+class ConcurrentCatsTrie:
+    def __init__(self, sentences: list, k_max: int = 10, trie_class: type = CatsTrie, batch_size: int = 1000) -> None:
+        '''
+        Function description:
+        initialises the class, which serves autoComplete from many threads while others add sentences. Readers
+        only ever use the published snapshot, a copy of the trie that is never changed, so they take no lock and
+        never see a half applied write. Writes are queued, and every batch_size of them, or on publish, one writer
+        at a time applies the batch to its own trie and publishes a fresh copy of it by swapping the reference.
+        A reader keeps the snapshot it started with until it returns, and an old snapshot is freed once no reader
+        uses it anymore. A snapshot copies only the flat arrays and shares the append only sentences list. Writes
+        show up for readers once their batch is published.
+
+        :Input:
+        argv1 "sentences": a list of words used to "train" the CatsTrie model
+        argv2 "k_max": the most completions autoComplete can return for a prompt
+        argv3 "trie_class": the class of trie being served, CatsTrie or RadixCatsTrie
+        argv4 "batch_size": the number of queued writes that publishes a new snapshot
+
+        :Output, return or postcondition:
+        snapshot is the published trie and epoch counts how many times one has been published
+
+        :Time complexity:
+        the time of building the trie, plus O(V * k_max + S) for its first snapshot, where V is the number of nodes
+        and S is the number of distinct sentences
+
+        :Aux space complexity:
+        two copies of the trie, plus the ones old readers still use
+        '''
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.batch_size = batch_size
+        self.writer = trie_class(sentences, k_max)                          # the trie the writes are applied to, only touched under lock
+        self.snapshot = self.writer.reader_copy()                           # the published trie the readers use
+        self.epoch = 0
+        self.pending = []                                                   # the queued writes, as (method, arguments)
+        self.lock = threading.Lock()
+
+    @property
+    def most_freq_word(self) -> tuple:
+        '''
+        Function description:
+        returns the most frequent sentence of the published snapshot and its frequency.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return self.snapshot.most_freq_word
+
+    def autoComplete(self, prompt: str, k: int = None):
+        '''
+        Function description:
+        answers autoComplete from the published snapshot, without taking a lock.
+
+        :Input:
+        argv1 "prompt": a given string
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns what autoComplete of the published snapshot returns
+
+        :Time complexity:
+        O(X + Y), where X is the length of the prompt and Y is the length of the most frequence sentence in sentences,
+        or O(X + k) with k
+
+        :Aux space complexity:
+        O(1), or O(k) with k
+        '''
+        return self.snapshot.autoComplete(prompt, k)
+
+    def autoComplete_many(self, prompts: list, k: int = None) -> list:
+        '''
+        Function description:
+        answers a batch of prompts from the published snapshot, without taking a lock. Every prompt of the batch
+        is answered from the same snapshot.
+
+        :Input:
+        argv1 "prompts": a list of prompts
+        argv2 "k": the number of ranked completions wanted, at most k_max, or None for only the most likely one
+
+        :Output, return or postcondition:
+        returns what autoComplete returns for every prompt, in the order of prompts
+
+        :Time complexity:
+        the time of autoComplete_many of the trie
+
+        :Aux space complexity:
+        the space of autoComplete_many of the trie
+        '''
+        return self.snapshot.autoComplete_many(prompts, k)
+
+    def queue(self, method: str, arguments: tuple) -> None:
+        '''
+        Function description:
+        queues a write, and applies the batch when it is full.
+
+        :Input:
+        argv1 "method": the name of the method of the trie that makes the write
+        argv2 "arguments": the arguments it is called with
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        with self.lock:
+            self.pending.append((method, arguments))
+            if len(self.pending) >= self.batch_size:
+                self.apply()
+
+    def add(self, sentence: str) -> None:
+        '''
+        Function description:
+        queues adding a sentence.
+
+        :Input:
+        argv1 "sentence": a string that has its characters placed within the Trie
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        self.queue("add", (sentence,))
+
+    def remove(self, sentence: str, count: int = 1) -> None:
+        '''
+        Function description:
+        queues taking a sentence away. Since earlier writes may still be queued, a sentence that isn't in the trie
+        when the batch is applied is left alone instead of raising.
+
+        :Input:
+        argv1 "sentence": a string that was added to the CatsTrie
+        argv2 "count": how many times it is taken away, more than 0
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        if count <= 0:
+            raise ValueError("count must be more than 0")
+        self.queue("remove", (sentence, count))
+
+    def decay(self, factor: float) -> None:
+        '''
+        Function description:
+        queues scaling the frequency of every sentence by factor.
+
+        :Input:
+        argv1 "factor": the scale, more than 0 and at most 1
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        O(1), or the time of publish when the batch is full
+
+        :Aux space complexity:
+        O(1), or the space of publish when the batch is full
+        '''
+        if not 0 < factor <= 1:
+            raise ValueError("factor must be more than 0 and at most 1")
+        self.queue("decay", (factor,))
+
+    def publish(self) -> None:
+        '''
+        Function description:
+        applies the queued writes and publishes the result, even if the batch isn't full.
+
+        :Output, return or postcondition:
+        readers see every write queued before the call
+
+        :Time complexity:
+        O(B * M * k_max + V * k_max + S), where B is the number of queued writes, M is the length of the longest
+        sentence, V is the number of nodes and S is the number of distinct sentences
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        with self.lock:
+            self.apply()
+
+    def apply(self) -> None:
+        '''
+        Function description:
+        applies the queued writes to the writer's trie in order, then publishes a reader_copy of it. Swapping the
+        reference is a single assignment, so a reader gets either the old snapshot or the new one.
+
+        :Output, return or postcondition:
+        None, it must be called holding the lock
+
+        :Time complexity:
+        O(B * M * k_max + V * k_max + S), where B is the number of queued writes, M is the length of the longest
+        sentence, V is the number of nodes and S is the number of distinct sentences
+
+        :Aux space complexity:
+        O(V * k_max + S), where V is the number of nodes and S is the number of distinct sentences
+        '''
+        if not self.pending:
+            return
+        writer = self.writer
+        for method, arguments in self.pending:
+            if method == "remove":
+                sentence_id = writer.sentence_ids.get(arguments[0])
+                if sentence_id is None or writer.counts[sentence_id] <= 0:  # the sentence isn't there to take away
+                    continue
+            getattr(writer, method)(*arguments)
+        self.pending = []
+        self.snapshot = writer.reader_copy()
+        self.epoch += 1
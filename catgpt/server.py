@@ -0,0 +1,431 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from catgpt import CatsTrie, FrozenCatsTrie, RadixCatsTrie
+
+def percentile(values: list, fraction: float) -> float:
+    '''
+    Function description:
+    finds a percentile of a list of values by the nearest rank.
+
+    :Input:
+    argv1 "values": a sorted list of numbers
+    argv2 "fraction": the percentile, between 0 and 1
+
+    :Output, return or postcondition:
+    returns the value at that percentile, or 0.0 for no values
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(fraction * len(values) + 0.5) - 1))]
+
+class AutocompleteServer:
+    def __init__(self, trie, window: float = 0.002, max_batch: int = 256, max_pipeline: int = 64,
+                 max_queue: int = 4096, samples: int = 100000) -> None:
+        '''
+        Function description:
+        initialises the class, which answers autoComplete for many clients from one loaded trie. Every client
+        sends one JSON request per line, {"id": ..., "prompt": "...", "k": 3}, where k is optional, or
+        {"op": "stats"}, and gets one JSON response per line in the same order, with the id it sent and either
+        the completions or an error. Prompts from every client wait in one queue, and a single batcher takes
+        them out as micro-batches: the first prompt opens a batch, which takes every prompt that arrives within
+        window seconds, up to max_batch, and answers them with one autoComplete_many for each k. A client can
+        send requests without waiting for the answers, but once max_pipeline of them are unanswered its line
+        stops being read, and a full queue stops every client, so a flood of requests slows the clients down
+        instead of filling memory.
+
+        :Input:
+        argv1 "trie": the trie being served, anything with autoComplete_many like CatsTrie or FrozenCatsTrie
+        argv2 "window": the longest a batch waits for more prompts, in seconds
+        argv3 "max_batch": the most prompts in a batch
+        argv4 "max_pipeline": the most unanswered requests of one client
+        argv5 "max_queue": the most prompts waiting for a batch
+        argv6 "samples": the number of recent latencies the percentiles are taken over
+
+        :Output, return or postcondition:
+        the AutocompleteServer is ready to be started with start
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.trie = trie
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pipeline = max_pipeline
+        self.max_queue = max_queue
+        self.latencies = deque(maxlen=samples)                              # the seconds from reading to answering the latest prompts
+        self.queries = 0
+        self.batches = 0
+        self.connections = 0
+        self.started = time.perf_counter()
+        self.queue = None                                                   # made in start, inside the event loop
+        self.server = None
+        self.batcher_task = None
+
+    async def start(self, path: str = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        '''
+        Function description:
+        starts listening on a Unix socket when path is given and on a local TCP port otherwise, and starts the
+        batcher.
+
+        :Input:
+        argv1 "path": the path of the Unix socket, or None for TCP
+        argv2 "host": the address to listen on for TCP
+        argv3 "port": the TCP port, or 0 for any free one
+
+        :Output, return or postcondition:
+        server is the listening asyncio server
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.queue = asyncio.Queue(self.max_queue)
+        self.batcher_task = asyncio.ensure_future(self.batcher())
+        if path is not None:
+            if os.path.exists(path):                                        # a socket left behind by an earlier run
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        self.started = time.perf_counter()
+
+    def address(self):
+        '''
+        Function description:
+        returns the address the server listens on, the socket path or a (host, port) pair.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        return self.server.sockets[0].getsockname()
+
+    async def close(self) -> None:
+        '''
+        Function description:
+        stops listening and stops the batcher.
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher_task.cancel()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''
+        Function description:
+        serves one client. Every line read becomes a future that is answered by the batcher, or right away for
+        stats and bad requests, and goes into the client's own bounded queue. A second task writes the answers
+        in the order the requests came, so the client can pipeline them.
+
+        :Input:
+        argv1 "reader": the stream the requests are read from
+        argv2 "writer": the stream the responses are written to
+
+        :Output, return or postcondition:
+        None, the connection is closed once the client stops sending and every answer is written
+
+        :Time complexity:
+        O(R), besides answering, where R is the number of requests
+
+        :Aux space complexity:
+        O(max_pipeline)
+        '''
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(self.max_pipeline)                          # the unanswered requests of the client, in order
+        responder = asyncio.ensure_future(self.respond(pending, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                answer = loop.create_future()
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    if request.get("op", "complete") == "stats":
+                        answer.set_result({"id": request_id, "stats": self.stats()})
+                    elif request.get("op", "complete") != "complete":
+                        raise ValueError(f"unknown op {request['op']!r}")
+                    elif not isinstance(request.get("prompt"), str):
+                        raise ValueError("prompt must be a string")
+                    elif request.get("k") is not None and (not isinstance(request["k"], int) or isinstance(request["k"], bool)):
+                        raise ValueError("k must be an integer")
+                    else:
+                        await self.queue.put((request["prompt"], request.get("k"), request_id, answer, time.perf_counter()))
+                except (ValueError, AttributeError) as error:               # bad JSON, or JSON that isn't an object
+                    answer.set_result({"id": request_id, "error": str(error)})
+                if not await self.enqueue(pending, answer, responder):      # waits while max_pipeline requests are unanswered
+                    break
+        finally:
+            await self.enqueue(pending, None, responder)
+            await responder
+            self.connections -= 1
+
+    async def enqueue(self, pending: asyncio.Queue, answer, responder: asyncio.Future) -> bool:
+        '''
+        Function description:
+        hands an answer to the task writing the client's responses, waiting while its queue is full. If the client
+        goes away, the writing task stops, and nothing would ever make room, so the wait ends with it.
+
+        :Input:
+        argv1 "pending": the futures of the client's requests in order
+        argv2 "answer": the future of the next request, or None once the client stops sending
+        argv3 "responder": the task writing the client's responses
+
+        :Output, return or postcondition:
+        returns False if the responses can't be written anymore, so the client should stop being read
+
+        :Time complexity:
+        O(1)
+
+        :Aux space complexity:
+        O(1)
+        '''
+        if responder.done():
+            return False
+        if not pending.full():
+            pending.put_nowait(answer)
+            return True
+        put = asyncio.ensure_future(pending.put(answer))
+        await asyncio.wait({put, responder}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            return False
+        return True
+
+    async def respond(self, pending: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        '''
+        Function description:
+        writes the answers of one client in order, waiting until the client reads them when its buffer is full.
+
+        :Input:
+        argv1 "pending": the futures of the client's requests in order, ending with None
+        argv2 "writer": the stream the responses are written to
+
+        :Output, return or postcondition:
+        None, the stream is closed at the end
+
+        :Time complexity:
+        O(R), where R is the number of requests
+
+        :Aux space complexity:
+        O(1)
+        '''
+        try:
+            while True:
+                answer = await pending.get()
+                if answer is None:
+                    break
+                writer.write(json.dumps(await answer).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:                                             # the client went away, its answers are dropped
+            pass
+        finally:
+            writer.close()
+
+    async def batcher(self) -> None:
+        '''
+        Function description:
+        takes the waiting prompts out as micro-batches and answers them, for as long as the server runs. The
+        prompts of a batch are grouped by k, so every group is answered by one autoComplete_many, which walks the
+        trie once for the prefixes they share.
+
+        :Output, return or postcondition:
+        None
+
+        :Time complexity:
+        the time of autoComplete_many for every batch
+
+        :Aux space complexity:
+        O(max_batch)
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request[1], []).append(request)
+            for k, requests in groups.items():
+                try:
+                    results = self.trie.autoComplete_many([request[0] for request in requests], k)
+                except (ValueError, TypeError) as error:                    # a k that the trie doesn't allow
+                    results = None
+                    message = str(error)
+                except Exception as error:                                  # anything else fails this group, not the batcher
+                    print(f"autoComplete_many failed: {error!r}", file=sys.stderr, flush=True)
+                    results = None
+                    message = f"{type(error).__name__}: {error}"
+                answered = time.perf_counter()
+                for index, (prompt, _, request_id, answer, arrived) in enumerate(requests):
+                    if answer.done():                                       # the connection was dropped
+                        continue
+                    if results is None:
+                        answer.set_result({"id": request_id, "error": message})
+                    else:
+                        answer.set_result({"id": request_id, "completions": results[index]})
+                    self.latencies.append(answered - arrived)
+            self.queries += len(batch)
+            self.batches += 1
+
+    def stats(self) -> dict:
+        '''
+        Function description:
+        reports the queries answered per second since the server started, the size of the batches, and the
+        p50 and p99 latency of the latest prompts, from being read to being answered.
+
+        :Output, return or postcondition:
+        returns a dictionary of the statistics
+
+        :Time complexity:
+        O(L log L), where L is the number of latencies kept
+
+        :Aux space complexity:
+        O(L), where L is the number of latencies kept
+        '''
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "queries": self.queries,
+            "batches": self.batches,
+            "mean_batch": self.queries / self.batches if self.batches else 0.0,
+            "qps": self.queries / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": 1000 * percentile(latencies, 0.5),
+            "p99_ms": 1000 * percentile(latencies, 0.99),
+            "connections": self.connections,
+            "uptime_seconds": elapsed,
+        }
+
+def load_trie(arguments: argparse.Namespace):
+    '''
+    Function description:
+    loads the trie to serve, from a snapshot written by CatsTrie.save, or by building it from a text file with
+    one sentence per line.
+
+    :Input:
+    argv1 "arguments": the parsed command line arguments
+
+    :Output, return or postcondition:
+    returns the trie
+
+    :Time complexity:
+    O(1) for a snapshot, or the time of building the trie
+
+    :Aux space complexity:
+    O(1) for a snapshot, the file is shared with the page cache, or the space of the trie
+    '''
+    if arguments.snapshot:
+        return FrozenCatsTrie.load(arguments.snapshot)
+    with open(arguments.sentences, encoding="utf-8") as file:
+        sentences = file.read().splitlines()
+    return (RadixCatsTrie if arguments.radix else CatsTrie)(sentences, arguments.k_max)
+
+async def serve(arguments: argparse.Namespace) -> None:
+    '''
+    Function description:
+    runs the server until it is interrupted, printing its statistics every report seconds.
+
+    :Input:
+    argv1 "arguments": the parsed command line arguments
+
+    :Output, return or postcondition:
+    None
+
+    :Time complexity:
+    as long as the server runs
+
+    :Aux space complexity:
+    the space of the trie and the connections
+    '''
+    server = AutocompleteServer(load_trie(arguments), arguments.window / 1000, arguments.max_batch,
+                                arguments.max_pipeline, arguments.max_queue)
+    await server.start(arguments.unix, arguments.host, arguments.port)
+    print(f"serving on {server.address()}", file=sys.stderr, flush=True)
+    try:
+        while True:
+            await asyncio.sleep(arguments.report or 3600)
+            if arguments.report:
+                print(json.dumps(server.stats()), file=sys.stderr, flush=True)
+    finally:
+        print(json.dumps(server.stats()), file=sys.stderr, flush=True)
+        await server.close()
+
+def main(argv: list = None) -> int:
+    '''
+    Function description:
+    starts the server from the command line. It only listens on a Unix socket or a local address, so it can
+    be load tested on one machine without a network.
+
+    :Input:
+    argv1 "argv": the command line arguments, or None for sys.argv
+
+    :Output, return or postcondition:
+    returns the exit status
+
+    :Time complexity:
+    as long as the server runs
+
+    :Aux space complexity:
+    the space of the trie and the connections
+    '''
+    parser = argparse.ArgumentParser(description="Serve catgpt autocomplete over newline delimited JSON.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--snapshot", help="a snapshot written by CatsTrie.save")
+    source.add_argument("--sentences", help="a text file with one sentence per line")
+    parser.add_argument("--radix", action="store_true", help="build a RadixCatsTrie from the sentences")
+    parser.add_argument("--k-max", type=int, default=10)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7341)
+    parser.add_argument("--window", type=float, default=2.0, help="milliseconds a batch waits for more prompts")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-pipeline", type=int, default=64, help="unanswered requests per connection")
+    parser.add_argument("--max-queue", type=int, default=4096, help="prompts waiting for a batch")
+    parser.add_argument("--report", type=float, default=0, help="seconds between statistics, 0 for only at exit")
+    arguments = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(arguments))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from fast_backups import ALGORITHMS, SolverStats, convert_to_adj_list, convert_to_flow_network
+
+def datacentre_limits(count: int, rng: random.Random, limits: tuple, unlimited: int) -> tuple:
+    '''
+    Function description:
+    draws the maxIn and maxOut limits of every datacentre uniformly from limits, or gives every datacentre
+    a limit that is never reached when limits is None.
+
+    :Input:
+    argv1 "count": the number of datacentres
+    argv2 "rng": the random number generator of the network
+    argv3 "limits": a (low, high) pair of integers, or None
+    argv4 "unlimited": a limit larger than any flow in the network
+
+    :Output, return or postcondition:
+    returns the maxIn and maxOut lists
+
+    :Time complexity:
+    O(n), where n is the number of datacentres
+
+    :Aux space complexity:
+    O(n), where n is the number of datacentres
+    '''
+    if limits is None:
+        return [unlimited] * count, [unlimited] * count
+    low, high = limits
+    return [rng.randint(low, high) for _ in range(count)], [rng.randint(low, high) for _ in range(count)]
+
+def layered_network(size: int, rng: random.Random, limits: tuple = None, capacity: int = 100) -> tuple:
+    '''
+    Function description:
+    a network of layers of datacentres, where every datacentre links to three random datacentres of the next
+    layer. The origin feeds the whole first layer and the last layer are the targets.
+
+    :Input:
+    argv1 "size": the rough number of connections
+    argv2 "rng": the random number generator of the network
+    argv3 "limits": a (low, high) range for the maxIn and maxOut limits, or None for no limits
+    argv4 "capacity": the largest capacity of a connection
+
+    :Output, return or postcondition:
+    returns the connections, maxIn, maxOut, origin and targets
+
+    :Time complexity:
+    O(size)
+
+    :Aux space complexity:
+    O(size)
+    '''
+    width = max(2, math.isqrt(size // 3))
+    depth = max(2, size // (3 * width))
+    layer = lambda index: range(1 + index * width, 1 + (index + 1) * width)
+    connections = [(0, node, rng.randint(1, capacity)) for node in layer(0)]
+    for index in range(depth - 1):
+        for node in layer(index):
+            for to_node in rng.sample(layer(index + 1), min(3, width)):
+                connections.append((node, to_node, rng.randint(1, capacity)))
+    maxIn, maxOut = datacentre_limits(1 + depth * width, rng, limits, capacity * len(connections))
+    return connections, maxIn, maxOut, 0, list(layer(depth - 1))
+
+def grid_network(size: int, rng: random.Random, limits: tuple = None, capacity: int = 100) -> tuple:
+    '''
+    Function description:
+    a square grid of datacentres with connections both ways between neighbours, from one corner to the
+    opposite one.
+
+    :Input:
+    argv1 "size": the rough number of connections
+    argv2 "rng": the random number generator of the network
+    argv3 "limits": a (low, high) range for the maxIn and maxOut limits, or None for no limits
+    argv4 "capacity": the largest capacity of a connection
+
+    :Output, return or postcondition:
+    returns the connections, maxIn, maxOut, origin and targets
+
+    :Time complexity:
+    O(size)
+
+    :Aux space complexity:
+    O(size)
+    '''
+    side = max(2, math.isqrt(size // 4))
+    connections = []
+    for row in range(side):
+        for column in range(side):
+            node = row * side + column
+            for neighbour in ((node + 1) if column + 1 < side else None, (node + side) if row + 1 < side else None):
+                if neighbour is not None:
+                    connections.append((node, neighbour, rng.randint(1, capacity)))
+                    connections.append((neighbour, node, rng.randint(1, capacity)))
+    maxIn, maxOut = datacentre_limits(side * side, rng, limits, capacity * len(connections))
+    return connections, maxIn, maxOut, 0, [side * side - 1]
+
+def random_sparse_network(size: int, rng: random.Random, limits: tuple = None, capacity: int = 100) -> tuple:
+    '''
+    Function description:
+    a network with four connections per datacentre between random datacentres, to three random targets.
+
+    :Input:
+    argv1 "size": the number of connections
+    argv2 "rng": the random number generator of the network
+    argv3 "limits": a (low, high) range for the maxIn and maxOut limits, or None for no limits
+    argv4 "capacity": the largest capacity of a connection
+
+    :Output, return or postcondition:
+    returns the connections, maxIn, maxOut, origin and targets
+
+    :Time complexity:
+    O(size)
+
+    :Aux space complexity:
+    O(size)
+    '''
+    count = max(4, size // 4)
+    connections = [(rng.randrange(count), rng.randrange(count), rng.randint(1, capacity)) for _ in range(size)]
+    maxIn, maxOut = datacentre_limits(count, rng, limits, capacity * len(connections))
+    return connections, maxIn, maxOut, 0, rng.sample(range(1, count), 3)
+
+def dense_mesh_network(size: int, rng: random.Random, limits: tuple = None, capacity: int = 100) -> tuple:
+    '''
+    Function description:
+    a network where every datacentre links to every other one.
+
+    :Input:
+    argv1 "size": the rough number of connections
+    argv2 "rng": the random number generator of the network
+    argv3 "limits": a (low, high) range for the maxIn and maxOut limits, or None for no limits
+    argv4 "capacity": the largest capacity of a connection
+
+    :Output, return or postcondition:
+    returns the connections, maxIn, maxOut, origin and targets
+
+    :Time complexity:
+    O(size)
+
+    :Aux space complexity:
+    O(size)
+    '''
+    count = max(3, math.isqrt(size) + 1)
+    connections = [(node, to_node, rng.randint(1, capacity)) for node in range(count) for to_node in range(count) if node != to_node]
+    maxIn, maxOut = datacentre_limits(count, rng, limits, capacity * len(connections))
+    return connections, maxIn, maxOut, 0, [count - 1]
+
+def zigzag_network(size: int, rng: random.Random, limits: tuple = None, capacity: int = 10 ** 9) -> tuple:
+    '''
+    Function description:
+    the zig-zag ladder, the classic bad case for augmenting along arbitrary paths. Two rails of huge capacity
+    run from the origin to the target, joined by rungs of capacity 1 that point down and up in turn, and the
+    rungs are added last so a depth first search tries them first. Every augmenting path that takes a rung is
+    held to a bottleneck of 1, and the huge capacities show whether a solver depends on them.
+
+    :Input:
+    argv1 "size": the rough number of connections
+    argv2 "rng": the random number generator of the network, unused since the ladder is fixed
+    argv3 "limits": a (low, high) range for the maxIn and maxOut limits, or None for no limits
+    argv4 "capacity": the capacity of the rails
+
+    :Output, return or postcondition:
+    returns the connections, maxIn, maxOut, origin and targets
+
+    :Time complexity:
+    O(size)
+
+    :Aux space complexity:
+    O(size)
+    '''
+    rungs = max(1, size // 3)
+    top = lambda index: 2 + 2 * index
+    bottom = lambda index: 3 + 2 * index
+    connections = [(0, top(0), capacity), (0, bottom(0), capacity)]
+    for index in range(rungs - 1):
+        connections.append((top(index), top(index + 1), capacity))
+        connections.append((bottom(index), bottom(index + 1), capacity))
+    connections += [(top(rungs - 1), 1, capacity), (bottom(rungs - 1), 1, capacity)]
+    for index in range(rungs):
+        connections.append((top(index), bottom(index), 1) if index % 2 == 0 else (bottom(index), top(index), 1))
+    maxIn, maxOut = datacentre_limits(2 + 2 * rungs, rng, limits, 3 * capacity)
+    return connections, maxIn, maxOut, 0, [1]
+
+GENERATORS = {
+    "layered": layered_network,
+    "grid": grid_network,
+    "random_sparse": random_sparse_network,
+    "dense_mesh": dense_mesh_network,
+    "zigzag": zigzag_network,
+}
+
+def timed(function, *arguments) -> tuple:
+    '''
+    Function description:
+    calls the function and measures how long it took.
+
+    :Input:
+    argv1 "function": the function being measured
+    argv2 "arguments": the arguments it is called with
+
+    :Output, return or postcondition:
+    returns what the function returned and the wall time in seconds
+
+    :Time complexity:
+    the time of the function
+
+    :Aux space complexity:
+    the space of the function
+    '''
+    start = time.perf_counter()
+    value = function(*arguments)
+    return value, time.perf_counter() - start
+
+def peak_memory(function, *arguments) -> int:
+    '''
+    Function description:
+    calls the function with tracemalloc running and returns the most memory it had allocated at once.
+    This runs much slower than the timed calls, so it is measured separately from them.
+
+    :Input:
+    argv1 "function": the function being measured
+    argv2 "arguments": the arguments it is called with
+
+    :Output, return or postcondition:
+    returns the peak number of bytes allocated during the call
+
+    :Time complexity:
+    the time of the function
+
+    :Aux space complexity:
+    the space of the function
+    '''
+    tracemalloc.start()
+    try:
+        function(*arguments)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def solve(algorithm: str, network, origin: int, targets: list, stats: SolverStats = None) -> float:
+    '''
+    Function description:
+    solves a copy of the network built by convert_to_flow_network, as maxThroughput does.
+
+    :Input:
+    argv1 "algorithm": the name of the max flow algorithm, one of the keys of ALGORITHMS
+    argv2 "network": the FlowNetwork, which is left unchanged
+    argv3 "origin": the origin datacentre
+    argv4 "targets": the target datacentres
+    argv5 "stats": an optional SolverStats filled in by the solver
+
+    :Output, return or postcondition:
+    returns the maximum flow from the origin to the targets
+
+    :Time complexity:
+    the time of the chosen algorithm
+
+    :Aux space complexity:
+    O(E) for the copy, plus the space of the chosen algorithm
+    '''
+    return ALGORITHMS[algorithm](network.copy(), 2 * origin + 1, [2 * target + 1 for target in targets], stats=stats)[0]
+
+def run_case(generator: str, size: int, seed: int, algorithms: list, reference, limits: tuple, repeat: int, memory: bool) -> dict:
+    '''
+    Function description:
+    benchmarks every algorithm on one generated network. Building the adjacency list and the flow network
+    are timed apart from solving, every time is the best of repeat runs, and every throughput is checked
+    against the reference answer for the network.
+
+    :Input:
+    argv1 "generator": the name of the generator, one of the keys of GENERATORS
+    argv2 "size": the rough number of connections
+    argv3 "seed": the seed of the generator
+    argv4 "algorithms": the names of the algorithms being measured
+    argv5 "reference": the name of the algorithm that gives the reference answer, or the answer itself
+    argv6 "limits": a (low, high) range for the maxIn and maxOut limits, or None for no limits
+    argv7 "repeat": the number of timed runs of everything
+    argv8 "memory": boolean value that also measures peak memory
+
+    :Output, return or postcondition:
+    returns a dictionary with the results for the network
+
+    :Time complexity:
+    the time of the algorithms, repeat times
+
+    :Aux space complexity:
+    O(V+E), where V is the number of datacentres and E is the number of connections
+    '''
+    connections, maxIn, maxOut, origin, targets = GENERATORS[generator](size, random.Random(seed), limits)
+    network = convert_to_flow_network(connections, maxIn, maxOut)
+    case = {
+        "generator": generator, "size": size, "seed": seed, "limits": limits,
+        "datacentres": len(maxIn), "connections": len(connections),
+        "adj_list_seconds": min(timed(convert_to_adj_list, connections, maxIn, maxOut)[1] for _ in range(repeat)),
+        "build_seconds": min(timed(convert_to_flow_network, connections, maxIn, maxOut)[1] for _ in range(repeat)),
+    }
+    if memory:
+        case["adj_list_peak_bytes"] = peak_memory(convert_to_adj_list, connections, maxIn, maxOut)
+        case["build_peak_bytes"] = peak_memory(convert_to_flow_network, connections, maxIn, maxOut)
+    if isinstance(reference, str):
+        reference = solve(reference, network, origin, targets)
+    case["reference"] = reference
+
+    case["algorithms"] = {}
+    for algorithm in algorithms:
+        stats = SolverStats()
+        throughput, seconds = timed(solve, algorithm, network, origin, targets, stats)
+        for _ in range(repeat - 1):
+            seconds = min(seconds, timed(solve, algorithm, network, origin, targets)[1])
+        result = {"throughput": throughput, "correct": throughput == reference, "solve_seconds": seconds}
+        result.update(stats.as_dict())
+        if memory:
+            result["solve_peak_bytes"] = peak_memory(solve, algorithm, network, origin, targets)
+        case["algorithms"][algorithm] = result
+    return case
+
+def current_commit() -> str:
+    '''
+    Function description:
+    returns the git commit being benchmarked, or None outside a git checkout.
+
+    :Time complexity:
+    O(1)
+
+    :Aux space complexity:
+    O(1)
+    '''
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: list = None) -> int:
+    '''
+    Function description:
+    runs the benchmark from the command line and writes a JSON report. The reference answers come from
+    the reference algorithm, or from the report of an earlier run given as a baseline, so throughputs can be
+    compared across commits. Returns 1 when any algorithm disagrees with a reference answer.
+
+    :Input:
+    argv1 "argv": the command line arguments, or None for sys.argv
+
+    :Output, return or postcondition:
+    returns the exit status
+
+    :Time complexity:
+    the time of every case
+
+    :Aux space complexity:
+    O(V+E) for the largest network
+    '''
+    parser = argparse.ArgumentParser(description="Benchmark the max flow solvers of fast_backups on generated datacentre networks.")
+    parser.add_argument("--generators", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 5000], help="rough number of connections")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument("--reference", default="dinic", choices=list(ALGORITHMS), help="algorithm giving the reference answers")
+    parser.add_argument("--baseline", help="an earlier report whose reference answers are used instead")
+    parser.add_argument("--limits", nargs=2, type=int, metavar=("LOW", "HIGH"), help="range of the maxIn and maxOut limits")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs, the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--output", default="benchmark.json")
+    arguments = parser.parse_args(argv)
+
+    known = {}                                                                      # reference answers by generator, size, seed and limits
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            for case in json.load(file)["cases"]:
+                known[case["generator"], case["size"], case["seed"], json.dumps(case["limits"])] = case["reference"]
+    limits = tuple(arguments.limits) if arguments.limits else None
+
+    cases = []
+    mismatches = 0
+    for generator in arguments.generators:
+        for size in arguments.sizes:
+            for seed in arguments.seeds:
+                reference = known.get((generator, size, seed, json.dumps(limits and list(limits))), arguments.reference)
+                case = run_case(generator, size, seed, arguments.algorithms, reference, limits, arguments.repeat, not arguments.no_memory)
+                cases.append(case)
+                for algorithm, result in case["algorithms"].items():
+                    mismatches += not result["correct"]
+                    print(f"{generator:>13} {size:>7} {seed:>3} {algorithm:>17} build {case['build_seconds']:8.4f}s "
+                          f"solve {result['solve_seconds']:8.4f}s {result['augmentations']:>9} augmentations"
+                          f"{'' if result['correct'] else '  MISMATCH'}")
+
+    report = {
+        "commit": current_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "reference": arguments.baseline or arguments.reference,
+        "cases": cases,
+    }
+    with open(arguments.output, "w") as file:
+        json.dump(report, file, indent=2)
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
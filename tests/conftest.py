@@ -0,0 +1,6 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("fast_backups", "catgpt"):                                   # the modules are imported the way their scripts import them
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,232 @@
+import collections
+import itertools
+import random
+
+import pytest
+
+from catgpt import CatsTrie, ConcurrentCatsTrie, FrozenCatsTrie, RadixCatsTrie
+
+LAYOUTS = {
+    "catstrie": lambda sentences, k_max=10: CatsTrie(sentences, k_max),
+    "radix": lambda sentences, k_max=10: RadixCatsTrie(sentences, k_max),
+}
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_remove_to_empty_prefix(layout, tmp_path):
+    trie = LAYOUTS[layout](["abab", "bab"])
+    trie.remove("abab")
+    assert trie.autoComplete("aba") is None
+    assert trie.autoComplete("aba", 3) == []
+    assert trie.autoComplete("b") == "bab"
+    path = str(tmp_path / "trie.cats")
+    trie.save(path)
+    for frozen in (trie.freeze(), FrozenCatsTrie.load(path)):
+        assert frozen.autoComplete("aba") is None
+        assert frozen.autoComplete_many(["aba", "b"]) == [None, "bab"]
+        frozen.close()
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_remove_everything(layout):
+    trie = LAYOUTS[layout](["abc", "abc"])
+    trie.remove("abc", 2)
+    assert trie.autoComplete("a") is None
+    assert trie.autoComplete("") == ""
+    assert trie.most_freq_word == ("", 0)
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_decay_ages_sentences_out(layout):
+    trie = LAYOUTS[layout](["abc", "abd", "abd"])
+    for _ in range(1100):                                                   # past the point where halving reaches 0.0
+        trie.decay(0.5)
+    assert trie.autoComplete("a") is None
+    assert trie.autoComplete("a", 2) == []
+    assert trie.most_freq_word == ("", 0)
+    with pytest.raises(ValueError):
+        trie.remove("abc")
+    trie.add("abc")
+    assert trie.autoComplete("a", 2) == ["abc"]
+
+
+def random_sentence(rng):
+    return "".join(rng.choice("abcé") for _ in range(rng.randint(1, 5)))
+
+PROMPTS = [""] + ["".join(letters) for length in (1, 2, 3) for letters in itertools.product("abcé", repeat=length)]
+PROMPTS += ["d", "abcabc"]                                                  # prompts no sentence starts with
+
+def expected_completions(counts, prompt, k):
+    # every sentence still in use that starts with the prompt, most frequent first and ties in order
+    ranked = sorted((-count, sentence) for sentence, count in counts.items() if count > 0 and sentence.startswith(prompt))
+    return [sentence for _, sentence in ranked[:k]]
+
+def expected_best(counts, prompt):
+    ranked = expected_completions(counts, prompt, 1)
+    return ranked[0] if ranked else "" if prompt == "" else None            # an empty prompt gets "" when there is no sentence
+
+def check_best(trie, counts):
+    for prompt in PROMPTS:
+        assert trie.autoComplete(prompt) == expected_best(counts, prompt)
+    best = expected_best(counts, "")
+    assert trie.most_freq_word == ((best, counts[best]) if best else ("", 0))
+
+def test_catstrie_matches_a_counter():
+    rng = random.Random("catstrie")
+    for _ in range(30):
+        sentences = [random_sentence(rng) for _ in range(rng.randint(0, 12))]
+        extra = [rng.choice(sentences + [random_sentence(rng)]) for _ in range(rng.randint(0, 8))]
+        trie = CatsTrie(sentences)
+        for sentence in extra:
+            trie.add(sentence)
+        counts = collections.Counter(sentences + extra)
+        check_best(trie, counts)
+        prefixes = {sentence[:length] for sentence in counts for length in range(1, len(sentence) + 1)}
+        assert len(trie.char) == len(prefixes) + 1                          # one node per distinct prefix, and the root
+        for node in range(len(trie.char)):                                  # children are linked in alphabetical order
+            child, previous = trie.first_child[node], -1
+            while child != -1:
+                assert trie.char[child] > previous
+                child, previous = trie.next_sibling[child], trie.char[child]
+
+def check_top_k(trie, counts, k_max):
+    for prompt in PROMPTS:
+        for k in range(k_max + 1):
+            assert trie.autoComplete(prompt, k) == expected_completions(counts, prompt, k)
+    with pytest.raises(ValueError):
+        trie.autoComplete("a", k_max + 1)
+
+def test_top_k_matches_a_counter():
+    rng = random.Random("top k")
+    for _ in range(30):
+        k_max = rng.randint(1, 4)
+        sentences = [random_sentence(rng) for _ in range(rng.randint(0, 15))]
+        trie = CatsTrie(sentences, k_max)
+        counts = collections.Counter(sentences)
+        for _ in range(rng.randint(0, 10)):                                 # adds can reorder and push out candidates
+            sentence = rng.choice(sentences + [random_sentence(rng)])
+            trie.add(sentence)
+            counts[sentence] += 1
+        check_top_k(trie, counts, k_max)
+
+def test_radix_matches_a_counter():
+    rng = random.Random("radix")
+    for _ in range(30):
+        k_max = rng.randint(1, 4)
+        sentences = [random_sentence(rng) for _ in range(rng.randint(0, 15))]
+        trie = RadixCatsTrie(sentences, k_max)
+        counts = collections.Counter(sentences)
+        for _ in range(rng.randint(0, 10)):                                 # adds split edges and extend leaves
+            sentence = rng.choice(sentences + [random_sentence(rng)])
+            trie.add(sentence)
+            counts[sentence] += 1
+        check_best(trie, counts)
+        check_top_k(trie, counts, k_max)
+        assert len(trie.char) <= len(CatsTrie(list(counts.elements()), k_max).char)
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_frozen_snapshots_answer_like_the_trie(layout, tmp_path):
+    rng = random.Random(f"frozen {layout}")
+    path = str(tmp_path / "trie.cats")
+    for _ in range(20):
+        k_max = rng.randint(1, 4)
+        sentences = [random_sentence(rng) for _ in range(rng.randint(0, 15))]
+        trie = LAYOUTS[layout](sentences, k_max)
+        counts = collections.Counter(sentences)
+        for _ in range(rng.randint(0, 5)):
+            sentence = random_sentence(rng)                                 # labels with é take more bytes than characters
+            trie.add(sentence)
+            counts[sentence] += 1
+        trie.save(path)
+        frozen, loaded = trie.freeze(), FrozenCatsTrie.load(path)
+        again = str(tmp_path / "again.cats")
+        loaded.save(again)                                                  # a frozen trie saves the same snapshot
+        with open(path, "rb") as first, open(again, "rb") as second:
+            assert first.read() == second.read()
+        for snapshot in (frozen, loaded):
+            check_best(snapshot, counts)
+            check_top_k(snapshot, counts, k_max)
+            with pytest.raises(TypeError):
+                snapshot.add("a")
+            snapshot.close()
+
+def test_frozen_snapshots_reject_bad_files(tmp_path):
+    trie = RadixCatsTrie(["abc", "abd"])
+    path = str(tmp_path / "trie.cats")
+    trie.save(path)
+    with open(path, "rb") as file:
+        saved = file.read()
+    for data in (b"", saved[:8] + b"\xff\xff" + saved[10:], saved[:-1], saved + b"\0"):
+        with open(path, "wb") as file:
+            file.write(data)
+        with pytest.raises(ValueError):
+            FrozenCatsTrie.load(path)
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_batches_answer_like_single_prompts(layout):
+    rng = random.Random(f"many {layout}")
+    for _ in range(20):
+        k_max = rng.randint(1, 4)
+        sentences = [random_sentence(rng) for _ in range(rng.randint(0, 15))]
+        trie = LAYOUTS[layout](sentences, k_max)
+        prompts = [rng.choice(PROMPTS) for _ in range(40)]                  # unsorted, with repeats
+        for snapshot in (trie, trie.freeze()):
+            for k in (None, 0, k_max):
+                assert snapshot.autoComplete_many(prompts, k) == [snapshot.autoComplete(prompt, k) for prompt in prompts]
+        assert trie.autoComplete_many([]) == []
+        with pytest.raises(ValueError):
+            trie.autoComplete_many(["a"], k_max + 1)
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_remove_and_decay_match_a_counter(layout, tmp_path):
+    rng = random.Random(f"remove {layout}")
+    path = str(tmp_path / "trie.cats")
+    for _ in range(15):
+        k_max = rng.randint(1, 4)
+        sentences = [random_sentence(rng) for _ in range(rng.randint(0, 12))]
+        trie = LAYOUTS[layout](sentences, k_max)
+        counts = collections.Counter(sentences)
+        for _ in range(20):
+            operation = rng.choice(["add", "add", "remove", "remove all", "decay"])
+            present = sorted(sentence for sentence, count in counts.items() if count > 0)
+            if operation == "add":
+                sentence = rng.choice(present + [random_sentence(rng)])
+                trie.add(sentence)
+                counts[sentence] += 1
+            elif operation.startswith("remove") and present:
+                sentence = rng.choice(present)
+                count = 10 if operation == "remove all" else 1
+                trie.remove(sentence, count)
+                counts[sentence] = max(counts[sentence] - count, 0)
+            elif operation == "decay":
+                factor = rng.choice([0.5, 0.75, 1])
+                trie.decay(factor)
+                for sentence in counts:
+                    counts[sentence] *= factor
+            check_best(trie, counts)
+            check_top_k(trie, counts, k_max)
+        trie.save(path)
+        for frozen in (trie.freeze(), FrozenCatsTrie.load(path)):
+            check_best(frozen, counts)
+            check_top_k(frozen, counts, k_max)
+            frozen.close()
+
+@pytest.mark.parametrize("trie_class", [CatsTrie, RadixCatsTrie])
+def test_concurrent_trie_matches_a_counter(trie_class):
+    rng = random.Random(f"concurrent {trie_class.__name__}")
+    sentences = [random_sentence(rng) for _ in range(10)]
+    counts = collections.Counter(sentences)
+    trie = ConcurrentCatsTrie(sentences, 3, trie_class, batch_size=4)
+    check_best(trie, counts)
+    check_top_k(trie, counts, 3)
+    for _ in range(60):                                                     # full batches publish along the way
+        sentence = random_sentence(rng)
+        if counts[sentence] > 0 and rng.random() < 0.5:
+            count = rng.choice([1, 10])
+            trie.remove(sentence, count)
+            counts[sentence] = max(counts[sentence] - count, 0)
+        else:
+            trie.add(sentence)
+            counts[sentence] += 1
+    trie.remove("not a sentence")                                           # a queued remove of a missing sentence is ignored
+    trie.publish()
+    check_best(trie, counts)
+    check_top_k(trie, counts, 3)
+    assert trie.autoComplete_many(PROMPTS) == [expected_best(counts, prompt) for prompt in PROMPTS]
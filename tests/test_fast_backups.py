@@ -0,0 +1,358 @@
+import random
+
+import pytest
+
+from fast_backups import (ALGORITHMS, SNAPSHOT_VERSION, IncrementalThroughput, NetworkSnapshot, SolverStats, ThroughputIndex,
+                          ThroughputResult, convert_to_flow_network, failure_sweep, load_flow_network, max_throughput_batch,
+                          maxThroughput, reduce_datacentres, save_network_snapshot, solve_query, write_edge_list,
+                          write_node_limits)
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_float_capacities_leave_rounding_excess(algorithm):
+    connections = [(0, 1, 0.01), (0, 1, 0.75), (2, 0, 1.86), (2, 1, 1.12), (0, 2, 1.12), (2, 2, 1.49)]
+    assert maxThroughput(connections, [6.39, 5.68, 4.26], [8, 6, 11], 0, [2], algorithm=algorithm) == pytest.approx(1.12)
+
+@pytest.mark.parametrize("algorithm", [name for name in ALGORITHMS if name != "dinic"])
+@pytest.mark.parametrize("budget", [{"time_limit": 1.0}, {"max_augmentations": 5}])
+def test_bounded_solve_rejects_other_algorithms(algorithm, budget):
+    with pytest.raises(ValueError):
+        maxThroughput([(0, 1, 3)], [5, 5], [5, 5], 0, [1], algorithm=algorithm, **budget)
+    for allowed in (None, "dinic"):
+        assert maxThroughput([(0, 1, 3)], [5, 5], [5, 5], 0, [1], algorithm=allowed, **budget).lower == 3
+
+def random_problem(rng, capacity):
+    n = rng.randint(2, 5)
+    connections = [(rng.randrange(n), rng.randrange(n), capacity(rng)) for _ in range(rng.randint(0, 3 * n))]
+    maxIn = [capacity(rng) for _ in range(n)]
+    maxOut = [capacity(rng) for _ in range(n)]
+    origin = rng.randrange(n)
+    targets = rng.sample([node for node in range(n) if node != origin], rng.randint(1, n - 1))
+    return connections, maxIn, maxOut, origin, targets
+
+def brute_force_cut(connections, maxIn, maxOut, origin, targets):
+    # tries every split of the in/out nodes with the origin's out node on the source side and the targets'
+    # out nodes on the sink side, and returns the smallest total capacity leaving the source side
+    n = len(maxIn)
+    edges = [(2 * node, 2 * node + 1, min(maxIn[node], maxOut[node])) for node in range(n)]
+    edges += [(2 * from_node + 1, 2 * to_node, capacity) for from_node, to_node, capacity in connections]
+    fixed = {2 * origin + 1} | {2 * target + 1 for target in targets}
+    free = [node for node in range(2 * n) if node not in fixed]
+    best = None
+    for mask in range(1 << len(free)):
+        source_side = {2 * origin + 1} | {node for bit, node in enumerate(free) if mask >> bit & 1}
+        cut = sum(capacity for tail, head, capacity in edges if tail in source_side and head not in source_side)
+        best = cut if best is None else min(best, cut)
+    return best
+
+CAPACITIES = {
+    "int": lambda rng: rng.randint(0, 9),
+    "float": lambda rng: round(rng.uniform(0, 3), 2),
+}
+
+@pytest.mark.parametrize("kind", CAPACITIES)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_solvers_match_brute_force(algorithm, kind):
+    rng = random.Random(f"{algorithm} {kind}")
+    for _ in range(60):
+        problem = random_problem(rng, CAPACITIES[kind])
+        assert maxThroughput(*problem, algorithm=algorithm) == pytest.approx(brute_force_cut(*problem))
+
+def test_origin_in_targets_is_rejected():
+    connections, maxIn, maxOut = [(0, 1, 3), (1, 0, 2)], [5, 5], [5, 5]
+    for algorithm in ALGORITHMS:
+        with pytest.raises(ValueError):
+            maxThroughput(connections, maxIn, maxOut, 0, [1, 0], algorithm=algorithm)
+    with pytest.raises(ValueError):
+        IncrementalThroughput(connections, maxIn, maxOut, 1, [1])
+    with pytest.raises(ValueError):
+        max_throughput_batch(connections, maxIn, maxOut, [(0, [1]), (1, [1])], processes=1)
+
+@pytest.mark.parametrize("kind", CAPACITIES)
+def test_incremental_changes_match_brute_force(kind):
+    rng = random.Random(kind)
+    for _ in range(20):
+        connections, maxIn, maxOut, origin, targets = random_problem(rng, CAPACITIES[kind])
+        state = IncrementalThroughput(connections, maxIn, maxOut, origin, targets, rng.choice(list(ALGORITHMS)))
+        for _ in range(15):
+            capacity = CAPACITIES[rng.choice(list(CAPACITIES))]                 # float changes reach networks built from integers
+            operation = rng.choice(["update", "add", "remove", "limit", "copy"])
+            if operation == "update" and connections:
+                index = rng.randrange(len(connections))
+                connections[index] = connections[index][:2] + (capacity(rng),)
+                state.update_edge(index, connections[index][2])
+            elif operation == "add":
+                connections.append((rng.randrange(len(maxIn)), rng.randrange(len(maxIn)), capacity(rng)))
+                assert state.add_edge(*connections[-1]) == len(connections) - 1
+            elif operation == "remove" and connections:
+                index = rng.randrange(len(connections))
+                connections[index] = connections[index][:2] + (0,)
+                state.remove_edge(index)
+            elif operation == "limit":
+                node = rng.randrange(len(maxIn))
+                maxIn[node], maxOut[node] = capacity(rng), capacity(rng)
+                state.set_node_limit(node, maxIn[node], maxOut[node])
+            elif operation == "copy":
+                state = state.copy()
+            assert state.throughput == pytest.approx(brute_force_cut(connections, maxIn, maxOut, origin, targets))
+
+def test_float_edge_added_to_an_integer_network():
+    state = IncrementalThroughput([(0, 1, 2), (1, 2, 2)], [4, 4, 4], [4, 4, 4], 0, [2])
+    assert state.add_edge(0, 2, 0.5) == 2
+    assert state.add_edge(0, 2, 1) == 3
+    assert state.throughput == pytest.approx(3.5)
+    with pytest.raises(TypeError):
+        state.add_edge(0, 2, "3")
+    assert len(state.network.to) == len(state.network.cap) == len(state.network.next_edge) == 14
+    assert state.update_edge(0, 0.25) == pytest.approx(1.75)
+
+def check_detailed(result, connections, maxIn, maxOut, origin, targets):
+    # the flows must fit the limits and balance at every datacentre, and the cut must be saturated and as
+    # large as the flow
+    n = len(maxIn)
+    inflow, outflow = [0] * n, [0] * n
+    for (from_node, to_node, capacity), flow in zip(connections, result.edge_flow):
+        assert -1e-9 <= flow <= capacity + 1e-9
+        outflow[from_node] += flow
+        inflow[to_node] += flow
+    for node in range(n):
+        assert -1e-9 <= result.node_flow[node] <= min(maxIn[node], maxOut[node]) + 1e-9
+        assert inflow[node] == pytest.approx(result.node_flow[node], abs=1e-9)
+        if node != origin and node not in targets:
+            assert outflow[node] == pytest.approx(result.node_flow[node], abs=1e-9)
+    assert outflow[origin] - result.node_flow[origin] == pytest.approx(result.throughput, abs=1e-9)
+    cut = [connections[index][2] for index in result.cut_connections()]
+    cut += [min(maxIn[node], maxOut[node]) for node in result.cut_datacentres()]
+    assert sum(cut) == pytest.approx(result.throughput, abs=1e-9)
+    for index in result.cut_connections():
+        assert result.edge_flow[index] == pytest.approx(connections[index][2], abs=1e-9)
+    assert origin in result.source_datacentres()
+
+@pytest.mark.parametrize("kind", CAPACITIES)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_detailed_results_are_a_flow_and_a_cut(algorithm, kind):
+    rng = random.Random(f"{algorithm} {kind} detailed")
+    for _ in range(60):
+        problem = random_problem(rng, CAPACITIES[kind])
+        result = maxThroughput(*problem, algorithm=algorithm, detailed=True)
+        assert isinstance(result, ThroughputResult)
+        assert result.throughput == pytest.approx(brute_force_cut(*problem))
+        check_detailed(result, *problem)
+
+@pytest.mark.parametrize("kind", CAPACITIES)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_reduced_solves_match_brute_force(algorithm, kind):
+    rng = random.Random(f"{algorithm} {kind} reduce")
+    for _ in range(60):
+        problem = random_problem(rng, CAPACITIES[kind])
+        expected = brute_force_cut(*problem)
+        assert maxThroughput(*problem, algorithm=algorithm, reduce=True) == pytest.approx(expected)
+        result = maxThroughput(*problem, algorithm=algorithm, detailed=True, reduce=True)
+        assert result.throughput == pytest.approx(expected)
+        check_detailed(result, *problem)                                    # expanded back onto the original datacentres
+
+def test_reduction_contracts_chains_and_merges_parallel_connections():
+    connections = [(0, 1, 4), (1, 2, 3), (2, 3, 5), (0, 3, 1), (0, 3, 2), (4, 0, 9)]
+    reduced = reduce_datacentres(connections, [9] * 5, [9] * 5, 0, [3])
+    assert len(reduced.maxIn) == 2                                          # the chain through 1 and 2 is contracted and 4 can't be reached
+    assert reduced.connections == [(reduced.origin_out, reduced.targets_out[0], 6)]
+
+@pytest.mark.parametrize("kind", CAPACITIES)
+def test_bounds_hold_at_every_budget(kind):
+    rng = random.Random(f"{kind} bounds")
+    for _ in range(40):
+        problem = random_problem(rng, CAPACITIES[kind])
+        expected = brute_force_cut(*problem)
+        for budget in range(4):
+            bounds = maxThroughput(*problem, max_augmentations=budget)
+            assert bounds.lower - 1e-9 <= expected <= bounds.upper + 1e-9
+            if bounds.complete:
+                assert bounds.lower == pytest.approx(expected)
+
+@pytest.mark.parametrize("kind", CAPACITIES)
+def test_refine_converges(kind):
+    rng = random.Random(f"{kind} refine")
+    for _ in range(40):
+        problem = random_problem(rng, CAPACITIES[kind])
+        bounds = maxThroughput(*problem, max_augmentations=1)
+        for _ in range(100):
+            if bounds.complete:
+                break
+            lower, upper = bounds.lower, bounds.upper
+            bounds.refine(max_augmentations=1)
+            assert lower <= bounds.lower and bounds.upper <= upper
+        assert bounds.complete
+        assert bounds.lower == bounds.upper == pytest.approx(brute_force_cut(*problem))
+
+def test_level_cut_bounds_the_flow_before_it_is_found():
+    # datacentre 4 is the only way to the target and lets 2 through, far less than the cuts around the
+    # origin (30) and the target (50), so only the cut between dinic's levels can show the first path is enough
+    connections = [(0, node, 10) for node in (1, 2, 3)] + [(node, 4, 10) for node in (1, 2, 3)] + [(4, 5, 10)]
+    maxIn, maxOut = [100, 100, 100, 100, 2, 50], [100] * 6
+    bounds = maxThroughput(connections, maxIn, maxOut, 0, [5], max_augmentations=1)
+    assert bounds.complete and bounds.lower == bounds.upper == 2
+    assert bounds.source_side[2 * 4] and not bounds.source_side[2 * 4 + 1]
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_matches_single_queries(processes):
+    rng = random.Random(f"batch {processes}")
+    connections, maxIn, maxOut, _, _ = random_problem(rng, CAPACITIES["int"])
+    n = len(maxIn)
+    queries = [(origin, rng.sample([node for node in range(n) if node != origin], rng.randint(1, n - 1)))
+               for origin in range(n) for _ in range(3)]
+    expected = [maxThroughput(connections, maxIn, maxOut, origin, targets) for origin, targets in queries]
+    assert max_throughput_batch(connections, maxIn, maxOut, queries, processes=processes) == expected
+
+def all_pairs(connections, maxIn, maxOut):
+    n = len(maxIn)
+    return {(origin, target): maxThroughput(connections, maxIn, maxOut, origin, [target])
+            for origin in range(n) for target in range(n) if origin != target}
+
+def test_throughput_index_is_exact_on_symmetric_links(tmp_path):
+    rng = random.Random("index exact")
+    for _ in range(10):
+        n = rng.randint(2, 6)
+        connections = []
+        for _ in range(2 * n):
+            a, b, capacity = rng.randrange(n), rng.randrange(n), rng.randint(1, 9)
+            connections += [(a, b, capacity), (b, a, capacity)]
+        maxIn = maxOut = [1000] * n
+        index = ThroughputIndex(connections, maxIn, maxOut)
+        assert index.exact and index.reason == ""
+        expected = all_pairs(connections, maxIn, maxOut)
+        assert {pair: index.throughput(*pair) for pair in expected} == expected
+        path = str(tmp_path / "index.json")
+        index.save(path)
+        loaded = ThroughputIndex.load(path)                                 # an exact index needs no network
+        assert {pair: loaded.throughput(*pair) for pair in expected} == expected
+
+def test_throughput_index_falls_back_to_solving(tmp_path):
+    rng = random.Random("index inexact")
+    for _ in range(10):
+        connections, maxIn, maxOut, _, _ = random_problem(rng, CAPACITIES["int"])
+        connections.append((0, 1, 5))                                       # a link with no link back
+        index = ThroughputIndex(connections, maxIn, maxOut)
+        assert not index.exact and index.reason
+        expected = all_pairs(connections, maxIn, maxOut)
+        assert index.throughput(0, 1) == expected[0, 1]
+        path = str(tmp_path / "index.json")
+        index.save(path)
+        loaded = ThroughputIndex.load(path, connections, maxIn, maxOut)
+        assert {pair: loaded.throughput(*pair) for pair in expected} == expected
+    with pytest.raises(ValueError):
+        index.throughput(1, 1)
+
+def same_network(network, other):
+    return all(list(getattr(network, name)) == list(getattr(other, name)) for name in ("head", "next_edge", "to", "cap"))
+
+@pytest.mark.parametrize("chunk_edges", [1, 4, 1 << 16])
+def test_load_flow_network_matches_convert(tmp_path, chunk_edges):
+    rng = random.Random(f"load {chunk_edges}")
+    connections, maxIn, maxOut, origin, targets = random_problem(rng, CAPACITIES["int"])
+    expected = convert_to_flow_network(connections, maxIn, maxOut)
+    edges, max_in, max_out = (str(tmp_path / name) for name in ("edges.csv", "max_in.csv", "max_out.csv"))
+    with open(edges, "w") as file:
+        file.write("# from,to,capacity\n\n" + "".join(f"{a}, {b},{capacity}\n" for a, b, capacity in connections))
+    for path, limits in ((max_in, maxIn), (max_out, maxOut)):
+        with open(path, "w") as file:
+            file.write("".join(f"{limit}\n" for limit in limits))
+    network, info = load_flow_network(edges, max_in, max_out, chunk_edges)
+    assert same_network(network, expected)
+    assert info["datacentres"] == len(maxIn) and info["connections"] == len(connections)
+    assert solve_query(network, origin, targets, "dinic") == maxThroughput(connections, maxIn, maxOut, origin, targets)
+
+    binary = [str(tmp_path / name) for name in ("edges.bin", "max_in.bin", "max_out.bin")]
+    write_edge_list(binary[0], connections)
+    write_node_limits(binary[1], maxIn)
+    write_node_limits(binary[2], maxOut)
+    assert same_network(load_flow_network(*binary, chunk_edges)[0], expected)
+
+def test_load_flow_network_rejects_bad_files(tmp_path):
+    limits = str(tmp_path / "limits.csv")
+    with open(limits, "w") as file:
+        file.write("5\n5\n")
+    ragged, outside = str(tmp_path / "ragged.csv"), str(tmp_path / "outside.csv")
+    with open(ragged, "w") as file:
+        file.write("0,1,3\n1,0\n")
+    with open(outside, "w") as file:
+        file.write("0,2,3\n")
+    for edges in (ragged, outside):
+        with pytest.raises(ValueError):
+            load_flow_network(edges, limits, limits)
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_failure_sweep_matches_solving_every_failure(processes):
+    rng = random.Random(f"sweep {processes}")
+    for _ in range(5):
+        connections, maxIn, maxOut, origin, targets = random_problem(rng, CAPACITIES["int"])
+        full = maxThroughput(connections, maxIn, maxOut, origin, targets)
+        expected = []
+        for index, (a, b, _) in enumerate(connections):
+            failed = connections[:index] + [(a, b, 0)] + connections[index + 1:]
+            left = maxThroughput(failed, maxIn, maxOut, origin, targets)
+            expected.append(("connection", index, left, full - left))
+        for node in range(len(maxIn)):
+            limits = maxIn[:node] + [0] + maxIn[node + 1:]
+            left = 0 if node == origin else maxThroughput(connections, limits, maxOut, origin, targets)
+            expected.append(("datacentre", node, left, full - left))
+        assert failure_sweep(connections, maxIn, maxOut, origin, targets, processes=processes) == expected
+        assert ("datacentre", origin, 0, full) in expected
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_solver_stats_record_the_solve(algorithm):
+    connections, limits = [(0, 1, 3), (0, 2, 4), (2, 1, 5)], [100, 100, 100]
+    calls = []
+    stats = SolverStats(callback=calls.append, trace=True)
+    assert maxThroughput(connections, limits, limits, 0, [1], algorithm=algorithm, stats=stats) == 7
+    assert calls == [stats]
+    assert {"build", "solve"} <= set(stats.phases)
+    assert stats.edges_scanned > 0 and stats.reverse_lookups > 0
+    if algorithm in ("ford_fulkerson", "dinic"):                            # two paths, of 2 and 4 edges in the split graph
+        assert stats.augmentations == 2 and stats.max_depth == 4
+        assert sorted(stats.trace) == [(2, 3), (4, 4)]
+    else:
+        assert stats.augmentations > 0
+    assert set(stats.as_dict()) == {"augmentations", "edges_scanned", "reverse_lookups", "max_depth", "phases"}
+
+    stats = SolverStats()
+    maxThroughput(connections, limits, limits, 0, [1], algorithm=algorithm, detailed=True, reduce=True, stats=stats)
+    assert {"reduce", "build", "solve", "expand"} <= set(stats.phases) and stats.trace is None
+
+def test_network_snapshot_round_trip(tmp_path):
+    rng = random.Random("snapshot")
+    connections, maxIn, maxOut, origin, targets = random_problem(rng, CAPACITIES["float"])
+    network = convert_to_flow_network(connections, maxIn, maxOut)
+    path = str(tmp_path / "network.snap")
+    save_network_snapshot(path, network, len(maxIn))
+    with open(path, "rb") as file:
+        saved = file.read()
+    snapshot = NetworkSnapshot(path)
+    assert snapshot.datacentres == len(maxIn) and same_network(snapshot.network, network)
+    for origin in range(len(maxIn)):
+        targets = [node for node in range(len(maxIn)) if node != origin]
+        assert snapshot.throughput(origin, targets) == pytest.approx(maxThroughput(connections, maxIn, maxOut, origin, targets))
+    assert same_network(snapshot.network, network)                          # every solve had its own copy of the capacities
+    snapshot.close()
+    with open(path, "rb") as file:
+        assert file.read() == saved
+    with pytest.raises(ValueError):
+        save_network_snapshot(path, network, len(maxIn) + 1)
+
+def test_network_snapshot_rejects_bad_files(tmp_path):
+    network = convert_to_flow_network([(0, 1, 3)], [5, 5], [5, 5])
+    path = str(tmp_path / "network.snap")
+    save_network_snapshot(path, network, 2)
+    with open(path, "rb") as file:
+        saved = file.read()
+    bad = {
+        "magic": b"NOTANETW" + saved[8:],
+        "version": saved[:8] + (SNAPSHOT_VERSION + 1).to_bytes(2, "little") + saved[10:],
+        "truncated": saved[:-1],
+        "extra": saved + b"\0",
+        "empty": b"",
+    }
+    for name, data in bad.items():
+        broken = str(tmp_path / f"{name}.snap")
+        with open(broken, "wb") as file:
+            file.write(data)
+        with pytest.raises(ValueError):
+            NetworkSnapshot(broken)
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import socket
+import struct
+
+from catgpt import CatsTrie
+from server import AutocompleteServer
+
+class BrokenTrie:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def autoComplete_many(self, prompts: list, k: int = None) -> list:
+        self.calls += 1
+        if self.calls == 1:
+            raise IndexError("broken")
+        return ["ok"] * len(prompts)
+
+async def ask(address, lines: list) -> list:
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(b"".join(json.dumps(line).encode() + b"\n" for line in lines))
+    writer.write_eof()
+    answers = [json.loads(line) async for line in reader]
+    writer.close()
+    return answers
+
+def test_batcher_survives_a_failing_trie():
+    async def run():
+        server = AutocompleteServer(BrokenTrie(), window=0)
+        await server.start(port=0)
+        first = await asyncio.wait_for(ask(server.address(), [{"id": 1, "prompt": "a"}]), 5)
+        second = await asyncio.wait_for(ask(server.address(), [{"id": 2, "prompt": "a"}]), 5)
+        await server.close()
+        return first, second
+    first, second = asyncio.run(asyncio.wait_for(run(), 20))
+    assert first[0]["id"] == 1 and "IndexError" in first[0]["error"]
+    assert second == [{"id": 2, "completions": "ok"}]
+
+def test_reset_client_is_released():
+    async def run():
+        server = AutocompleteServer(CatsTrie(["x" * 60000]), window=0, max_pipeline=4)
+        await server.start(port=0)
+        client = socket.create_connection(server.address())
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        client.sendall(b'{"prompt": "x"}\n' * 400)
+        for _ in range(100):                                                # lets the server fill the client's buffers
+            await asyncio.sleep(0.01)
+            if server.connections and server.queries >= 50:
+                break
+        client.close()                                                      # resets the connection with answers unread
+        for _ in range(300):
+            await asyncio.sleep(0.01)
+            if server.connections == 0:
+                break
+        connections = server.connections
+        await server.close()
+        return connections
+    assert asyncio.run(asyncio.wait_for(run(), 20)) == 0